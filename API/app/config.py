@@ -8,11 +8,28 @@ class Settings(BaseSettings):
     DEBUG: bool = False
 
     DATABASE_URL: str = "sqlite:///./upgi.db"
+    # Con DB_ASYNC los endpoints usan AsyncSession (aiosqlite / asyncpg).
+    # Si ASYNC_DATABASE_URL no se define se deriva de DATABASE_URL.
+    # No es una opcion de rendimiento con SQLite: aiosqlite agrega un salto de hilo por consulta.
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: str | None = None
 
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
 
+    IDEMPOTENCY_TTL_HOURS: int = 24
+
+    # Reservas con fecha anterior a hoy - ARCHIVO_HORIZONTE_DIAS pasan a reservas_historico.
+    ARCHIVO_HORIZONTE_DIAS: int = 180
+    ARCHIVO_LOTE: int = 1000
+
+    # Reportes en segundo plano: resultados en disco, purgados por edad y tamanio total.
+    REPORTES_JOBS_DIR: str = "./reportes_jobs"
+    REPORTES_JOBS_WORKERS: int = 2
+    REPORTES_JOBS_TTL_HORAS: int = 24
+    REPORTES_JOBS_MAX_MB: int = 512
+
     CORS_ORIGINS: list[str] = [
         "http://localhost:3000",
         "http://localhost:5173",
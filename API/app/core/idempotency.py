@@ -0,0 +1,120 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.exceptions import ConflictException, ValidationException
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(150), nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    # NULL mientras la solicitud original sigue en curso.
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+def scope_anonimo(ruta: str, identidad: str) -> str:
+    """Scope for a route without a logged-in user, keyed by who the request is for.
+
+    Without it every anonymous caller shares one key space per route and can
+    replay or block another caller's key. The identity is hashed so it is
+    not stored in clear.
+    """
+    digest = hashlib.sha256(identidad.lower().strip().encode()).hexdigest()[:32]
+    return f"{ruta}:{digest}"
+
+
+def ejecutar_idempotente(
+    db: Session,
+    key: str | None,
+    scope: str,
+    payload: Any,
+    operacion: Callable[[], dict],
+    status_code: int = 200,
+    response_model: type[BaseModel] | None = None
+) -> dict | JSONResponse:
+    """Run `operacion` once per (scope, key) and replay its stored response on retries.
+
+    The response is stored as serialized by `response_model`, so a replay has
+    the same body the first call returned. Only successful responses are
+    stored; if the operation raises, the key is released so the client can
+    retry. Expired keys are evicted on each new key.
+    """
+    if not key:
+        return operacion()
+
+    request_hash = hashlib.sha256(
+        json.dumps(jsonable_encoder(payload), sort_keys=True).encode()
+    ).hexdigest()
+    ahora = datetime.utcnow()
+
+    db.query(IdempotencyKey).filter(IdempotencyKey.expires_at < ahora).delete(synchronize_session=False)
+    registro = IdempotencyKey(
+        scope=scope,
+        key=key,
+        request_hash=request_hash,
+        expires_at=ahora + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+    )
+    db.add(registro)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return _respuesta_guardada(db, key, scope, request_hash)
+
+    try:
+        resultado = operacion()
+    except Exception:
+        db.rollback()
+        db.query(IdempotencyKey).filter(IdempotencyKey.id == registro.id).delete(synchronize_session=False)
+        db.commit()
+        raise
+
+    if response_model is not None:
+        contenido = response_model.model_validate(resultado).model_dump(mode="json")
+    else:
+        contenido = jsonable_encoder(resultado)
+    registro.status_code = status_code
+    registro.response_body = json.dumps(contenido)
+    db.commit()
+    return resultado
+
+
+def _respuesta_guardada(db: Session, key: str, scope: str, request_hash: str) -> JSONResponse:
+    registro = db.query(IdempotencyKey).filter(
+        IdempotencyKey.scope == scope,
+        IdempotencyKey.key == key
+    ).first()
+    if not registro:
+        raise ConflictException("La clave de idempotencia se está procesando, intente de nuevo")
+
+    if registro.request_hash != request_hash:
+        raise ValidationException("La clave de idempotencia ya se usó con una solicitud distinta")
+
+    if registro.status_code is None:
+        raise ConflictException("Hay una solicitud en curso con esta clave de idempotencia")
+
+    return JSONResponse(
+        status_code=registro.status_code,
+        content=json.loads(registro.response_body),
+        headers={"Idempotent-Replayed": "true"}
+    )
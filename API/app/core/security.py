@@ -8,12 +8,21 @@ from app.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt_sha256", "bcrypt"], deprecated="auto")
 
+# Marca para cuentas sin acceso (clientes invitados): no es un hash valido de ningun esquema.
+UNUSABLE_PASSWORD = "!"
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def is_password_usable(hashed_password: str | None) -> bool:
+    return bool(hashed_password) and not hashed_password.startswith(UNUSABLE_PASSWORD)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
+    if not is_password_usable(hashed_password):
+        return False
     return pwd_context.verify(plain_password, hashed_password)
 
 
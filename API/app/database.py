@@ -1,7 +1,16 @@
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
+from starlette.concurrency import run_in_threadpool
+
 from app.config import settings
 
+T = TypeVar("T")
+
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
@@ -17,3 +26,102 @@ def get_db() -> Session:
         yield db
     finally:
         db.close()
+
+
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    driver = _ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No hay driver async para {url.get_backend_name()}; defina ASYNC_DATABASE_URL")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+@lru_cache()
+def get_async_sessionmaker():
+    # Import diferido: aiosqlite/asyncpg solo se necesitan con DB_ASYNC.
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(async_database_url(), echo=settings.DEBUG)
+    # Sin expirar en commit: un atributo expirado no puede recargarse fuera de run_sync.
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+class SessionRunner:
+    """Runs service code written against a sync Session on the configured backend.
+
+    Without DB_ASYNC the callable runs on a sync Session in the threadpool,
+    as sync endpoints did. With DB_ASYNC, read paths that have a native async
+    variant pass it as `nativo` and await their queries directly; the rest
+    run through AsyncSession.run_sync, which only exists so every endpoint
+    works in that mode: it is not faster than the threadpool.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    @property
+    def is_async(self) -> bool:
+        return not isinstance(self.session, Session)
+
+    async def run(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        nativo: Callable[[Any], Awaitable[T]] | None = None,
+        **kwargs: Any
+    ) -> T:
+        if self.is_async:
+            if nativo is not None:
+                return await nativo(self.session)
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def scalar(self, stmt) -> Any:
+        """Run a single-row ORM lookup: awaited with DB_ASYNC, inline otherwise.
+
+        Inline keeps a sync request at the one threadpool hop of its handler,
+        so use it only for indexed point reads such as the user behind a token.
+        The read goes through a connection reserved for the event loop, since
+        waiting on the request pool there would block the threadpool workers
+        that return connections to it; the row is then merged into the
+        request session without another query.
+        """
+        if self.is_async:
+            return await self.session.scalar(stmt)
+        with Session(_engine_del_loop(self.session.get_bind())) as lectura:
+            obj = lectura.scalar(stmt)
+            return None if obj is None else self.session.merge(obj, load=False)
+
+
+@lru_cache()
+def _engine_del_loop(bind):
+    # Una sola conexion y solo la usa el hilo del event loop: nunca espera turno.
+    return create_engine(
+        bind.url,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False} if bind.dialect.name == "sqlite" else {},
+        echo=settings.DEBUG,
+    )
+
+
+async def get_runner() -> AsyncIterator[SessionRunner]:
+    if settings.DB_ASYNC:
+        async with get_async_sessionmaker()() as db:
+            yield SessionRunner(db)
+        return
+
+    db = SessionLocal()
+    try:
+        yield SessionRunner(db)
+    finally:
+        await run_in_threadpool(db.close)
@@ -0,0 +1,31 @@
+import logging
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from app.db.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+def asegurar_indices(bind: Engine) -> list[str]:
+    """Create the model indexes that are missing from tables that already exist.
+
+    create_all skips a table that exists, so an index added to a model later
+    never reaches an older database. Safe to run on every startup; returns
+    the names of the indexes it created.
+    """
+    inspector = inspect(bind)
+    existentes = set(inspector.get_table_names())
+    creados = []
+    for tabla in Base.metadata.sorted_tables:
+        if tabla.name not in existentes:
+            continue
+        presentes = {i["name"] for i in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in presentes:
+                indice.create(bind, checkfirst=True)
+                creados.append(indice.name)
+    if creados:
+        logger.warning("Indices creados sobre tablas existentes: %s", ", ".join(creados))
+    return creados
@@ -1,7 +1,8 @@
 from app.db.base import Base
 from app.domains.auth.models import Auth
 from app.domains.users.models import User
-from app.domains.canchas.models import Cancha, Horario
-from app.domains.reservas.models import Reserva
+from app.domains.canchas.models import Cancha, Horario, HorarioExcepcion, TarifaFranja
+from app.domains.reservas.models import Reserva, ReservaSlot, ReservaEvento, ReservaHistorico, ReservaRollupDiario
+from app.core.idempotency import IdempotencyKey
 
-__all__ = ["Base", "Auth", "User", "Cancha", "Horario", "Reserva"]
+__all__ = ["Base", "Auth", "User", "Cancha", "Horario", "HorarioExcepcion", "TarifaFranja", "Reserva", "ReservaSlot", "ReservaEvento", "ReservaHistorico", "ReservaRollupDiario", "IdempotencyKey"]
@@ -0,0 +1,15 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+
+def duracion_segundos(db: Session, hora_inicio, hora_fin):
+    """Return a SQL expression for the seconds between two TIME columns on the session's backend."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return func.extract("epoch", hora_fin - hora_inicio)
+    if dialect == "sqlite":
+        # Las horas se guardan como texto 'HH:MM:SS[.ffffff]'.
+        return func.strftime("%s", hora_fin) - func.strftime("%s", hora_inicio)
+    if dialect in ("mysql", "mariadb"):
+        return func.time_to_sec(hora_fin) - func.time_to_sec(hora_inicio)
+    raise NotImplementedError(f"Aritmetica de horas no soportada para el motor {dialect}")
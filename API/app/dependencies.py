@@ -1,8 +1,8 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 
-from app.database import get_db
+from app.database import SessionRunner, get_runner
 from app.core.security import decode_token
 from app.domains.users.models import User
 from app.core.exceptions import UnauthorizedException
@@ -12,7 +12,7 @@ security = HTTPBearer()
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ) -> User:
     token = credentials.credentials
     payload = decode_token(token)
@@ -21,7 +21,7 @@ async def get_current_user(
         raise UnauthorizedException("Token inválido o expirado")
 
     user_id = int(payload.get("sub"))
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
 
     if not user:
         raise UnauthorizedException("Usuario no encontrado")
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, Header
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import SessionRunner, get_db, get_runner
 from app.domains.auth.schemas import (
     RegisterRequest, LoginRequest, AuthResponse, CurrentUserResponse
 )
@@ -12,6 +12,8 @@ from app.domains.users.models import User
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
+# register y login siguen siendo sync aun con DB_ASYNC: bcrypt es trabajo de CPU
+# y bloquearia el event loop, en el threadpool no.
 @router.post("/register", response_model=AuthResponse)
 def register(request: RegisterRequest, db: Session = Depends(get_db)):
     service = AuthService(db)
@@ -30,20 +32,19 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/logout")
-def logout(current_user: User = Depends(get_current_user)):
+async def logout(current_user: User = Depends(get_current_user)):
     return {"status": 200, "message": "Sesión cerrada exitosamente"}
 
 
 @router.get("/me", response_model=CurrentUserResponse)
-def get_me(
+async def get_me(
     authorization: str | None = Header(None),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
     token = None
     if authorization and authorization.startswith("Bearer "):
         token = authorization[7:]
 
-    current_user = get_current_user(token=token, db=db)
+    current_user = await get_current_user(token=token, credentials=None, db=db)
 
-    service = AuthService(db)
-    return service.get_current_user(current_user.id)
+    return await db.run(lambda s: AuthService(s).get_current_user(current_user.id))
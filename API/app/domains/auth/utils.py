@@ -1,7 +1,7 @@
 from fastapi import Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from app.database import SessionRunner, get_runner
 from app.core.security import decode_token
 from app.domains.users.models import User
 from app.domains.auth.models import Auth
@@ -10,10 +10,10 @@ from app.core.exceptions import UnauthorizedException, ForbiddenException
 security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
+async def get_current_user(
     token: str | None = None,
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ) -> User:
     if not token and credentials:
         token = credentials.credentials
@@ -34,7 +34,7 @@ def get_current_user(
     except (TypeError, ValueError):
         raise UnauthorizedException("Token inválido o expirado")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
 
     if not user:
         raise UnauthorizedException("Usuario no encontrado")
@@ -42,7 +42,7 @@ def get_current_user(
     return user
 
 
-def get_current_admin(
+async def get_current_admin(
     current_user: User = Depends(get_current_user)
 ) -> User:
     if not current_user.is_admin:
@@ -0,0 +1,181 @@
+import threading
+import time as reloj
+from datetime import date, time
+from itertools import chain
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.domains.canchas.models import Horario, HorarioExcepcion
+
+SEGUNDOS_DIA = 24 * 3600
+# Tope de staleness para cambios hechos por otro proceso.
+AGENDA_TTL = 300
+
+Ventanas = tuple[tuple[int, int], ...]
+
+_HORARIOS = select(Horario.cancha_id, Horario.dia_semana, Horario.hora_inicio, Horario.hora_fin)
+_EXCEPCIONES = select(HorarioExcepcion)
+
+
+def _segundos(hora: time) -> int:
+    return hora.hour * 3600 + hora.minute * 60 + hora.second
+
+
+def _segundos_fin(hora: time) -> int:
+    return SEGUNDOS_DIA if hora == time(0) else _segundos(hora)
+
+
+def _compilar(intervalos: list[tuple[int, int]]) -> Ventanas:
+    """Sort and merge overlapping or adjacent windows."""
+    ventanas: list[list[int]] = []
+    for inicio, fin in sorted(intervalos):
+        if fin <= inicio:
+            continue
+        if ventanas and inicio <= ventanas[-1][1]:
+            ventanas[-1][1] = max(ventanas[-1][1], fin)
+        else:
+            ventanas.append([inicio, fin])
+    return tuple((inicio, fin) for inicio, fin in ventanas)
+
+
+class AgendaSemanal:
+    """Compiled opening hours per court: weekly windows plus date exceptions.
+
+    Everything is loaded with two queries and kept in memory, so availability
+    and booking checks don't touch the database. A weekday without horarios
+    stays unrestricted, as it always was.
+    """
+
+    def __init__(self, ttl: float = AGENDA_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # cancha_id -> ventanas por dia_semana (0=Domingo..6=Sábado); None = sin restriccion.
+        self._semanas: dict[int, list[Ventanas | None]] | None = None
+        # (cancha_id | None, fecha) -> ventanas de ese dia; () = cerrado.
+        self._excepciones: dict[tuple[int | None, date], Ventanas] = {}
+        self._cargado_en = 0.0
+        self._version = 0
+
+    def ventanas(self, db: Session, cancha_id: int, fecha: date) -> Ventanas | None:
+        """Opening windows in seconds for the day, () when closed, None when unrestricted."""
+        return _ventanas_del_dia(self._cargar(db), cancha_id, fecha)
+
+    def permite(self, db: Session, cancha_id: int, fecha: date, hora_inicio: time, hora_fin: time) -> bool:
+        return _permite(self.ventanas(db, cancha_id, fecha), hora_inicio, hora_fin)
+
+    async def permite_async(
+        self,
+        db: AsyncSession,
+        cancha_id: int,
+        fecha: date,
+        hora_inicio: time,
+        hora_fin: time
+    ) -> bool:
+        """`permite` with a reload, if one is due, awaited on an AsyncSession."""
+        ventanas = _ventanas_del_dia(await self._cargar_async(db), cancha_id, fecha)
+        return _permite(ventanas, hora_inicio, hora_fin)
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._semanas = None
+            self._excepciones = {}
+
+    def _cargar(self, db: Session):
+        cargado, version = self._vigente()
+        if cargado is not None:
+            return cargado
+        return self._compilar_carga(version, db.execute(_HORARIOS).all(), db.scalars(_EXCEPCIONES).all())
+
+    async def _cargar_async(self, db: AsyncSession):
+        cargado, version = self._vigente()
+        if cargado is not None:
+            return cargado
+        horarios = (await db.execute(_HORARIOS)).all()
+        return self._compilar_carga(version, horarios, (await db.scalars(_EXCEPCIONES)).all())
+
+    def _vigente(self):
+        """Return ((semanas, excepciones), None) while fresh, else (None, version before the load)."""
+        with self._lock:
+            if self._semanas is not None and reloj.monotonic() - self._cargado_en < self.ttl:
+                return (self._semanas, self._excepciones), None
+            return None, self._version
+
+    def _compilar_carga(self, version: int, horarios, excepciones_db):
+        por_dia: dict[int, list[list[tuple[int, int]]]] = {}
+        for h in horarios:
+            if 0 <= h.dia_semana <= 6:
+                dias = por_dia.setdefault(h.cancha_id, [[] for _ in range(7)])
+                dias[h.dia_semana].append((_segundos(h.hora_inicio), _segundos_fin(h.hora_fin)))
+        semanas = {
+            cancha_id: [_compilar(dia) if dia else None for dia in dias]
+            for cancha_id, dias in por_dia.items()
+        }
+
+        filas: dict[tuple[int | None, date], list] = {}
+        for e in excepciones_db:
+            filas.setdefault((e.cancha_id, e.fecha), []).append(e)
+        excepciones = {
+            key: () if any(e.cerrado for e in grupo) else _compilar([
+                (_segundos(e.hora_inicio), _segundos_fin(e.hora_fin)) for e in grupo
+            ])
+            for key, grupo in filas.items()
+        }
+
+        with self._lock:
+            # Una carga que cruzo una invalidacion se usa una vez pero no se guarda.
+            if version == self._version:
+                self._semanas, self._excepciones = semanas, excepciones
+                self._cargado_en = reloj.monotonic()
+        return semanas, excepciones
+
+
+def _ventanas_del_dia(cargado, cancha_id: int, fecha: date) -> Ventanas | None:
+    semanas, excepciones = cargado
+    excepcion = excepciones.get((cancha_id, fecha), excepciones.get((None, fecha)))
+    if excepcion is not None:
+        return excepcion
+    semana = semanas.get(cancha_id)
+    return semana[(fecha.weekday() + 1) % 7] if semana else None
+
+
+def _permite(ventanas: Ventanas | None, hora_inicio: time, hora_fin: time) -> bool:
+    if ventanas is None:
+        return True
+    inicio, fin = _segundos(hora_inicio), _segundos_fin(hora_fin)
+    return any(v_inicio <= inicio and fin <= v_fin for v_inicio, v_fin in ventanas)
+
+
+agenda = AgendaSemanal()
+
+
+# Cualquier cambio a horarios hecho por una sesion del ORM refresca la agenda
+# al confirmarse, sin importar desde donde se hizo.
+@event.listens_for(Session, "after_flush")
+def _marcar_cambios_de_horario(session: Session, flush_context) -> None:
+    cambiados = {
+        obj.cancha_id for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, (Horario, HorarioExcepcion))
+    }
+    if cambiados:
+        session.info.setdefault("horarios_cambiados", set()).update(cambiados)
+
+
+@event.listens_for(Session, "after_commit")
+def _refrescar_agenda(session: Session) -> None:
+    cambiados = session.info.pop("horarios_cambiados", None)
+    if not cambiados:
+        return
+    agenda.invalidar()
+    # Import diferido: el servicio importa este modulo.
+    from app.domains.canchas.service import invalidar_disponibilidad
+    for cancha_id in cambiados:
+        if cancha_id is not None:
+            invalidar_disponibilidad(cancha_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_cambios_de_horario(session: Session) -> None:
+    session.info.pop("horarios_cambiados", None)
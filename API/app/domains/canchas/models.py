@@ -1,5 +1,5 @@
 from datetime import datetime, time
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Time, ForeignKey, DECIMAL
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Time, ForeignKey, DECIMAL
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -28,3 +28,40 @@ class Horario(Base):
     hora_fin = Column(Time, nullable=False)
 
     cancha = relationship("Cancha", back_populates="horarios")
+
+
+class TarifaFranja(Base):
+    """Hourly price for a weekday/time band, overriding Cancha.precio_hora.
+
+    cancha_id NULL applies to every court and dia_semana NULL to every day
+    (0=Domingo..6=Sábado, as in Horario). The most specific band wins.
+    """
+    __tablename__ = "tarifas_franjas"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cancha_id = Column(Integer, ForeignKey("canchas.id"), nullable=True, index=True)
+    dia_semana = Column(Integer, nullable=True)
+    hora_inicio = Column(Time, nullable=False)
+    # 00:00 como fin significa hasta la medianoche.
+    hora_fin = Column(Time, nullable=False)
+    precio_hora = Column(DECIMAL(10, 2), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class HorarioExcepcion(Base):
+    """Date-specific override of the weekly horarios: a holiday, closure or special hours.
+
+    cancha_id NULL applies to every court. A row with cerrado closes the day;
+    otherwise the rows for that date replace the weekly windows. Rows for a
+    specific court take precedence over the ones for every court.
+    """
+    __tablename__ = "horario_excepciones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cancha_id = Column(Integer, ForeignKey("canchas.id"), nullable=True, index=True)
+    fecha = Column(Date, nullable=False, index=True)
+    cerrado = Column(Boolean, nullable=False, default=True)
+    hora_inicio = Column(Time, nullable=True)
+    hora_fin = Column(Time, nullable=True)
+    motivo = Column(String(200), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
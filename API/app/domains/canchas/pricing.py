@@ -0,0 +1,167 @@
+import threading
+import time as reloj
+from datetime import date, time
+from decimal import Decimal
+from itertools import accumulate
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.domains.canchas.models import Cancha, TarifaFranja
+
+MINUTOS_DIA = 24 * 60
+# Tope de staleness para cambios hechos por otro proceso.
+TARIFAS_TTL = 300
+
+_CANCHAS = select(Cancha.id, Cancha.precio_hora)
+_FRANJAS = select(TarifaFranja).order_by(TarifaFranja.id)
+
+
+def _minuto(hora: time) -> int:
+    return hora.hour * 60 + hora.minute
+
+
+def _minuto_fin(hora: time) -> int:
+    return MINUTOS_DIA if hora == time(0) else _minuto(hora)
+
+
+def _centavos(valor) -> int:
+    return int((Decimal(str(valor)) * 100).quantize(Decimal(1)))
+
+
+class Tarifario:
+    """Weekly price tables per court, loaded once and rebuilt after tariff writes.
+
+    Each (cancha, dia_semana) compiles to a prefix sum of cents per minute,
+    so pricing any [inicio, fin) interval is two lookups no matter how many
+    bands it crosses.
+    """
+
+    def __init__(self, ttl: float = TARIFAS_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # cancha_id -> centavos por hora de la cancha; None hasta la primera carga.
+        self._base: dict[int, int] | None = None
+        # [(cancha_id | None, dia_semana | None, inicio_min, fin_min, centavos)] por id.
+        self._franjas: list[tuple[int | None, int | None, int, int, int]] = []
+        self._tablas: dict[tuple[int, int], list[int]] = {}
+        self._cargado_en = 0.0
+        self._version = 0
+
+    def quote_many(self, db: Session, items: Iterable[tuple[int, date, time, time]]) -> list[float | None]:
+        """Price (cancha_id, fecha, hora_inicio, hora_fin) tuples; None for unknown courts."""
+        items = list(items)
+        base, franjas = self._cargar(db)
+        if any(item[0] not in base for item in items):
+            # Puede ser una cancha creada por otro proceso despues de la carga.
+            base, franjas = self._cargar(db, forzar=True)
+        return self._precios(items, base, franjas)
+
+    def cotizar(self, db: Session, cancha_id: int, fecha: date, hora_inicio: time, hora_fin: time) -> float | None:
+        return self.quote_many(db, [(cancha_id, fecha, hora_inicio, hora_fin)])[0]
+
+    async def cotizar_async(
+        self,
+        db: AsyncSession,
+        cancha_id: int,
+        fecha: date,
+        hora_inicio: time,
+        hora_fin: time
+    ) -> float | None:
+        """`cotizar` with a reload, if one is due, awaited on an AsyncSession."""
+        items = [(cancha_id, fecha, hora_inicio, hora_fin)]
+        base, franjas = await self._cargar_async(db)
+        if cancha_id not in base:
+            base, franjas = await self._cargar_async(db, forzar=True)
+        return self._precios(items, base, franjas)[0]
+
+    def _precios(self, items: list, base: dict[int, int], franjas: list) -> list[float | None]:
+        tablas: dict[tuple[int, int], list[int]] = {}
+        precios = []
+        for cancha_id, fecha, hora_inicio, hora_fin in items:
+            if cancha_id not in base:
+                precios.append(None)
+                continue
+            key = (cancha_id, (fecha.weekday() + 1) % 7)
+            tabla = tablas.get(key)
+            if tabla is None:
+                tabla = tablas[key] = self._tabla(key, base, franjas)
+            centavos_minuto = tabla[_minuto_fin(hora_fin)] - tabla[_minuto(hora_inicio)]
+            precios.append(round(centavos_minuto / 6000, 2))
+        return precios
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._base = None
+            self._franjas = []
+            self._tablas = {}
+
+    def _cargar(self, db: Session, forzar: bool = False):
+        cargado, version = self._vigente(forzar)
+        if cargado is not None:
+            return cargado
+        return self._guardar(version, db.execute(_CANCHAS).all(), db.scalars(_FRANJAS).all())
+
+    async def _cargar_async(self, db: AsyncSession, forzar: bool = False):
+        cargado, version = self._vigente(forzar)
+        if cargado is not None:
+            return cargado
+        canchas = (await db.execute(_CANCHAS)).all()
+        return self._guardar(version, canchas, (await db.scalars(_FRANJAS)).all())
+
+    def _vigente(self, forzar: bool):
+        """Return ((base, franjas), None) while fresh, else (None, version before the load)."""
+        with self._lock:
+            vigente = self._base is not None and reloj.monotonic() - self._cargado_en < self.ttl
+            if vigente and not forzar:
+                return (self._base, self._franjas), None
+            return None, self._version
+
+    def _guardar(self, version: int, canchas, franjas_db):
+        base = {c.id: _centavos(c.precio_hora) for c in canchas}
+        franjas = [
+            (f.cancha_id, f.dia_semana, _minuto(f.hora_inicio), _minuto_fin(f.hora_fin), _centavos(f.precio_hora))
+            for f in franjas_db
+        ]
+
+        with self._lock:
+            # Igual que en el indice de ocupacion: una carga que cruzo una
+            # invalidacion se usa una vez pero no se guarda.
+            if version == self._version:
+                self._base, self._franjas = base, franjas
+                self._tablas = {}
+                self._cargado_en = reloj.monotonic()
+        return base, franjas
+
+    def _tabla(self, key: tuple[int, int], base: dict[int, int], franjas: list) -> list[int]:
+        with self._lock:
+            tabla = self._tablas.get(key) if base is self._base else None
+        if tabla is not None:
+            return tabla
+
+        cancha_id, dia_semana = key
+        precios = [base[cancha_id]] * MINUTOS_DIA
+        aplicables = [
+            f for f in franjas
+            if f[0] in (None, cancha_id) and f[1] in (None, dia_semana)
+        ]
+        # De menos a mas especifica; con igual especificidad gana la ultima creada.
+        aplicables.sort(key=lambda f: (f[0] is not None, f[1] is not None))
+        for _, _, inicio, fin, centavos in aplicables:
+            precios[inicio:fin] = [centavos] * (fin - inicio)
+        tabla = [0, *accumulate(precios)]
+
+        with self._lock:
+            if base is self._base:
+                self._tablas[key] = tabla
+        return tabla
+
+
+tarifario = Tarifario()
+
+
+def quote_many(db: Session, items: Iterable[tuple[int, date, time, time]]) -> list[float | None]:
+    return tarifario.quote_many(db, items)
@@ -1,24 +1,27 @@
 from datetime import date, time
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import SessionRunner, get_runner
 from app.domains.auth.utils import get_current_user, get_current_admin
 from app.domains.users.models import User
-from app.domains.canchas.service import CanchaService
+from app.domains.canchas.service import CanchaService, CanchaServiceAsync
+from app.domains.reservas.slots import SLOT_MINUTOS
 from app.domains.canchas.schemas import (
     CanchaCreate, CanchaUpdate, CanchaResponse, CanchaDetailResponse,
     CanchaCreateResponse, CanchaDeleteResponse,
-    CanchaListResponse, DisponibilidadResponse
+    CanchaListResponse, DisponibilidadResponse, DisponibilidadGrillaResponse,
+    CotizacionRequest, CotizacionResponse, TarifaFranjaCreate, TarifaFranjaListResponse,
+    TarifaFranjaCreateResponse, TarifaFranjaDeleteResponse, HorariosUpdate,
+    HorarioExcepcionCreate, HorarioExcepcionListResponse, HorarioExcepcionCreateResponse,
+    HorarioExcepcionDeleteResponse
 )
 
 router = APIRouter(prefix="/canchas", tags=["Canchas"])
 
 
 @router.get("", response_model=CanchaListResponse)
-def listar_canchas(db: Session = Depends(get_db)):
-    service = CanchaService(db)
-    canchas = service.listar()
+async def listar_canchas(db: SessionRunner = Depends(get_runner)):
+    canchas = await db.run(lambda s: CanchaService(s).listar())
     return {
         "status": 200,
         "canchas": [
@@ -35,65 +38,160 @@ def listar_canchas(db: Session = Depends(get_db)):
     }
 
 
+# Las rutas fijas deben declararse antes de /{cancha_id} para que no se tomen como id.
+@router.get("/disponibilidad", response_model=DisponibilidadGrillaResponse)
+async def grilla_disponibilidad(
+    fecha_desde: date = Query(...),
+    fecha_hasta: date = Query(...),
+    tipo: str | None = Query(None),
+    granularidad: int = Query(30, ge=SLOT_MINUTOS, le=240),
+    db: SessionRunner = Depends(get_runner)
+):
+    return await db.run(
+        lambda s: CanchaService(s).grilla_disponibilidad(fecha_desde, fecha_hasta, tipo, granularidad)
+    )
+
+
+@router.post("/cotizar", response_model=CotizacionResponse)
+async def cotizar(data: CotizacionRequest, db: SessionRunner = Depends(get_runner)):
+    return await db.run(lambda s: CanchaService(s).cotizar(data.items))
+
+
+@router.get("/tarifas", response_model=TarifaFranjaListResponse)
+async def listar_tarifas(
+    cancha_id: int | None = Query(None),
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
+):
+    return await db.run(lambda s: CanchaService(s).listar_tarifas(cancha_id))
+
+
+@router.post("/tarifas", response_model=TarifaFranjaCreateResponse, status_code=201)
+async def crear_tarifa(
+    data: TarifaFranjaCreate,
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
+):
+    return await db.run(lambda s: CanchaService(s).crear_tarifa(
+        cancha_id=data.cancha_id,
+        dia_semana=data.dia_semana,
+        hora_inicio=data.hora_inicio,
+        hora_fin=data.hora_fin,
+        precio_hora=data.precio_hora
+    ))
+
+
+@router.delete("/tarifas/{tarifa_id}", response_model=TarifaFranjaDeleteResponse)
+async def eliminar_tarifa(
+    tarifa_id: int,
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
+):
+    return await db.run(lambda s: CanchaService(s).eliminar_tarifa(tarifa_id))
+
+
+@router.get("/excepciones", response_model=HorarioExcepcionListResponse)
+async def listar_excepciones(
+    cancha_id: int | None = Query(None),
+    fecha_desde: date | None = Query(None),
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
+):
+    return await db.run(lambda s: CanchaService(s).listar_excepciones(cancha_id, fecha_desde))
+
+
+@router.post("/excepciones", response_model=HorarioExcepcionCreateResponse, status_code=201)
+async def crear_excepcion(
+    data: HorarioExcepcionCreate,
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
+):
+    return await db.run(lambda s: CanchaService(s).crear_excepcion(
+        fecha=data.fecha,
+        cancha_id=data.cancha_id,
+        cerrado=data.cerrado,
+        hora_inicio=data.hora_inicio,
+        hora_fin=data.hora_fin,
+        motivo=data.motivo
+    ))
+
+
+@router.delete("/excepciones/{excepcion_id}", response_model=HorarioExcepcionDeleteResponse)
+async def eliminar_excepcion(
+    excepcion_id: int,
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
+):
+    return await db.run(lambda s: CanchaService(s).eliminar_excepcion(excepcion_id))
+
+
 @router.get("/{cancha_id}", response_model=CanchaDetailResponse)
-def get_canha(
+async def get_canha(
     cancha_id: int,
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = CanchaService(db)
-    return service.get_detail(cancha_id)
+    return await db.run(lambda s: CanchaService(s).get_detail(cancha_id))
 
 
 @router.get("/{cancha_id}/disponibilidad", response_model=DisponibilidadResponse)
-def verificar_disponibilidad(
+async def verificar_disponibilidad(
     cancha_id: int,
     fecha: date = Query(...),
     hora_inicio: time = Query(...),
     hora_fin: time = Query(...),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = CanchaService(db)
-    return service.verificar_disponibilidad(cancha_id, fecha, hora_inicio, hora_fin)
+    return await db.run(
+        lambda s: CanchaService(s).verificar_disponibilidad(cancha_id, fecha, hora_inicio, hora_fin),
+        nativo=lambda s: CanchaServiceAsync(s).verificar_disponibilidad(cancha_id, fecha, hora_inicio, hora_fin)
+    )
+
+
+@router.put("/{cancha_id}/horarios", response_model=CanchaDetailResponse)
+async def actualizar_horarios(
+    cancha_id: int,
+    data: HorariosUpdate,
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
+):
+    return await db.run(lambda s: CanchaService(s).actualizar_horarios(cancha_id, data.horarios))
 
 
 @router.post("", response_model=CanchaCreateResponse)
-def crear_canha(
+async def crear_canha(
     data: CanchaCreate,
     current_user: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = CanchaService(db)
-    return service.crear(
+    return await db.run(lambda s: CanchaService(s).crear(
         nombre=data.nombre,
         tipo=data.tipo,
         precio_hora=data.precio_hora,
         capacidad=data.capacidad
-    )
+    ))
 
 
 @router.put("/{cancha_id}")
-def actualizar_canha(
+async def actualizar_canha(
     cancha_id: int,
     data: CanchaUpdate,
     current_user: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = CanchaService(db)
-    return service.actualizar(
+    return await db.run(lambda s: CanchaService(s).actualizar(
         cancha_id=cancha_id,
         nombre=data.nombre,
         tipo=data.tipo,
         precio_hora=data.precio_hora,
         capacidad=data.capacidad,
         is_active=data.is_active
-    )
+    ))
 
 
 @router.delete("/{cancha_id}", response_model=CanchaDeleteResponse)
-def eliminar_canha(
+async def eliminar_canha(
     cancha_id: int,
     current_user: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = CanchaService(db)
-    return service.eliminar(cancha_id)
+    return await db.run(lambda s: CanchaService(s).eliminar(cancha_id))
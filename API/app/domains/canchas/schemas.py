@@ -1,5 +1,6 @@
-from datetime import time
-from pydantic import BaseModel
+from datetime import date, time
+from typing import Literal
+from pydantic import BaseModel, Field, field_validator
 
 
 class HorarioBase(BaseModel):
@@ -8,6 +9,18 @@ class HorarioBase(BaseModel):
     hora_fin: time
 
 
+class HorariosUpdate(BaseModel):
+    # Varias filas con el mismo dia_semana forman un horario partido.
+    horarios: list[HorarioBase]
+
+    @field_validator("horarios")
+    @classmethod
+    def validate_dias(cls, horarios: list[HorarioBase]) -> list[HorarioBase]:
+        if any(not 0 <= h.dia_semana <= 6 for h in horarios):
+            raise ValueError("dia_semana debe estar entre 0 (Domingo) y 6 (Sábado)")
+        return horarios
+
+
 class HorarioResponse(HorarioBase):
     id: int
     dia_nombre: str | None = None
@@ -82,3 +95,118 @@ class DisponibilidadResponse(BaseModel):
     duracion_label: str | None = None
     precio_total: float | None = None
     mensaje: str | None = None
+
+
+class DisponibilidadDia(BaseModel):
+    fecha: date
+    # Alineado con DisponibilidadGrillaResponse.horas.
+    estados: list[Literal["libre", "ocupado", "cerrado"]]
+
+
+class DisponibilidadCancha(BaseModel):
+    id: int
+    nombre: str
+    tipo: str
+    precio_hora: float
+    dias: list[DisponibilidadDia]
+
+
+class DisponibilidadGrillaResponse(BaseModel):
+    status: int = 200
+    fecha_desde: date
+    fecha_hasta: date
+    granularidad_minutos: int
+    horas: list[str]
+    canchas: list[DisponibilidadCancha]
+
+
+MAX_ITEMS_COTIZACION = 1000
+
+
+class CotizacionItem(BaseModel):
+    cancha_id: int
+    fecha: date
+    hora_inicio: time
+    hora_fin: time
+
+
+class CotizacionRequest(BaseModel):
+    items: list[CotizacionItem] = Field(..., min_length=1, max_length=MAX_ITEMS_COTIZACION)
+
+
+class CotizacionResultado(CotizacionItem):
+    precio_total: float | None = None
+    motivo: str | None = None
+
+
+class CotizacionResponse(BaseModel):
+    status: int = 200
+    cotizaciones: list[CotizacionResultado]
+
+
+class TarifaFranjaCreate(BaseModel):
+    cancha_id: int | None = None
+    dia_semana: int | None = Field(None, ge=0, le=6)
+    hora_inicio: time
+    hora_fin: time
+    precio_hora: float
+
+
+class TarifaFranjaResponse(BaseModel):
+    id: int
+    cancha_id: int | None = None
+    dia_semana: int | None = None
+    hora_inicio: str
+    hora_fin: str
+    precio_hora: float
+
+
+class TarifaFranjaListResponse(BaseModel):
+    status: int = 200
+    tarifas: list[TarifaFranjaResponse]
+
+
+class TarifaFranjaCreateResponse(BaseModel):
+    status: int = 201
+    message: str
+    tarifa: TarifaFranjaResponse
+
+
+class TarifaFranjaDeleteResponse(BaseModel):
+    status: int = 200
+    message: str
+
+
+class HorarioExcepcionCreate(BaseModel):
+    cancha_id: int | None = None
+    fecha: date
+    cerrado: bool = True
+    hora_inicio: time | None = None
+    hora_fin: time | None = None
+    motivo: str | None = None
+
+
+class HorarioExcepcionResponse(BaseModel):
+    id: int
+    cancha_id: int | None = None
+    fecha: date
+    cerrado: bool
+    hora_inicio: str | None = None
+    hora_fin: str | None = None
+    motivo: str | None = None
+
+
+class HorarioExcepcionListResponse(BaseModel):
+    status: int = 200
+    excepciones: list[HorarioExcepcionResponse]
+
+
+class HorarioExcepcionCreateResponse(BaseModel):
+    status: int = 201
+    message: str
+    excepcion: HorarioExcepcionResponse
+
+
+class HorarioExcepcionDeleteResponse(BaseModel):
+    status: int = 200
+    message: str
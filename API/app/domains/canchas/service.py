@@ -1,10 +1,56 @@
-from datetime import date, datetime, time
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from app.domains.canchas.models import Cancha, Horario
+from app.domains.canchas.models import Cancha, Horario, HorarioExcepcion, TarifaFranja
+from app.domains.canchas.agenda import agenda
+from app.domains.canchas.pricing import tarifario, quote_many
 from app.domains.reservas.models import Reserva, EstadoPago
+from app.domains.reservas.ocupacion import indice_ocupacion, hueco_libre
+from app.domains.reservas.slots import HORARIO_NO_ALINEADO, SLOT_MINUTOS, alineada
+from app.domains.reportes.service import invalidar_reportes
+from app.core.cache import TTLCache
 from app.core.exceptions import NotFoundException, ConflictException, ValidationException
 
+MAX_DIAS_GRILLA = 31
+MINUTOS_DIA = 24 * 60
+
+# (cancha_id, fecha) -> datos del dia para verificar_disponibilidad;
+# (cancha_id, None) -> respuesta de get_detail. Se invalida tras cada escritura
+# de reservas o de la cancha; el TTL acota lo que tarda en verse un cambio
+# hecho por otro proceso.
+disponibilidad_cache = TTLCache(maxsize=4096, ttl=60)
+
+
+def invalidar_disponibilidad(cancha_id: int, fechas=None) -> None:
+    """Drop cached availability for the given days, or everything cached for the court."""
+    if fechas is None:
+        disponibilidad_cache.invalidate_where(lambda key: key[0] == cancha_id)
+        return
+    for fecha in set(fechas):
+        disponibilidad_cache.invalidate((cancha_id, fecha))
+
+
+def _datos_dia(cancha: Cancha, ocupados: list[tuple[int, int]]) -> dict:
+    return {"cancha": {"id": cancha.id, "nombre": cancha.nombre}, "ocupados": ocupados}
+
+
+def _no_disponible(dia: dict, mensaje: str) -> dict:
+    return {"status": 200, "disponible": False, "cancha": dict(dia["cancha"]), "mensaje": mensaje}
+
+
+def _disponible(dia: dict, fecha: date, hora_inicio: time, hora_fin: time, precio_total: float | None) -> dict:
+    duracion_horas = (datetime.combine(fecha, hora_fin) - datetime.combine(fecha, hora_inicio)).seconds / 3600
+    return {
+        "status": 200,
+        "disponible": True,
+        "cancha": dict(dia["cancha"]),
+        "horas_duracion": int(duracion_horas),
+        "duracion_label": f"{int(duracion_horas)} horas",
+        "precio_total": precio_total
+    }
+
 
 class CanchaService:
     def __init__(self, db: Session):
@@ -20,10 +66,14 @@ class CanchaService:
         return cancha
 
     def get_detail(self, cancha_id: int) -> dict:
+        return disponibilidad_cache.get_or_set((cancha_id, None), lambda: self._detalle(cancha_id))
+
+    def _detalle(self, cancha_id: int) -> dict:
         cancha = self.get_by_id(cancha_id)
         horarios = self.db.query(Horario).filter(Horario.cancha_id == cancha_id).all()
 
-        dia_nombres = ["", "Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+        # dia_semana usa 0=Domingo; 7 se conserva por datos antiguos.
+        dia_nombres = ["Domingo", "Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
 
         return {
             "id": cancha.id,
@@ -51,64 +101,257 @@ class CanchaService:
         hora_inicio: time,
         hora_fin: time
     ) -> dict:
-        cancha = self.get_by_id(cancha_id)
+        # Mismo criterio que ReservaService.crear: lo que aqui figura libre debe poder reservarse.
+        if not (alineada(hora_inicio) and alineada(hora_fin)):
+            raise ValidationException(HORARIO_NO_ALINEADO)
 
+        dia = disponibilidad_cache.get_or_set((cancha_id, fecha), lambda: self._datos_dia(cancha_id, fecha))
         if hora_fin <= hora_inicio:
-            return {
-                "status": 200,
-                "disponible": False,
-                "cancha": {"id": cancha.id, "nombre": cancha.nombre},
-                "mensaje": "La hora de fin debe ser posterior a la hora de inicio"
-            }
+            return _no_disponible(dia, "La hora de fin debe ser posterior a la hora de inicio")
+        if not agenda.permite(self.db, cancha_id, fecha, hora_inicio, hora_fin):
+            return _no_disponible(dia, "El horario seleccionado está fuera del horario de atención")
+        if not hueco_libre(dia["ocupados"], hora_inicio, hora_fin):
+            return _no_disponible(dia, "El horario seleccionado ya está reservado")
+        precio_total = tarifario.cotizar(self.db, cancha_id, fecha, hora_inicio, hora_fin)
+        return _disponible(dia, fecha, hora_inicio, hora_fin, precio_total)
 
-        dia_semana = fecha.weekday()
-        if dia_semana == 6:
-            dia_semana = 0
-        else:
-            dia_semana += 1
+    def _datos_dia(self, cancha_id: int, fecha: date) -> dict:
+        cancha = self.get_by_id(cancha_id)
+        # Se lee de la base y no del indice en memoria: asi el TTL de disponibilidad_cache
+        # es el unico tope de staleness frente a escrituras de otro proceso.
+        return _datos_dia(cancha, indice_ocupacion.intervalos_ocupados(self.db, cancha_id, fecha, recargar=True))
 
-        horario = self.db.query(Horario).filter(
-            Horario.cancha_id == cancha_id,
-            Horario.dia_semana == dia_semana
-        ).first()
+    def cotizar(self, items: list) -> dict:
+        """Price many candidate slots in one pass over the cached tariff tables."""
+        validos = [item for item in items if item.hora_fin > item.hora_inicio or item.hora_fin == time(0)]
+        precios = iter(quote_many(
+            self.db, [(i.cancha_id, i.fecha, i.hora_inicio, i.hora_fin) for i in validos]
+        ))
 
-        if horario and (hora_inicio < horario.hora_inicio or hora_fin > horario.hora_fin):
-            return {
-                "status": 200,
-                "disponible": False,
-                "cancha": {"id": cancha.id, "nombre": cancha.nombre},
-                "mensaje": "El horario seleccionado está fuera del horario de atención"
+        cotizaciones = []
+        for item in items:
+            cotizacion = {
+                "cancha_id": item.cancha_id,
+                "fecha": item.fecha,
+                "hora_inicio": item.hora_inicio,
+                "hora_fin": item.hora_fin,
+                "precio_total": None,
+                "motivo": None
             }
+            if item.hora_fin <= item.hora_inicio and item.hora_fin != time(0):
+                cotizacion["motivo"] = "La hora de fin debe ser posterior a la hora de inicio"
+            else:
+                cotizacion["precio_total"] = next(precios)
+                if cotizacion["precio_total"] is None:
+                    cotizacion["motivo"] = "Cancha no encontrada"
+            cotizaciones.append(cotizacion)
 
-        reservas_conflictivas = self.db.query(Reserva).filter(
-            Reserva.cancha_id == cancha_id,
-            Reserva.fecha == fecha,
-            Reserva.estado_pago != EstadoPago.LIBRE,
-            or_(
-                and_(Reserva.hora_inicio < hora_fin, Reserva.hora_fin > hora_inicio)
-            )
-        ).first()
+        return {"status": 200, "cotizaciones": cotizaciones}
 
-        if reservas_conflictivas:
-            return {
-                "status": 200,
-                "disponible": False,
-                "cancha": {"id": cancha.id, "nombre": cancha.nombre},
-                "mensaje": "El horario seleccionado ya está reservado"
-            }
+    def listar_tarifas(self, cancha_id: int | None = None) -> dict:
+        query = self.db.query(TarifaFranja)
+        if cancha_id is not None:
+            query = query.filter(TarifaFranja.cancha_id == cancha_id)
+        return {
+            "status": 200,
+            "tarifas": [self._format_tarifa(t) for t in query.order_by(TarifaFranja.id).all()]
+        }
 
-        inicio_dt = datetime.combine(fecha, hora_inicio)
-        fin_dt = datetime.combine(fecha, hora_fin)
-        duracion_horas = (fin_dt - inicio_dt).seconds / 3600
-        precio_total = float(cancha.precio_hora) * duracion_horas
+    def crear_tarifa(
+        self,
+        cancha_id: int | None,
+        dia_semana: int | None,
+        hora_inicio: time,
+        hora_fin: time,
+        precio_hora: float
+    ) -> dict:
+        if precio_hora <= 0:
+            raise ValidationException("El precio por hora debe ser mayor a 0")
+        if hora_fin <= hora_inicio and hora_fin != time(0):
+            raise ValidationException("La hora de fin debe ser posterior a la hora de inicio")
+        if cancha_id is not None:
+            self.get_by_id(cancha_id)
+
+        tarifa = TarifaFranja(
+            cancha_id=cancha_id,
+            dia_semana=dia_semana,
+            hora_inicio=hora_inicio,
+            hora_fin=hora_fin,
+            precio_hora=precio_hora
+        )
+        self.db.add(tarifa)
+        self.db.commit()
+        self.db.refresh(tarifa)
+        tarifario.invalidar()
+
+        return {
+            "status": 201,
+            "message": "Tarifa creada exitosamente",
+            "tarifa": self._format_tarifa(tarifa)
+        }
+
+    def eliminar_tarifa(self, tarifa_id: int) -> dict:
+        tarifa = self.db.query(TarifaFranja).filter(TarifaFranja.id == tarifa_id).first()
+        if not tarifa:
+            raise NotFoundException("Tarifa no encontrada")
+
+        self.db.delete(tarifa)
+        self.db.commit()
+        tarifario.invalidar()
+
+        return {"status": 200, "message": "Tarifa eliminada exitosamente"}
 
+    def actualizar_horarios(self, cancha_id: int, horarios: list) -> dict:
+        """Replace the court's weekly horarios; a weekday may have several windows."""
+        self.get_by_id(cancha_id)
+        for h in horarios:
+            if h.hora_fin <= h.hora_inicio and h.hora_fin != time(0):
+                raise ValidationException("La hora de fin debe ser posterior a la hora de inicio")
+
+        self.db.query(Horario).filter(Horario.cancha_id == cancha_id).delete(synchronize_session=False)
+        self.db.add_all([
+            Horario(cancha_id=cancha_id, dia_semana=h.dia_semana, hora_inicio=h.hora_inicio, hora_fin=h.hora_fin)
+            for h in horarios
+        ])
+        self.db.flush()
+        # El delete masivo no pasa por el flush; se marca para refrescar la agenda al commit.
+        self.db.info.setdefault("horarios_cambiados", set()).add(cancha_id)
+        self.db.commit()
+
+        return self.get_detail(cancha_id)
+
+    def listar_excepciones(self, cancha_id: int | None = None, fecha_desde: date | None = None) -> dict:
+        query = self.db.query(HorarioExcepcion)
+        if cancha_id is not None:
+            query = query.filter(HorarioExcepcion.cancha_id == cancha_id)
+        if fecha_desde is not None:
+            query = query.filter(HorarioExcepcion.fecha >= fecha_desde)
         return {
             "status": 200,
-            "disponible": True,
-            "cancha": {"id": cancha.id, "nombre": cancha.nombre},
-            "horas_duracion": int(duracion_horas),
-            "duracion_label": f"{int(duracion_horas)} horas",
-            "precio_total": precio_total
+            "excepciones": [
+                self._format_excepcion(e)
+                for e in query.order_by(HorarioExcepcion.fecha, HorarioExcepcion.id).all()
+            ]
+        }
+
+    def crear_excepcion(
+        self,
+        fecha: date,
+        cancha_id: int | None = None,
+        cerrado: bool = True,
+        hora_inicio: time | None = None,
+        hora_fin: time | None = None,
+        motivo: str | None = None
+    ) -> dict:
+        if not cerrado:
+            if hora_inicio is None or hora_fin is None:
+                raise ValidationException("Un horario especial debe indicar hora de inicio y de fin")
+            if hora_fin <= hora_inicio and hora_fin != time(0):
+                raise ValidationException("La hora de fin debe ser posterior a la hora de inicio")
+        if cancha_id is not None:
+            self.get_by_id(cancha_id)
+
+        excepcion = HorarioExcepcion(
+            cancha_id=cancha_id,
+            fecha=fecha,
+            cerrado=cerrado,
+            hora_inicio=None if cerrado else hora_inicio,
+            hora_fin=None if cerrado else hora_fin,
+            motivo=motivo
+        )
+        self.db.add(excepcion)
+        self.db.commit()
+        self.db.refresh(excepcion)
+
+        return {
+            "status": 201,
+            "message": "Excepción de horario creada exitosamente",
+            "excepcion": self._format_excepcion(excepcion)
+        }
+
+    def eliminar_excepcion(self, excepcion_id: int) -> dict:
+        excepcion = self.db.query(HorarioExcepcion).filter(HorarioExcepcion.id == excepcion_id).first()
+        if not excepcion:
+            raise NotFoundException("Excepción de horario no encontrada")
+
+        self.db.delete(excepcion)
+        self.db.commit()
+
+        return {"status": 200, "message": "Excepción de horario eliminada exitosamente"}
+
+    def grilla_disponibilidad(
+        self,
+        fecha_desde: date,
+        fecha_hasta: date,
+        tipo: str | None = None,
+        granularidad: int = 30
+    ) -> dict:
+        """Free/occupied/closed matrix for every active court over a date range.
+
+        Built from one courts query, one reservations query and the compiled
+        agenda; a weekday without horario is open all day.
+        """
+        if fecha_hasta < fecha_desde:
+            raise ValidationException("fecha_desde debe ser anterior o igual a fecha_hasta")
+        if (fecha_hasta - fecha_desde).days >= MAX_DIAS_GRILLA:
+            raise ValidationException(f"El rango no puede superar {MAX_DIAS_GRILLA} días")
+        # Una celda que parte un slot no coincide con ningun horario reservable.
+        if granularidad % SLOT_MINUTOS:
+            raise ValidationException(f"La granularidad debe ser múltiplo de {SLOT_MINUTOS} minutos")
+        if MINUTOS_DIA % granularidad:
+            raise ValidationException("La granularidad debe dividir el día en slots exactos")
+
+        query = self.db.query(Cancha).filter(Cancha.is_active == True)
+        if tipo:
+            query = query.filter(Cancha.tipo == tipo)
+        canchas = {cancha.id: cancha for cancha in query.order_by(Cancha.id).all()}
+
+        ocupados: dict[tuple[int, date], list[tuple[int, int]]] = defaultdict(list)
+        if canchas:
+            reservas = self.db.query(
+                Reserva.cancha_id, Reserva.fecha, Reserva.hora_inicio, Reserva.hora_fin
+            ).filter(
+                Reserva.cancha_id.in_(canchas.keys()),
+                Reserva.fecha >= fecha_desde,
+                Reserva.fecha <= fecha_hasta,
+                Reserva.estado_pago != EstadoPago.LIBRE
+            ).all()
+            for r in reservas:
+                ocupados[(r.cancha_id, r.fecha)].append((_minutos(r.hora_inicio), _minutos(r.hora_fin)))
+
+        n_slots = MINUTOS_DIA // granularidad
+        fechas = [fecha_desde + timedelta(days=i) for i in range((fecha_hasta - fecha_desde).days + 1)]
+
+        resultado = []
+        for cancha_id, cancha in canchas.items():
+            dias = []
+            for fecha in fechas:
+                ventanas = agenda.ventanas(self.db, cancha_id, fecha)
+                if ventanas is not None:
+                    # A minutos; los bordes que no caen en minuto exacto se recortan hacia adentro.
+                    ventanas = [(-(-inicio // 60), fin // 60) for inicio, fin in ventanas]
+                estados = self._estados_dia(
+                    ventanas,
+                    ocupados.get((cancha_id, fecha), []),
+                    granularidad,
+                    n_slots
+                )
+                dias.append({"fecha": fecha, "estados": estados})
+            resultado.append({
+                "id": cancha.id,
+                "nombre": cancha.nombre,
+                "tipo": cancha.tipo,
+                "precio_hora": float(cancha.precio_hora),
+                "dias": dias
+            })
+
+        return {
+            "status": 200,
+            "fecha_desde": fecha_desde,
+            "fecha_hasta": fecha_hasta,
+            "granularidad_minutos": granularidad,
+            "horas": [f"{m // 60:02d}:{m % 60:02d}" for m in range(0, MINUTOS_DIA, granularidad)],
+            "canchas": resultado
         }
 
     def crear(self, nombre: str, tipo: str, precio_hora: float, capacidad: int) -> dict:
@@ -126,6 +369,8 @@ class CanchaService:
         self.db.add(cancha)
         self.db.commit()
         self.db.refresh(cancha)
+        # Los reportes listan las canchas activas por nombre.
+        invalidar_reportes()
 
         return {
             "status": 201,
@@ -168,6 +413,10 @@ class CanchaService:
 
         self.db.commit()
         self.db.refresh(cancha)
+        invalidar_disponibilidad(cancha_id)
+        invalidar_reportes()
+        if precio_hora is not None:
+            tarifario.invalidar()
 
         return {
             "status": 200,
@@ -211,6 +460,8 @@ class CanchaService:
         cancha.is_active = False
         self.db.commit()
         self.db.refresh(cancha)
+        invalidar_disponibilidad(cancha_id)
+        invalidar_reportes()
 
         return {
             "status": 200,
@@ -224,3 +475,89 @@ class CanchaService:
                 "is_active": cancha.is_active
             }
         }
+
+    def _format_tarifa(self, tarifa: TarifaFranja) -> dict:
+        return {
+            "id": tarifa.id,
+            "cancha_id": tarifa.cancha_id,
+            "dia_semana": tarifa.dia_semana,
+            "hora_inicio": tarifa.hora_inicio.strftime("%H:%M"),
+            "hora_fin": tarifa.hora_fin.strftime("%H:%M"),
+            "precio_hora": float(tarifa.precio_hora)
+        }
+
+    def _format_excepcion(self, excepcion: HorarioExcepcion) -> dict:
+        return {
+            "id": excepcion.id,
+            "cancha_id": excepcion.cancha_id,
+            "fecha": excepcion.fecha,
+            "cerrado": excepcion.cerrado,
+            "hora_inicio": excepcion.hora_inicio.strftime("%H:%M") if excepcion.hora_inicio else None,
+            "hora_fin": excepcion.hora_fin.strftime("%H:%M") if excepcion.hora_fin else None,
+            "motivo": excepcion.motivo
+        }
+
+    @staticmethod
+    def _estados_dia(
+        ventanas: list[tuple[int, int]] | None,
+        ocupados: list[tuple[int, int]],
+        granularidad: int,
+        n_slots: int
+    ) -> list[str]:
+        if ventanas is None:
+            estados = ["libre"] * n_slots
+        else:
+            # Un slot solo esta abierto si cae entero dentro de una ventana de atencion.
+            estados = ["cerrado"] * n_slots
+            for inicio, fin in ventanas:
+                for slot in range(-(-inicio // granularidad), fin // granularidad):
+                    estados[slot] = "libre"
+
+        for inicio, fin in ocupados:
+            for slot in range(inicio // granularidad, min(-(-fin // granularidad), n_slots)):
+                estados[slot] = "ocupado"
+        return estados
+
+
+def _minutos(hora: time) -> int:
+    return hora.hour * 60 + hora.minute
+
+
+class CanchaServiceAsync:
+    """The availability check for DB_ASYNC, with its round trips awaited on the async driver.
+
+    Same cache, checks and response as CanchaService.verificar_disponibilidad;
+    warm, it does not touch the database at all.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def verificar_disponibilidad(
+        self,
+        cancha_id: int,
+        fecha: date,
+        hora_inicio: time,
+        hora_fin: time
+    ) -> dict:
+        if not (alineada(hora_inicio) and alineada(hora_fin)):
+            raise ValidationException(HORARIO_NO_ALINEADO)
+
+        dia = await disponibilidad_cache.get_or_set_async(
+            (cancha_id, fecha), lambda: self._datos_dia(cancha_id, fecha)
+        )
+        if hora_fin <= hora_inicio:
+            return _no_disponible(dia, "La hora de fin debe ser posterior a la hora de inicio")
+        if not await agenda.permite_async(self.db, cancha_id, fecha, hora_inicio, hora_fin):
+            return _no_disponible(dia, "El horario seleccionado está fuera del horario de atención")
+        if not hueco_libre(dia["ocupados"], hora_inicio, hora_fin):
+            return _no_disponible(dia, "El horario seleccionado ya está reservado")
+        precio_total = await tarifario.cotizar_async(self.db, cancha_id, fecha, hora_inicio, hora_fin)
+        return _disponible(dia, fecha, hora_inicio, hora_fin, precio_total)
+
+    async def _datos_dia(self, cancha_id: int, fecha: date) -> dict:
+        cancha = await self.db.scalar(select(Cancha).where(Cancha.id == cancha_id))
+        if not cancha:
+            raise NotFoundException("Cancha no encontrada")
+        ocupados = await indice_ocupacion.intervalos_ocupados_async(self.db, cancha_id, fecha, recargar=True)
+        return _datos_dia(cancha, ocupados)
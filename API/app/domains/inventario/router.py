@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 
-from app.database import SessionLocal
+from app.database import SessionRunner, get_runner
 from app.domains.auth.utils import get_current_admin
 from app.domains.inventario.schemas import (
     EquipoCreate,
@@ -19,64 +19,53 @@ router = APIRouter(prefix="/admin", tags=["Admin"])
 
 
 @router.post("/equipos", response_model=EquipoCreateResponse, status_code=201)
-def create_equipo(data: EquipoCreate, current_user: User = Depends(get_current_admin)):
-    db = SessionLocal()
-    try:
-        service = InventarioService(db)
-        return service.create(data)
-    finally:
-        db.close()
+async def create_equipo(
+    data: EquipoCreate,
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner),
+):
+    return await db.run(lambda s: InventarioService(s).create(data))
 
 
 @router.get("/equipos", response_model=EquipoListResponse)
-def list_equipos(current_user: User = Depends(get_current_admin)):
-    db = SessionLocal()
-    try:
-        service = InventarioService(db)
-        return service.list_all()
-    finally:
-        db.close()
+async def list_equipos(
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner),
+):
+    return await db.run(lambda s: InventarioService(s).list_all())
 
 
 @router.get("/equipos/{equipo_id}", response_model=EquipoDetailResponse)
-def get_equipo(equipo_id: int, current_user: User = Depends(get_current_admin)):
-    db = SessionLocal()
-    try:
-        service = InventarioService(db)
-        return service.get_detail(equipo_id)
-    finally:
-        db.close()
+async def get_equipo(
+    equipo_id: int,
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner),
+):
+    return await db.run(lambda s: InventarioService(s).get_detail(equipo_id))
 
 
 @router.patch("/equipos/{equipo_id}", response_model=EquipoUpdateResponse)
-def update_equipo(
+async def update_equipo(
     equipo_id: int,
     data: EquipoUpdate,
     current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner),
 ):
-    db = SessionLocal()
-    try:
-        service = InventarioService(db)
-        return service.update(equipo_id, data)
-    finally:
-        db.close()
+    return await db.run(lambda s: InventarioService(s).update(equipo_id, data))
 
 
 @router.delete("/equipos/{equipo_id}", response_model=EquipoDeleteResponse)
-def delete_equipo(equipo_id: int, current_user: User = Depends(get_current_admin)):
-    db = SessionLocal()
-    try:
-        service = InventarioService(db)
-        return service.soft_delete(equipo_id)
-    finally:
-        db.close()
+async def delete_equipo(
+    equipo_id: int,
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner),
+):
+    return await db.run(lambda s: InventarioService(s).soft_delete(equipo_id))
 
 
 @router.get("/inventario", response_model=InventarioSummaryResponse)
-def get_inventory_summary(current_user: User = Depends(get_current_admin)):
-    db = SessionLocal()
-    try:
-        service = InventarioService(db)
-        return service.get_summary()
-    finally:
-        db.close()
+async def get_inventory_summary(
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner),
+):
+    return await db.run(lambda s: InventarioService(s).get_summary())
@@ -0,0 +1,95 @@
+from tempfile import SpooledTemporaryFile
+from typing import IO, Iterator
+
+# Libros chicos quedan en memoria; uno grande pasa a disco al superar este tamanio.
+EXCEL_SPOOL_BYTES = 8 * 1024 * 1024
+EXCEL_CHUNK_BYTES = 64 * 1024
+# Limite de filas de una hoja de Excel, encabezado incluido.
+MAX_FILAS_HOJA = 1_048_576
+
+RESERVAS_COLUMNAS = [
+    "ID", "Fecha", "Hora Inicio", "Hora Fin", "Cancha", "Cliente", "Jugadores", "Estado de Pago", "Precio Total"
+]
+
+
+def generar_excel(
+    ocupacion_data: dict,
+    horarios_data: dict,
+    clientes_data: dict,
+    daily_data: dict,
+    reservas: Iterator[list] | None = None
+) -> IO[bytes]:
+    """Write the report workbook in write-only mode into a spooled temporary file.
+
+    Write-only sheets are flushed row by row, so memory stays flat no matter
+    how many rows `reservas` yields. The returned file is positioned at the
+    start; the caller must close it.
+    """
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+
+    ws_daily = workbook.create_sheet("Daily")
+    ws_daily.append(["Fecha", "Reservas", "Ingreso Total"])
+    for item in daily_data.get("daily", []):
+        ws_daily.append([item["fecha"], item["reservas_count"], item["ingreso_total"]])
+
+    ws_ocup = workbook.create_sheet("Ocupacion")
+    ws_ocup.append(["Cancha", "Horas Reservadas", "Horas Disponibles", "Ocupación %"])
+    for item in ocupacion_data.get("ocupacion", []):
+        ws_ocup.append(
+            [
+                item["cancha_nombre"],
+                item["horas_reservadas"],
+                item["horas_disponibles"],
+                item["ocupacion_pct"],
+            ]
+        )
+
+    ws_horarios = workbook.create_sheet("HorariosPico")
+    ws_horarios.append(["Hora", "Cantidad de Reservas"])
+    for item in horarios_data.get("horarios", []):
+        ws_horarios.append([item["hora"], item["cantidad"]])
+
+    ws_clientes = workbook.create_sheet("ClientesFrecuentes")
+    ws_clientes.append(["Cliente", "Total Reservas", "Total Gastado"])
+    for item in clientes_data.get("clientes", []):
+        ws_clientes.append([item["cliente_nombre"], item["total_reservas"], item["total_gastado"]])
+
+    if reservas is not None:
+        _escribir_reservas(workbook, reservas)
+
+    archivo = SpooledTemporaryFile(max_size=EXCEL_SPOOL_BYTES)
+    try:
+        workbook.save(archivo)
+    except Exception:
+        archivo.close()
+        raise
+    archivo.seek(0)
+    return archivo
+
+
+def _escribir_reservas(workbook, reservas: Iterator[list]) -> None:
+    """Detail sheet; rows past Excel's sheet limit continue on "Reservas (2)", "Reservas (3)"..."""
+    hoja = None
+    numero = 0
+    filas = MAX_FILAS_HOJA
+    for fila in reservas:
+        if filas >= MAX_FILAS_HOJA:
+            numero += 1
+            hoja = workbook.create_sheet("Reservas" if numero == 1 else f"Reservas ({numero})")
+            hoja.append(RESERVAS_COLUMNAS)
+            filas = 1
+        hoja.append(fila)
+        filas += 1
+    if hoja is None:
+        workbook.create_sheet("Reservas").append(RESERVAS_COLUMNAS)
+
+
+def leer_por_bloques(archivo: IO[bytes]) -> Iterator[bytes]:
+    """Stream a file in EXCEL_CHUNK_BYTES chunks and close it when done or abandoned."""
+    try:
+        while bloque := archivo.read(EXCEL_CHUNK_BYTES):
+            yield bloque
+    finally:
+        archivo.close()
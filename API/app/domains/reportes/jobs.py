@@ -0,0 +1,298 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time as reloj
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterable
+
+from app.config import settings
+from app.core.exceptions import ConflictException, NotFoundException
+from app.domains.reportes.excel import generar_excel
+from app.domains.reportes.service import ReporteService
+
+logger = logging.getLogger(__name__)
+
+# tipo -> (extension, media type) del artefacto.
+FORMATOS = {
+    "excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "ocupacion": ("json", "application/json"),
+    "clientes-frecuentes": ("json", "application/json"),
+}
+
+PENDIENTE = "pendiente"
+EN_PROCESO = "en_proceso"
+COMPLETADO = "completado"
+ERROR = "error"
+
+
+def job_id(tipo: str, parametros: dict) -> str:
+    """Same report and parameters, same id: that is what de-duplicates jobs."""
+    clave = json.dumps({"tipo": tipo, **parametros}, sort_keys=True, default=str)
+    return hashlib.sha256(clave.encode()).hexdigest()[:32]
+
+
+class ColaReportes:
+    """In-process queue that generates reports on a thread pool and keeps results on disk.
+
+    Each job is identified by its parameters. Submitting a job that is
+    already pending or running returns it; a finished one is reused until
+    a reservation write touches its date range, it is evicted, or
+    regeneration is requested. Artifacts live in REPORTES_JOBS_DIR next to
+    a small metadata file, so finished results survive a restart; in-flight
+    state is per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: dict[str, dict] = {}
+        # jid -> metadatos de los resultados en disco, para invalidar por fecha sin listar el directorio.
+        self._en_disco: dict[str, dict] = {}
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def directorio(self) -> Path:
+        return Path(settings.REPORTES_JOBS_DIR)
+
+    def encolar(self, tipo: str, parametros: dict, regenerar: bool = False) -> dict:
+        if tipo not in FORMATOS:
+            raise NotFoundException(f"Tipo de reporte desconocido: {tipo}")
+        jid = job_id(tipo, parametros)
+
+        with self._lock:
+            job = self._jobs.get(jid) or self._leer_meta(jid)
+            if job is not None and job["estado"] in (PENDIENTE, EN_PROCESO):
+                return dict(job)
+            reutilizable = job is not None and job["estado"] == COMPLETADO and not job.get("obsoleto")
+            if reutilizable and not regenerar and self._artefacto(job).exists():
+                self._jobs[jid] = job
+                return dict(job)
+
+            job = {
+                "id": jid,
+                "tipo": tipo,
+                "parametros": parametros,
+                "estado": PENDIENTE,
+                "progreso": 0,
+                "error": None,
+                "creado_at": datetime.utcnow(),
+                "finalizado_at": None,
+            }
+            self._jobs[jid] = job
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.REPORTES_JOBS_WORKERS, thread_name_prefix="reportes-job"
+                )
+            self._executor.submit(self._ejecutar, jid)
+            return dict(job)
+
+    def estado(self, jid: str) -> dict:
+        with self._lock:
+            job = self._jobs.get(jid) or self._leer_meta(jid)
+            if job is None:
+                raise NotFoundException("Job de reporte no encontrado")
+            return dict(job)
+
+    def artefacto(self, jid: str) -> tuple[Path, str, str]:
+        """Return (path, media type, download name) of a finished job."""
+        job = self.estado(jid)
+        if job["estado"] != COMPLETADO:
+            raise ConflictException(f"El reporte no está listo (estado: {job['estado']})")
+        ruta = self._artefacto(job)
+        if not ruta.exists():
+            raise NotFoundException("El resultado del reporte ya no está disponible")
+        extension, media_type = FORMATOS[job["tipo"]]
+        parametros = job["parametros"]
+        nombre = f"{job['tipo']}_{parametros['fecha_desde']}_{parametros['fecha_hasta']}.{extension}"
+        return ruta, media_type, nombre
+
+    def invalidar(self, fechas: Iterable[date] | None = None) -> None:
+        """Drop finished results whose range covers any of `fechas`; all of them when None.
+
+        Jobs still running over those dates finish for whoever is waiting on
+        them, but are not reused afterwards. Only results this process knows
+        about are checked, so no directory listing happens on the write path;
+        `purgar` picks up the ones other processes wrote.
+        """
+        fechas = None if fechas is None else {f.isoformat() for f in fechas}
+
+        def cubre(parametros: dict) -> bool:
+            return fechas is None or any(parametros["fecha_desde"] <= f <= parametros["fecha_hasta"] for f in fechas)
+
+        with self._lock:
+            activos = set()
+            for jid, job in self._jobs.items():
+                if job["estado"] in (PENDIENTE, EN_PROCESO):
+                    activos.add(jid)
+                    if cubre(job["parametros"]):
+                        job["obsoleto"] = True
+            for jid, job in list(self._en_disco.items()):
+                # Un job regenerandose reemplaza su propio resultado al terminar.
+                if jid not in activos and cubre(job["parametros"]):
+                    self._jobs.pop(jid, None)
+                    self._descartar(job)
+
+    def purgar(self) -> None:
+        """Evict finished artifacts older than the TTL, then the oldest ones until under the size cap.
+
+        Failed jobs are kept in memory for the same TTL, so clients polling
+        them can read the error, and then dropped.
+        """
+        limite_edad = reloj.time() - settings.REPORTES_JOBS_TTL_HORAS * 3600
+        with self._lock:
+            vencidos = datetime.utcnow() - timedelta(hours=settings.REPORTES_JOBS_TTL_HORAS)
+            for jid, job in list(self._jobs.items()):
+                if job["estado"] == ERROR and job["finalizado_at"] < vencidos:
+                    del self._jobs[jid]
+            if not self.directorio.exists():
+                return
+            activos = {jid for jid, job in self._jobs.items() if job["estado"] in (PENDIENTE, EN_PROCESO)}
+            artefactos = []
+            metas = set()
+            for ruta in self.directorio.iterdir():
+                jid = ruta.name.split(".", 1)[0]
+                if ruta.suffix == ".meta":
+                    metas.add(jid)
+                    continue
+                # Un .tmp de un job que no esta activo es resto de un proceso caido: se purga igual.
+                if jid in activos:
+                    continue
+                stat = ruta.stat()
+                artefactos.append((stat.st_mtime, stat.st_size, jid))
+
+            artefactos.sort()
+            total = sum(tamanio for _, tamanio, _ in artefactos)
+            for mtime, tamanio, jid in artefactos:
+                if mtime >= limite_edad and total <= settings.REPORTES_JOBS_MAX_MB * 1024 * 1024:
+                    break
+                self._borrar(jid)
+                total -= tamanio
+
+            # Resultados escritos por otros procesos o antes de un reinicio: se registran para invalidar.
+            for jid in metas - self._en_disco.keys():
+                self._leer_meta(jid)
+            for jid in self._en_disco.keys() - metas:
+                del self._en_disco[jid]
+
+    def _ejecutar(self, jid: str) -> None:
+        with self._lock:
+            job = self._jobs[jid]
+            job["estado"] = EN_PROCESO
+
+        def avanzar(progreso: int) -> None:
+            with self._lock:
+                job["progreso"] = progreso
+
+        # Sesion sync propia del hilo del worker, como /reservas/export.
+        from app.database import SessionLocal
+        session = SessionLocal()
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            ruta = self._artefacto(job)
+            temporal = ruta.with_name(ruta.name + ".tmp")
+            GENERADORES[job["tipo"]](ReporteService(session), job["parametros"], temporal, avanzar)
+            # El reemplazo atomico evita servir un archivo a medio escribir.
+            os.replace(temporal, ruta)
+            with self._lock:
+                job.update(estado=COMPLETADO, progreso=100, finalizado_at=datetime.utcnow())
+                # Si una escritura toco el rango durante la generacion, el resultado se entrega
+                # a quien lo espera pero no queda en disco para otros pedidos.
+                if job.get("obsoleto"):
+                    self._en_disco.pop(jid, None)
+                    (self.directorio / f"{jid}.meta").unlink(missing_ok=True)
+                else:
+                    self._escribir_meta(job)
+        except Exception as exc:
+            logger.exception(f"Fallo el job de reporte {jid}")
+            with self._lock:
+                job.update(estado=ERROR, error=str(exc), finalizado_at=datetime.utcnow())
+        finally:
+            session.close()
+        self.purgar()
+
+    def _artefacto(self, job: dict) -> Path:
+        return self.directorio / f"{job['id']}.{FORMATOS[job['tipo']][0]}"
+
+    def _escribir_meta(self, job: dict) -> None:
+        (self.directorio / f"{job['id']}.meta").write_text(json.dumps(job, default=str))
+        self._en_disco[job["id"]] = dict(job)
+
+    def _leer_meta(self, jid: str) -> dict | None:
+        ruta = self.directorio / f"{jid}.meta"
+        if not jid.isalnum() or not ruta.exists():
+            return None
+        job = json.loads(ruta.read_text())
+        job["creado_at"] = datetime.fromisoformat(job["creado_at"])
+        job["finalizado_at"] = datetime.fromisoformat(job["finalizado_at"])
+        self._en_disco[jid] = dict(job)
+        return job
+
+    def _descartar(self, job: dict) -> None:
+        """Delete a finished result and its metadata, leaving any in-progress .tmp alone."""
+        self._en_disco.pop(job["id"], None)
+        self._artefacto(job).unlink(missing_ok=True)
+        (self.directorio / f"{job['id']}.meta").unlink(missing_ok=True)
+
+    def _borrar(self, jid: str) -> None:
+        self._jobs.pop(jid, None)
+        self._en_disco.pop(jid, None)
+        for ruta in self.directorio.glob(f"{jid}.*"):
+            ruta.unlink(missing_ok=True)
+
+
+def _generar_excel(service: ReporteService, p: dict, destino: Path, avanzar: Callable[[int], None]) -> None:
+    fecha_desde, fecha_hasta = date.fromisoformat(p["fecha_desde"]), date.fromisoformat(p["fecha_hasta"])
+    cancha_id = p["cancha_id"]
+
+    ocupacion = service.get_ocupacion(fecha_desde, fecha_hasta, cancha_id)
+    avanzar(10)
+    horarios = service.get_horarios_pico(fecha_desde, fecha_hasta, cancha_id)
+    avanzar(20)
+    clientes = service.get_clientes_frecuentes(fecha_desde, fecha_hasta, cancha_id)
+    avanzar(30)
+    daily = service.get_daily(fecha_desde, fecha_hasta, cancha_id)
+    avanzar(40)
+
+    reservas = None
+    if p["incluir_reservas"]:
+        # El total sale del reporte diario, que ya se calculo.
+        total = sum(item["reservas_count"] for item in daily["daily"]) or 1
+
+        def con_progreso():
+            for n, fila in enumerate(service.iterar_reservas(fecha_desde, fecha_hasta, cancha_id), 1):
+                if n % 1000 == 0:
+                    avanzar(40 + min(50, 50 * n // total))
+                yield fila
+
+        reservas = con_progreso()
+
+    archivo = generar_excel(ocupacion, horarios, clientes, daily, reservas)
+    try:
+        avanzar(95)
+        with open(destino, "wb") as salida:
+            shutil.copyfileobj(archivo, salida)
+    finally:
+        archivo.close()
+
+
+def _generar_json(metodo: str):
+    def generar(service: ReporteService, p: dict, destino: Path, avanzar: Callable[[int], None]) -> None:
+        resultado = getattr(service, metodo)(
+            date.fromisoformat(p["fecha_desde"]), date.fromisoformat(p["fecha_hasta"]), p["cancha_id"]
+        )
+        avanzar(90)
+        destino.write_text(json.dumps(resultado, ensure_ascii=False, default=str))
+    return generar
+
+
+GENERADORES = {
+    "excel": _generar_excel,
+    "ocupacion": _generar_json("get_ocupacion"),
+    "clientes-frecuentes": _generar_json("get_clientes_frecuentes"),
+}
+
+cola_reportes = ColaReportes()
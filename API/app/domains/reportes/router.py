@@ -1,250 +1,322 @@
 from datetime import date, timedelta
-from io import BytesIO
+from typing import Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
-from app.database import get_db
+from app.database import SessionRunner, get_runner
 from app.domains.auth.utils import get_current_admin
 from app.domains.users.models import User
-from app.domains.reportes.service import ReporteService
+from app.domains.reportes.service import ReporteService, ReporteServiceAsync, dashboard_cache, reportes_cache
+from app.domains.reportes.excel import generar_excel, leer_por_bloques
+from app.domains.reportes.jobs import cola_reportes
 from app.domains.reportes.schemas import (
     DashboardResponse, ReporteSemanaResponse, ReporteIngresosResponse,
-    AdminReservaListResponse, OcupacionResponse, HorariosPicoResponse,
-    ClientesFrecuentesResponse, DailyResponse
+    AdminReservaListResponse, OcupacionResponse, HorariosPicoResponse, HeatmapResponse,
+    ClientesFrecuentesResponse, DailyResponse, CacheStatsResponse,
+    ReporteJobCreate, ReporteJobResponse
 )
-from app.domains.reservas.service import ReservaService
+from app.domains.canchas.service import disponibilidad_cache
+from app.domains.reservas.models import EstadoPago
+from app.domains.reservas.service import ReservaService, ReservaServiceAsync, totales_cache
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 
 @router.get("/dashboard", response_model=DashboardResponse)
-def get_dashboard(current_user: User = Depends(get_current_admin)):
-    from app.database import SessionLocal
-    db = SessionLocal()
-    try:
-        service = ReporteService(db)
-        return service.get_stats()
-    finally:
-        db.close()
+async def get_dashboard(
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
+):
+    return await db.run(lambda s: ReporteService(s).get_stats(), nativo=lambda s: ReporteServiceAsync(s).get_stats())
+
+
+@router.get("/cache/stats", response_model=CacheStatsResponse)
+async def get_cache_stats(current_user: User = Depends(get_current_admin)):
+    return {
+        "status": 200,
+        "caches": {
+            "disponibilidad": disponibilidad_cache.stats(),
+            "totales_reservas": totales_cache.stats(),
+            "dashboard": dashboard_cache.stats(),
+            "reportes": reportes_cache.stats()
+        }
+    }
 
 
 @router.get("/reportes/reservas-semana", response_model=ReporteSemanaResponse)
-def get_reporte_semana(
+async def get_reporte_semana(
     fecha_inicio: date = Query(...),
     fecha_fin: date = Query(...),
-    current_user: User = Depends(get_current_admin)
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
 ):
-    from app.database import SessionLocal
-    db = SessionLocal()
-    try:
-        service = ReporteService(db)
-        return service.get_reservas_semana(fecha_inicio, fecha_fin)
-    finally:
-        db.close()
+    return await db.run(lambda s: ReporteService(s).get_reservas_semana(fecha_inicio, fecha_fin))
 
 
-@router.get("/reportes/ingresos", response_model=ReporteIngresosResponse)
-def get_reporte_ingresos(
+@router.get("/reportes/ingresos", response_model=ReporteIngresosResponse, response_model_exclude_none=True)
+async def get_reporte_ingresos(
     fecha_desde: date = Query(...),
     fecha_hasta: date = Query(...),
-    current_user: User = Depends(get_current_admin)
+    cancha_id: int | None = Query(None),
+    agrupar: Literal["dia", "semana", "mes"] | None = Query(None),
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
 ):
-    from app.database import SessionLocal
-    db = SessionLocal()
-    try:
-        service = ReporteService(db)
-        return service.get_ingresos(fecha_desde, fecha_hasta)
-    finally:
-        db.close()
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
+
+    return await db.run(lambda s: ReporteService(s).get_ingresos(fecha_desde, fecha_hasta, cancha_id, agrupar))
 
 
 @router.get("/reservas", response_model=AdminReservaListResponse)
-def listar_todas_reservas(
+async def listar_todas_reservas(
     fecha: date | None = Query(None),
     cancha_id: int | None = Query(None),
     estado_pago: str | None = Query(None),
     usuario_id: int | None = Query(None),
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None),
+    incluir_total: bool = Query(True),
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
+):
+    filtros = dict(
+        fecha=fecha,
+        cancha_id=cancha_id,
+        estado_pago=estado_pago,
+        usuario_id=usuario_id,
+        page=page,
+        limit=limit,
+        cursor=cursor,
+        incluir_total=incluir_total
+    )
+    return await db.run(
+        lambda s: ReservaService(s).listar_todas(**filtros),
+        nativo=lambda s: ReservaServiceAsync(s).listar_todas(**filtros)
+    )
+
+
+@router.get("/reservas/export")
+def exportar_reservas(
+    formato: Literal["csv", "ndjson"] = Query("csv"),
+    fecha: date | None = Query(None),
+    cancha_id: int | None = Query(None),
+    # Tipado para que un valor invalido sea un 422 antes de que la respuesta empiece a enviarse.
+    estado_pago: EstadoPago | None = Query(None),
+    usuario_id: int | None = Query(None),
     current_user: User = Depends(get_current_admin)
 ):
-    from app.database import SessionLocal
-    db = SessionLocal()
-    try:
-        service = ReservaService(db)
-        return service.listar_todas(
-            fecha=fecha,
-            cancha_id=cancha_id,
-            estado_pago=estado_pago,
-            usuario_id=usuario_id,
-            page=page,
-            limit=limit
-        )
-    finally:
-        db.close()
+    def generar():
+        # La sesion vive lo que dure la respuesta, no solo la llamada al endpoint.
+        # Es sync aun con DB_ASYNC: StreamingResponse itera el generador en el threadpool.
+        from app.database import SessionLocal
+        db = SessionLocal()
+        try:
+            service = ReservaService(db)
+            yield from service.exportar(
+                formato=formato,
+                fecha=fecha,
+                cancha_id=cancha_id,
+                estado_pago=estado_pago,
+                usuario_id=usuario_id
+            )
+        finally:
+            db.close()
+
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    filename = f"reservas_{date.today().isoformat()}.{formato}"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+
+    return StreamingResponse(generar(), media_type=media_type, headers=headers)
 
 
 @router.get("/reportes/ocupacion", response_model=OcupacionResponse)
-def get_reporte_ocupacion(
+async def get_reporte_ocupacion(
     fecha_desde: date | None = Query(default=None),
     fecha_hasta: date | None = Query(default=None),
     cancha_id: int | None = Query(default=None),
-    current_user: User = Depends(get_current_admin)
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
 ):
-    from app.database import SessionLocal
-    db = SessionLocal()
-    try:
-        if fecha_desde is None:
-            fecha_desde = date.today() - timedelta(days=30)
-        if fecha_hasta is None:
-            fecha_hasta = date.today()
-        if fecha_desde > fecha_hasta:
-            raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
-
-        service = ReporteService(db)
-        return service.get_ocupacion(fecha_desde, fecha_hasta, cancha_id)
-    finally:
-        db.close()
+    if fecha_desde is None:
+        fecha_desde = date.today() - timedelta(days=30)
+    if fecha_hasta is None:
+        fecha_hasta = date.today()
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
+
+    return await db.run(lambda s: ReporteService(s).get_ocupacion(fecha_desde, fecha_hasta, cancha_id))
 
 
 @router.get("/reportes/horarios-pico", response_model=HorariosPicoResponse)
-def get_reporte_horarios_pico(
+async def get_reporte_horarios_pico(
     fecha_desde: date | None = Query(default=None),
     fecha_hasta: date | None = Query(default=None),
     cancha_id: int | None = Query(default=None),
-    current_user: User = Depends(get_current_admin)
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
 ):
-    from app.database import SessionLocal
-    db = SessionLocal()
-    try:
-        if fecha_desde is None:
-            fecha_desde = date.today() - timedelta(days=30)
-        if fecha_hasta is None:
-            fecha_hasta = date.today()
-        if fecha_desde > fecha_hasta:
-            raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
-
-        service = ReporteService(db)
-        return service.get_horarios_pico(fecha_desde, fecha_hasta, cancha_id)
-    finally:
-        db.close()
+    if fecha_desde is None:
+        fecha_desde = date.today() - timedelta(days=30)
+    if fecha_hasta is None:
+        fecha_hasta = date.today()
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
+
+    return await db.run(lambda s: ReporteService(s).get_horarios_pico(fecha_desde, fecha_hasta, cancha_id))
+
+
+@router.get("/reportes/heatmap", response_model=HeatmapResponse)
+async def get_reporte_heatmap(
+    fecha_desde: date | None = Query(default=None),
+    fecha_hasta: date | None = Query(default=None),
+    cancha_id: int | None = Query(default=None),
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
+):
+    if fecha_desde is None:
+        fecha_desde = date.today() - timedelta(days=30)
+    if fecha_hasta is None:
+        fecha_hasta = date.today()
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
+
+    return await db.run(lambda s: ReporteService(s).get_heatmap(fecha_desde, fecha_hasta, cancha_id))
 
 
 @router.get("/reportes/clientes-frecuentes", response_model=ClientesFrecuentesResponse)
-def get_reporte_clientes(
+async def get_reporte_clientes(
     fecha_desde: date | None = Query(default=None),
     fecha_hasta: date | None = Query(default=None),
     cancha_id: int | None = Query(default=None),
-    current_user: User = Depends(get_current_admin)
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
 ):
-    from app.database import SessionLocal
-    db = SessionLocal()
-    try:
-        if fecha_desde is None:
-            fecha_desde = date.today() - timedelta(days=30)
-        if fecha_hasta is None:
-            fecha_hasta = date.today()
-        if fecha_desde > fecha_hasta:
-            raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
-
-        service = ReporteService(db)
-        return service.get_clientes_frecuentes(fecha_desde, fecha_hasta, cancha_id)
-    finally:
-        db.close()
+    if fecha_desde is None:
+        fecha_desde = date.today() - timedelta(days=30)
+    if fecha_hasta is None:
+        fecha_hasta = date.today()
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
+
+    return await db.run(lambda s: ReporteService(s).get_clientes_frecuentes(fecha_desde, fecha_hasta, cancha_id))
 
 
 @router.get("/reportes/daily", response_model=DailyResponse)
-def get_reporte_daily(
+async def get_reporte_daily(
     fecha_desde: date | None = Query(default=None),
     fecha_hasta: date | None = Query(default=None),
     cancha_id: int | None = Query(default=None),
-    current_user: User = Depends(get_current_admin)
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
 ):
-    from app.database import SessionLocal
-    db = SessionLocal()
-    try:
-        if fecha_desde is None:
-            fecha_desde = date.today() - timedelta(days=30)
-        if fecha_hasta is None:
-            fecha_hasta = date.today()
-        if fecha_desde > fecha_hasta:
-            raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
-
-        service = ReporteService(db)
-        return service.get_daily(fecha_desde, fecha_hasta, cancha_id)
-    finally:
-        db.close()
+    if fecha_desde is None:
+        fecha_desde = date.today() - timedelta(days=30)
+    if fecha_hasta is None:
+        fecha_hasta = date.today()
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
+
+    return await db.run(lambda s: ReporteService(s).get_daily(fecha_desde, fecha_hasta, cancha_id))
 
 
 @router.get("/reportes/export/excel")
-def exportar_reportes_excel(
+async def exportar_reportes_excel(
     fecha_desde: date | None = Query(default=None),
     fecha_hasta: date | None = Query(default=None),
     cancha_id: int | None = Query(default=None),
+    incluir_reservas: bool = Query(default=False),
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
+):
+    if fecha_desde is None:
+        fecha_desde = date.today() - timedelta(days=30)
+    if fecha_hasta is None:
+        fecha_hasta = date.today()
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
+
+    def consultar(s):
+        service = ReporteService(s)
+        return (
+            service.get_ocupacion(fecha_desde, fecha_hasta, cancha_id),
+            service.get_horarios_pico(fecha_desde, fecha_hasta, cancha_id),
+            service.get_clientes_frecuentes(fecha_desde, fecha_hasta, cancha_id),
+            service.get_daily(fecha_desde, fecha_hasta, cancha_id),
+        )
+
+    datos = await db.run(consultar)
+    # Armar el libro es CPU: va al threadpool para no frenar el event loop.
+    archivo = await run_in_threadpool(
+        _generar_excel, *datos, (fecha_desde, fecha_hasta, cancha_id) if incluir_reservas else None
+    )
+
+    filename = f"reportes_{fecha_desde}_{fecha_hasta}.xlsx"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+
+    return StreamingResponse(
+        leer_por_bloques(archivo),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers=headers,
+    )
+
+
+@router.post("/reportes/jobs", response_model=ReporteJobResponse, status_code=202)
+async def crear_job_reporte(
+    data: ReporteJobCreate,
     current_user: User = Depends(get_current_admin)
 ):
-    from app.database import SessionLocal
-    db = SessionLocal()
-    try:
-        if fecha_desde is None:
-            fecha_desde = date.today() - timedelta(days=30)
-        if fecha_hasta is None:
-            fecha_hasta = date.today()
-        if fecha_desde > fecha_hasta:
-            raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
-
-        service = ReporteService(db)
-
-        ocupacion_data = service.get_ocupacion(fecha_desde, fecha_hasta, cancha_id)
-        horarios_data = service.get_horarios_pico(fecha_desde, fecha_hasta, cancha_id)
-        clientes_data = service.get_clientes_frecuentes(fecha_desde, fecha_hasta, cancha_id)
-        daily_data = service.get_daily(fecha_desde, fecha_hasta, cancha_id)
-
-        import openpyxl
-
-        workbook = openpyxl.Workbook()
-
-        ws_daily = workbook.active
-        ws_daily.title = "Daily"
-        ws_daily.append(["Fecha", "Reservas", "Ingreso Total"])
-        for item in daily_data.get("daily", []):
-            ws_daily.append([item["fecha"], item["reservas_count"], item["ingreso_total"]])
-
-        ws_ocup = workbook.create_sheet("Ocupacion")
-        ws_ocup.append(["Cancha", "Horas Reservadas", "Horas Disponibles", "Ocupación %"])
-        for item in ocupacion_data.get("ocupacion", []):
-            ws_ocup.append(
-                [
-                    item["cancha_nombre"],
-                    item["horas_reservadas"],
-                    item["horas_disponibles"],
-                    item["ocupacion_pct"],
-                ]
-            )
+    fecha_desde = data.fecha_desde or date.today() - timedelta(days=30)
+    fecha_hasta = data.fecha_hasta or date.today()
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde must be <= fecha_hasta")
+
+    parametros = {
+        "fecha_desde": fecha_desde.isoformat(),
+        "fecha_hasta": fecha_hasta.isoformat(),
+        "cancha_id": data.cancha_id,
+        "incluir_reservas": data.incluir_reservas and data.tipo == "excel",
+    }
+    job = cola_reportes.encolar(data.tipo, parametros, regenerar=data.regenerar)
+    return {"status": 202, "job": job}
+
+
+@router.get("/reportes/jobs/{job_id}", response_model=ReporteJobResponse)
+async def get_job_reporte(
+    job_id: str,
+    current_user: User = Depends(get_current_admin)
+):
+    return {"status": 200, "job": cola_reportes.estado(job_id)}
 
-        ws_horarios = workbook.create_sheet("HorariosPico")
-        ws_horarios.append(["Hora", "Cantidad de Reservas"])
-        for item in horarios_data.get("horarios", []):
-            ws_horarios.append([item["hora"], item["cantidad"]])
 
-        ws_clientes = workbook.create_sheet("ClientesFrecuentes")
-        ws_clientes.append(["Cliente", "Total Reservas", "Total Gastado"])
-        for item in clientes_data.get("clientes", []):
-            ws_clientes.append([item["cliente_nombre"], item["total_reservas"], item["total_gastado"]])
+@router.get("/reportes/jobs/{job_id}/descarga")
+async def descargar_job_reporte(
+    job_id: str,
+    current_user: User = Depends(get_current_admin)
+):
+    ruta, media_type, nombre = cola_reportes.artefacto(job_id)
+    return FileResponse(ruta, media_type=media_type, filename=nombre)
 
-        buffer = BytesIO()
-        workbook.save(buffer)
-        buffer.seek(0)
 
-        filename = f"reportes_{fecha_desde}_{fecha_hasta}.xlsx"
-        headers = {"Content-Disposition": f"attachment; filename={filename}"}
+def _generar_excel(
+    ocupacion_data: dict,
+    horarios_data: dict,
+    clientes_data: dict,
+    daily_data: dict,
+    detalle: tuple[date, date, int | None] | None
+):
+    if detalle is None:
+        return generar_excel(ocupacion_data, horarios_data, clientes_data, daily_data)
 
-        return StreamingResponse(
-            buffer,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers=headers,
-        )
+    # El detalle sale de un cursor del servidor mientras se escribe la hoja, asi
+    # que usa una sesion sync propia en este hilo, como /reservas/export.
+    from app.database import SessionLocal
+    session = SessionLocal()
+    try:
+        reservas = ReporteService(session).iterar_reservas(*detalle)
+        return generar_excel(ocupacion_data, horarios_data, clientes_data, daily_data, reservas)
     finally:
-        db.close()
+        session.close()
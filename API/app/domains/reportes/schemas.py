@@ -1,4 +1,6 @@
-from datetime import date
+from datetime import date, datetime
+from typing import Literal
+
 from pydantic import BaseModel
 
 
@@ -32,12 +34,23 @@ class ReporteSemanaResponse(BaseModel):
     total_reservas: int
 
 
+class IngresosPeriodoItem(BaseModel):
+    periodo: str
+    fecha_desde: str
+    fecha_hasta: str
+    total: float
+    pagado: float
+    abonado: float
+    sin_pagar: float
+
+
 class ReporteIngresosResponse(BaseModel):
     status: int = 200
     periodo: dict
     ingresos: dict
     reservas_procesadas: int
     reservas_pendientes: int
+    serie: list[IngresosPeriodoItem] | None = None
 
 
 class OcupacionItem(BaseModel):
@@ -65,6 +78,21 @@ class HorariosPicoResponse(BaseModel):
     horarios: list[HorarioPicoItem]
 
 
+class HeatmapCancha(BaseModel):
+    cancha_id: int
+    cancha_nombre: str
+    # 7 filas (lunes a domingo) x 24 columnas (hora del dia).
+    minutos: list[list[int]]
+    ocupacion_pct: list[list[float]]
+
+
+class HeatmapResponse(BaseModel):
+    status: int = 200
+    periodo: dict
+    dias: list[str]
+    canchas: list[HeatmapCancha]
+
+
 class ClienteFrecuenteItem(BaseModel):
     cliente_nombre: str
     total_reservas: int
@@ -104,6 +132,47 @@ class AdminReservaItem(BaseModel):
 class AdminReservaListResponse(BaseModel):
     status: int = 200
     reservas: list[AdminReservaItem]
-    total: int
+    total: int | None = None
     page: int = 1
     limit: int = 50
+    next_cursor: str | None = None
+
+
+class CacheStats(BaseModel):
+    entradas: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class CacheStatsResponse(BaseModel):
+    status: int = 200
+    caches: dict[str, CacheStats]
+
+
+class ReporteJobCreate(BaseModel):
+    tipo: Literal["excel", "ocupacion", "clientes-frecuentes"]
+    fecha_desde: date | None = None
+    fecha_hasta: date | None = None
+    cancha_id: int | None = None
+    # Solo aplica al tipo "excel".
+    incluir_reservas: bool = False
+    regenerar: bool = False
+
+
+class ReporteJob(BaseModel):
+    id: str
+    tipo: str
+    parametros: dict
+    estado: str
+    progreso: int
+    error: str | None = None
+    creado_at: datetime
+    finalizado_at: datetime | None = None
+
+
+class ReporteJobResponse(BaseModel):
+    status: int = 200
+    job: ReporteJob
@@ -1,9 +1,155 @@
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
+from functools import wraps
+from inspect import signature
+from itertools import chain
+from typing import Iterable, Iterator
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from app.domains.reservas.models import Reserva, EstadoPago
+from sqlalchemy import func, extract, case, and_, select, true
+from app.domains.reservas.models import EstadoPago, ReservaRollupDiario as Rollup
+from app.domains.reservas.archivo import LIMITE_ARCHIVO, fecha_limite_archivo, fuente_hasta, fuente_reservas
 from app.domains.canchas.models import Cancha
 from app.domains.users.models import User
+from app.core.cache import TTLCache
+from app.db.tiempo import duracion_segundos
+
+# Unos segundos bastan: varios admins con el dashboard abierto comparten un solo calculo.
+# Las escrituras de reservas lo limpian (ReservaService._invalidar_caches).
+dashboard_cache = TTLCache(maxsize=1, ttl=5)
+
+# Reportes por (reporte, fecha_desde, fecha_hasta, cancha_id, ...). Una escritura en
+# la fecha D descarta solo los rangos que incluyen D, asi que un periodo cerrado
+# se sirve desde memoria hasta que alguien toque datos de ese periodo. El TTL solo
+# acota lo que tarda en verse un cambio hecho por otro proceso.
+reportes_cache = TTLCache(maxsize=512, ttl=600)
+
+DETALLE_LOTE = 1000
+
+DIA_NOMBRES = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+MINUTOS_DIA = 24 * 60
+
+
+def invalidar_reportes(fechas: Iterable[date] | None = None) -> None:
+    """Drop cached reports and finished report jobs whose range covers any of `fechas`; all of them when None."""
+    # Import diferido: la cola de jobs importa este modulo.
+    from app.domains.reportes.jobs import cola_reportes
+
+    fechas = None if fechas is None else set(fechas)
+    cola_reportes.invalidar(fechas)
+    if fechas is None:
+        reportes_cache.clear()
+        return
+    reportes_cache.invalidate_where(lambda clave: any(clave[1] <= f <= clave[2] for f in fechas))
+
+
+def _minutos_por_hora(
+    cancha: np.ndarray,
+    dia_semana: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    cantidad: np.ndarray,
+    canchas: int
+) -> np.ndarray:
+    """Booked minutes per (court, weekday, hour) as a canchas x 7 x 24 array.
+
+    Each slot adds `cantidad` at its start minute and subtracts it at its end
+    minute of a per-minute line for its court and weekday; a cumulative sum
+    turns that into minutes occupied, which are then summed per hour. A
+    booking is spread over every hour it covers without looping over slots.
+    """
+    tamanio = canchas * 7 * (MINUTOS_DIA + 1)
+    base = (cancha * 7 + dia_semana) * (MINUTOS_DIA + 1)
+    marcas = (
+        np.bincount(base + inicio, weights=cantidad, minlength=tamanio)
+        - np.bincount(base + fin, weights=cantidad, minlength=tamanio)
+    ).astype(np.int64)
+    ocupados = np.cumsum(marcas.reshape(canchas, 7, MINUTOS_DIA + 1), axis=2)[:, :, :MINUTOS_DIA]
+    return ocupados.reshape(canchas, 7, 24, 60).sum(axis=3)
+
+
+def _cacheado(reporte: str):
+    """Serve a report method from reportes_cache, keyed by its name and bound arguments.
+
+    The decorated method must take the range as its first two arguments.
+    """
+    def decorador(metodo):
+        firma = signature(metodo)
+
+        @wraps(metodo)
+        def envoltura(self, *args, **kwargs):
+            argumentos = firma.bind(self, *args, **kwargs)
+            argumentos.apply_defaults()
+            clave = (reporte, *list(argumentos.arguments.values())[1:])
+            return reportes_cache.get_or_set(clave, lambda: metodo(self, *args, **kwargs))
+        return envoltura
+    return decorador
+
+
+def _consulta_stats(limite: date | None):
+    """All dashboard metrics as a single statement, given the archive limit.
+
+    Today/week/month figures are one pass with conditional aggregation
+    over the reservations since the start of the week or month, whichever
+    is earlier, so that part stays a short range scan however long the
+    history is. The all-time totals are a plain COUNT/SUM over the
+    covering index of active reservations, and courts and users are
+    scalar subqueries of the same SELECT.
+    """
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    desde = min(week_start, month_start)
+
+    # Incluye los totales historicos: une reservas_historico si hay algo archivado.
+    Todas = fuente_hasta(limite)
+    Recientes = fuente_hasta(limite, desde)
+    pagado = Recientes.estado_pago == EstadoPago.PAGADO
+
+    def contar(*condiciones):
+        return func.coalesce(func.sum(case((and_(*condiciones), 1), else_=0)), 0)
+
+    def sumar(*condiciones):
+        return func.coalesce(func.sum(case((and_(*condiciones), Recientes.precio_total), else_=0)), 0)
+
+    periodo = select(
+        contar(Recientes.fecha == today).label("reservas_hoy"),
+        contar(Recientes.fecha >= week_start).label("reservas_semana"),
+        contar(Recientes.fecha >= month_start).label("reservas_mes"),
+        sumar(pagado, Recientes.fecha == today).label("ingresos_hoy"),
+        sumar(pagado, Recientes.fecha >= week_start).label("ingresos_semana"),
+        sumar(pagado, Recientes.fecha >= month_start).label("ingresos_mes"),
+    ).where(Recientes.fecha >= desde, Recientes.estado_pago != EstadoPago.LIBRE).subquery("periodo")
+
+    totales = select(
+        func.count(Todas.id).label("reservas_totales"),
+        func.coalesce(func.sum(
+            case((Todas.estado_pago == EstadoPago.PAGADO, Todas.precio_total), else_=0)
+        ), 0).label("ingresos_totales"),
+    ).where(Todas.estado_pago != EstadoPago.LIBRE).subquery("totales")
+
+    activas = select(func.count(Cancha.id)).where(Cancha.is_active == True)
+    return select(
+        periodo,
+        totales,
+        activas.scalar_subquery().label("canchas_activas"),
+        select(func.count(User.id)).scalar_subquery().label("usuarios_totales")
+    ).select_from(periodo.join(totales, true()))
+
+
+def _formatear_stats(fila) -> dict:
+    return {
+        "reservas_hoy": int(fila.reservas_hoy),
+        "reservas_semana": int(fila.reservas_semana),
+        "reservas_mes": int(fila.reservas_mes),
+        "reservas_totales": int(fila.reservas_totales),
+        "ingresos_hoy": float(fila.ingresos_hoy or 0),
+        "ingresos_semana": float(fila.ingresos_semana or 0),
+        "ingresos_mes": float(fila.ingresos_mes or 0),
+        "ingresos_totales": float(fila.ingresos_totales or 0),
+        "canchas_activas": int(fila.canchas_activas),
+        "usuarios_totales": int(fila.usuarios_totales)
+    }
 
 
 class ReporteService:
@@ -11,75 +157,26 @@ class ReporteService:
         self.db = db
 
     def get_stats(self) -> dict:
-        today = date.today()
-        week_start = today - timedelta(days=today.weekday())
-        month_start = today.replace(day=1)
-
-        reservas_hoy = self.db.query(Reserva).filter(Reserva.fecha == today, Reserva.estado_pago != EstadoPago.LIBRE).count()
-        reservas_semana = self.db.query(Reserva).filter(
-            Reserva.fecha >= week_start,
-            Reserva.estado_pago != EstadoPago.LIBRE
-        ).count()
-        reservas_mes = self.db.query(Reserva).filter(
-            Reserva.fecha >= month_start,
-            Reserva.estado_pago != EstadoPago.LIBRE
-        ).count()
-        reservas_totales = self.db.query(Reserva).filter(Reserva.estado_pago != EstadoPago.LIBRE).count()
-
-        ingresos_hoy = self.db.query(func.coalesce(func.sum(Reserva.precio_total), 0)).filter(
-            Reserva.fecha == today,
-            Reserva.estado_pago == EstadoPago.PAGADO
-        ).scalar()
-
-        ingresos_semana = self.db.query(func.coalesce(func.sum(Reserva.precio_total), 0)).filter(
-            Reserva.fecha >= week_start,
-            Reserva.estado_pago == EstadoPago.PAGADO
-        ).scalar()
-
-        ingresos_mes = self.db.query(func.coalesce(func.sum(Reserva.precio_total), 0)).filter(
-            Reserva.fecha >= month_start,
-            Reserva.estado_pago == EstadoPago.PAGADO
-        ).scalar()
-
-        ingresos_totales = self.db.query(func.coalesce(func.sum(Reserva.precio_total), 0)).filter(
-            Reserva.estado_pago == EstadoPago.PAGADO
-        ).scalar()
-
-        canchas_activas = self.db.query(Cancha).filter(Cancha.is_active == True).count()
-        usuarios_totales = self.db.query(User).count()
+        return {"status": 200, "stats": dashboard_cache.get_or_set("stats", self._calcular_stats)}
 
-        return {
-            "status": 200,
-            "stats": {
-                "reservas_hoy": reservas_hoy,
-                "reservas_semana": reservas_semana,
-                "reservas_mes": reservas_mes,
-                "reservas_totales": reservas_totales,
-                "ingresos_hoy": float(ingresos_hoy or 0),
-                "ingresos_semana": float(ingresos_semana or 0),
-                "ingresos_mes": float(ingresos_mes or 0),
-                "ingresos_totales": float(ingresos_totales or 0),
-                "canchas_activas": canchas_activas,
-                "usuarios_totales": usuarios_totales
-            }
-        }
+    def _calcular_stats(self) -> dict:
+        return _formatear_stats(self.db.execute(_consulta_stats(fecha_limite_archivo(self.db))).one())
 
+    @_cacheado("reservas-semana")
     def get_reservas_semana(self, fecha_inicio: date, fecha_fin: date) -> dict:
-        dia_nombres = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
-
         reservas = self.db.query(
-            extract('dow', Reserva.fecha).label('dia'),
-            func.count(Reserva.id).label('total')
+            extract('dow', Rollup.fecha).label('dia'),
+            func.sum(Rollup.reservas).label('total')
         ).filter(
-            Reserva.fecha >= fecha_inicio,
-            Reserva.fecha <= fecha_fin,
-            Reserva.estado_pago != EstadoPago.LIBRE
-        ).group_by(extract('dow', Reserva.fecha)).all()
+            Rollup.fecha >= fecha_inicio,
+            Rollup.fecha <= fecha_fin,
+            Rollup.estado_pago != EstadoPago.LIBRE
+        ).group_by(extract('dow', Rollup.fecha)).all()
 
-        reporte_dict = {int(r.dia): r.total for r in reservas}
+        reporte_dict = {int(r.dia): int(r.total) for r in reservas}
 
         reporte = []
-        for i, nombre in enumerate(dia_nombres):
+        for i, nombre in enumerate(DIA_NOMBRES):
             dia_sql = i + 1
             if dia_sql == 7:
                 dia_sql = 0
@@ -100,57 +197,82 @@ class ReporteService:
             "total_reservas": total_reservas
         }
 
-    def get_ingresos(self, fecha_desde: date, fecha_hasta: date) -> dict:
-        base_query = self.db.query(Reserva).filter(
-            Reserva.fecha >= fecha_desde,
-            Reserva.fecha <= fecha_hasta,
-            Reserva.estado_pago != EstadoPago.LIBRE
+    @_cacheado("ingresos")
+    def get_ingresos(
+        self,
+        fecha_desde: date,
+        fecha_hasta: date,
+        cancha_id: int | None = None,
+        agrupar: str | None = None,
+    ) -> dict:
+        """Return revenue per payment state, optionally with a day/week/month series.
+
+        Everything comes from one GROUP BY estado_pago over the rollup (plus
+        fecha when a series is requested); the folding happens in Python.
+        """
+        columnas = [Rollup.estado_pago]
+        if agrupar is not None:
+            columnas.insert(0, Rollup.fecha)
+        query = self.db.query(
+            *columnas,
+            func.sum(Rollup.reservas).label("reservas"),
+            func.coalesce(func.sum(Rollup.ingresos), 0).label("ingresos")
+        ).filter(
+            Rollup.fecha >= fecha_desde,
+            Rollup.fecha <= fecha_hasta,
+            Rollup.estado_pago != EstadoPago.LIBRE
         )
+        if cancha_id is not None:
+            query = query.filter(Rollup.cancha_id == cancha_id)
+        filas = query.group_by(*columnas).all()
 
-        total = base_query.with_entities(
-            func.coalesce(func.sum(Reserva.precio_total), 0)
-        ).scalar()
-
-        pagado = base_query.filter(
-            Reserva.estado_pago == EstadoPago.PAGADO
-        ).with_entities(
-            func.coalesce(func.sum(Reserva.precio_total), 0)
-        ).scalar()
-
-        abonado = base_query.filter(
-            Reserva.estado_pago == EstadoPago.ABONADO
-        ).with_entities(
-            func.coalesce(func.sum(Reserva.precio_total), 0)
-        ).scalar()
-
-        sin_pagar = base_query.filter(
-            Reserva.estado_pago == EstadoPago.SIN_PAGAR
-        ).with_entities(
-            func.coalesce(func.sum(Reserva.precio_total), 0)
-        ).scalar()
-
-        reservas_procesadas = base_query.filter(
-            Reserva.estado_pago.in_([EstadoPago.PAGADO, EstadoPago.ABONADO])
-        ).count()
-
-        reservas_pendientes = base_query.filter(
-            Reserva.estado_pago == EstadoPago.SIN_PAGAR
-        ).count()
+        montos: dict[EstadoPago, float] = {}
+        cantidades: dict[EstadoPago, int] = {}
+        for f in filas:
+            montos[f.estado_pago] = montos.get(f.estado_pago, 0.0) + float(f.ingresos)
+            cantidades[f.estado_pago] = cantidades.get(f.estado_pago, 0) + int(f.reservas)
 
-        return {
+        respuesta = {
             "status": 200,
             "periodo": {
                 "fecha_desde": fecha_desde.isoformat(),
                 "fecha_hasta": fecha_hasta.isoformat()
             },
-            "ingresos": {
-                "total": float(total or 0),
-                "pagado": float(pagado or 0),
-                "abonado": float(abonado or 0),
-                "sin_pagar": float(sin_pagar or 0)
-            },
-            "reservas_procesadas": reservas_procesadas,
-            "reservas_pendientes": reservas_pendientes
+            "ingresos": self._ingresos_por_estado(montos),
+            "reservas_procesadas": cantidades.get(EstadoPago.PAGADO, 0) + cantidades.get(EstadoPago.ABONADO, 0),
+            "reservas_pendientes": cantidades.get(EstadoPago.SIN_PAGAR, 0)
+        }
+        if agrupar is not None:
+            respuesta["serie"] = self._serie_ingresos(filas, fecha_desde, fecha_hasta, agrupar)
+        return respuesta
+
+    def _serie_ingresos(self, filas, fecha_desde: date, fecha_hasta: date, agrupar: str) -> list[dict]:
+        """Fold (fecha, estado_pago) rows into consecutive periods, with zeros for empty ones."""
+        por_periodo: dict[date, dict[EstadoPago, float]] = {}
+        for f in filas:
+            montos = por_periodo.setdefault(_inicio_periodo(f.fecha, agrupar), {})
+            montos[f.estado_pago] = montos.get(f.estado_pago, 0.0) + float(f.ingresos)
+
+        serie = []
+        inicio = _inicio_periodo(fecha_desde, agrupar)
+        while inicio <= fecha_hasta:
+            siguiente = _siguiente_periodo(inicio, agrupar)
+            serie.append({
+                "periodo": inicio.isoformat(),
+                "fecha_desde": max(inicio, fecha_desde).isoformat(),
+                "fecha_hasta": min(siguiente - timedelta(days=1), fecha_hasta).isoformat(),
+                **self._ingresos_por_estado(por_periodo.get(inicio, {}))
+            })
+            inicio = siguiente
+        return serie
+
+    @staticmethod
+    def _ingresos_por_estado(montos: dict[EstadoPago, float]) -> dict:
+        return {
+            "total": sum(montos.values(), 0.0),
+            "pagado": montos.get(EstadoPago.PAGADO, 0.0),
+            "abonado": montos.get(EstadoPago.ABONADO, 0.0),
+            "sin_pagar": montos.get(EstadoPago.SIN_PAGAR, 0.0)
         }
 
     def _parse_periodo(self, fecha_desde: date, fecha_hasta: date) -> tuple[date, date]:
@@ -159,42 +281,43 @@ class ReporteService:
             raise ValueError("fecha_desde must be <= fecha_hasta")
         return (fecha_desde, fecha_hasta)
 
+    @_cacheado("ocupacion")
     def get_ocupacion(self, fecha_desde: date, fecha_hasta: date, cancha_id: int | None = None) -> dict:
         """Return occupancy % per court for the period."""
+        Reservas = fuente_reservas(self.db, fecha_desde, fecha_hasta)
         self._parse_periodo(fecha_desde, fecha_hasta)
 
         dias = (fecha_hasta - fecha_desde).days + 1
         horas_disponibles_por_dia = 14
 
-        courts_query = self.db.query(Cancha).filter(Cancha.is_active == True)
-        if cancha_id is not None:
-            courts_query = courts_query.filter(Cancha.id == cancha_id)
-        courts = courts_query.all()
-
-        reservas_query = self.db.query(Reserva).filter(
-            Reserva.fecha >= fecha_desde,
-            Reserva.fecha <= fecha_hasta,
-            Reserva.estado_pago != EstadoPago.LIBRE,
-        )
+        # Una fila por cancha: el motor suma las duraciones, no se hidrata ninguna reserva.
+        segundos = func.coalesce(func.sum(duracion_segundos(self.db, Reservas.hora_inicio, Reservas.hora_fin)), 0)
+        query = self.db.query(
+            Cancha.id,
+            Cancha.nombre,
+            segundos.label("segundos"),
+        ).outerjoin(
+            Reservas,
+            and_(
+                Reservas.cancha_id == Cancha.id,
+                Reservas.fecha >= fecha_desde,
+                Reservas.fecha <= fecha_hasta,
+                Reservas.estado_pago != EstadoPago.LIBRE,
+            ),
+        ).filter(Cancha.is_active == True)
         if cancha_id is not None:
-            reservas_query = reservas_query.filter(Reserva.cancha_id == cancha_id)
-
-        hours_per_court: dict[int, float] = {}
-        for reserva in reservas_query.all():
-            inicio_dt = datetime.combine(reserva.fecha, reserva.hora_inicio)
-            fin_dt = datetime.combine(reserva.fecha, reserva.hora_fin)
-            horas = (fin_dt - inicio_dt).seconds / 3600
-            hours_per_court[reserva.cancha_id] = hours_per_court.get(reserva.cancha_id, 0) + horas
+            query = query.filter(Cancha.id == cancha_id)
+        rows = query.group_by(Cancha.id, Cancha.nombre).order_by(Cancha.id).all()
 
         ocupacion = []
-        for court in courts:
-            horas_reservadas = hours_per_court.get(court.id, 0.0)
+        for row in rows:
+            horas_reservadas = float(row.segundos) / 3600
             horas_disponibles = dias * horas_disponibles_por_dia
             ocupacion_pct = round((horas_reservadas / horas_disponibles) * 100, 2) if horas_disponibles > 0 else 0.0
             ocupacion.append(
                 {
-                    "cancha_id": court.id,
-                    "cancha_nombre": court.nombre,
+                    "cancha_id": row.id,
+                    "cancha_nombre": row.nombre,
                     "horas_reservadas": round(horas_reservadas, 2),
                     "horas_disponibles": horas_disponibles,
                     "ocupacion_pct": ocupacion_pct,
@@ -207,23 +330,25 @@ class ReporteService:
             "ocupacion": ocupacion,
         }
 
+    @_cacheado("horarios-pico")
     def get_horarios_pico(self, fecha_desde: date, fecha_hasta: date, cancha_id: int | None = None) -> dict:
         """Return top 10 most reserved hour buckets."""
         self._parse_periodo(fecha_desde, fecha_hasta)
 
-        hour_bucket = extract("hour", Reserva.hora_inicio)
+        cantidad = func.sum(Rollup.reservas)
         query = self.db.query(
-            hour_bucket.label("hora"),
-            func.count(Reserva.id).label("cantidad"),
+            Rollup.hora,
+            cantidad.label("cantidad"),
         ).filter(
-            Reserva.fecha >= fecha_desde,
-            Reserva.fecha <= fecha_hasta,
-            Reserva.estado_pago != EstadoPago.LIBRE,
+            Rollup.fecha >= fecha_desde,
+            Rollup.fecha <= fecha_hasta,
+            Rollup.estado_pago != EstadoPago.LIBRE,
         )
         if cancha_id is not None:
-            query = query.filter(Reserva.cancha_id == cancha_id)
+            query = query.filter(Rollup.cancha_id == cancha_id)
 
-        rows = query.group_by(hour_bucket).order_by(func.count(Reserva.id).desc()).limit(10).all()
+        # Un bucket que quedo en cero (p. ej. todas sus reservas canceladas) no es un horario pico.
+        rows = query.group_by(Rollup.hora).having(cantidad > 0).order_by(cantidad.desc()).limit(10).all()
 
         horarios = [
             {
@@ -240,6 +365,77 @@ class ReporteService:
             "horarios": horarios,
         }
 
+    @_cacheado("heatmap")
+    def get_heatmap(self, fecha_desde: date, fecha_hasta: date, cancha_id: int | None = None) -> dict:
+        """Return booked minutes and utilization % per court on a weekday x hour grid.
+
+        Utilization is over the clock time of each cell in the period: the
+        number of times that weekday occurs times 60 minutes.
+        """
+        Reservas = fuente_reservas(self.db, fecha_desde, fecha_hasta)
+        self._parse_periodo(fecha_desde, fecha_hasta)
+
+        query_canchas = self.db.query(Cancha.id, Cancha.nombre).filter(Cancha.is_active == True)
+        if cancha_id is not None:
+            query_canchas = query_canchas.filter(Cancha.id == cancha_id)
+        canchas = query_canchas.order_by(Cancha.id).all()
+        ids = np.array([c.id for c in canchas], dtype=np.int64)
+
+        # El motor devuelve enteros (dia de la semana y minutos desde medianoche) agrupados por
+        # franja: las combinaciones distintas son pocas aunque el periodo tenga un anio de reservas.
+        def minuto(columna):
+            return extract("hour", columna) * 60 + extract("minute", columna)
+
+        franja = (
+            Reservas.cancha_id,
+            extract("dow", Reservas.fecha),
+            minuto(Reservas.hora_inicio),
+            minuto(Reservas.hora_fin),
+        )
+        rows = self.db.execute(
+            select(*franja, func.count()).where(
+                Reservas.fecha >= fecha_desde,
+                Reservas.fecha <= fecha_hasta,
+                Reservas.estado_pago != EstadoPago.LIBRE,
+                Reservas.cancha_id.in_(ids.tolist()),
+            ).group_by(*franja)
+        ).all()
+
+        minutos = np.zeros((len(canchas), 7, 24), dtype=np.int64)
+        if rows:
+            cancha_ids, dow, inicio, fin, cantidad = (
+                np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 5).T
+            )
+            # dow cuenta desde el domingo (0); la grilla empieza el lunes.
+            dia_semana = (dow + 6) % 7
+            # Una reserva que termina a las 00:00 llega hasta el fin del dia.
+            fin[fin == 0] = MINUTOS_DIA
+            cancha = np.searchsorted(ids, cancha_ids)
+            minutos = _minutos_por_hora(cancha, dia_semana, inicio, fin, cantidad, len(canchas))
+
+        # Dias desde 1970-01-01, que fue jueves (weekday 3).
+        dias = np.arange(np.datetime64(fecha_desde), np.datetime64(fecha_hasta) + 1).astype(np.int64)
+        disponibles = np.bincount((dias + 3) % 7, minlength=7)[:, None] * 60
+        ocupacion_pct = np.divide(
+            minutos * 100, disponibles, out=np.zeros(minutos.shape), where=disponibles > 0
+        ).round(2)
+
+        return {
+            "status": 200,
+            "periodo": {"fecha_desde": fecha_desde.isoformat(), "fecha_hasta": fecha_hasta.isoformat()},
+            "dias": DIA_NOMBRES,
+            "canchas": [
+                {
+                    "cancha_id": c.id,
+                    "cancha_nombre": c.nombre,
+                    "minutos": minutos[i].tolist(),
+                    "ocupacion_pct": ocupacion_pct[i].tolist(),
+                }
+                for i, c in enumerate(canchas)
+            ],
+        }
+
+    @_cacheado("clientes-frecuentes")
     def get_clientes_frecuentes(
         self,
         fecha_desde: date,
@@ -248,20 +444,21 @@ class ReporteService:
     ) -> dict:
         """Return top 10 clients by reservation count and total spend."""
         self._parse_periodo(fecha_desde, fecha_hasta)
+        Reservas = fuente_reservas(self.db, fecha_desde, fecha_hasta)
 
         query = self.db.query(
             User.nombre.label("cliente_nombre"),
-            func.count(Reserva.id).label("total_reservas"),
-            func.coalesce(func.sum(Reserva.precio_total), 0).label("total_gastado"),
-        ).join(Reserva, Reserva.usuario_id == User.id).filter(
-            Reserva.fecha >= fecha_desde,
-            Reserva.fecha <= fecha_hasta,
-            Reserva.estado_pago.in_([EstadoPago.PAGADO, EstadoPago.ABONADO]),
+            func.count(Reservas.id).label("total_reservas"),
+            func.coalesce(func.sum(Reservas.precio_total), 0).label("total_gastado"),
+        ).join(Reservas, Reservas.usuario_id == User.id).filter(
+            Reservas.fecha >= fecha_desde,
+            Reservas.fecha <= fecha_hasta,
+            Reservas.estado_pago.in_([EstadoPago.PAGADO, EstadoPago.ABONADO]),
         )
         if cancha_id is not None:
-            query = query.filter(Reserva.cancha_id == cancha_id)
+            query = query.filter(Reservas.cancha_id == cancha_id)
 
-        rows = query.group_by(User.id, User.nombre).order_by(func.count(Reserva.id).desc()).limit(10).all()
+        rows = query.group_by(User.id, User.nombre).order_by(func.count(Reservas.id).desc()).limit(10).all()
         clientes = [
             {
                 "cliente_nombre": row.cliente_nombre or "Sin nombre",
@@ -277,23 +474,24 @@ class ReporteService:
             "clientes": clientes,
         }
 
+    @_cacheado("daily")
     def get_daily(self, fecha_desde: date, fecha_hasta: date, cancha_id: int | None = None) -> dict:
         """Return day-by-day breakdown with zeros for missing days."""
         self._parse_periodo(fecha_desde, fecha_hasta)
 
         query = self.db.query(
-            Reserva.fecha,
-            func.count(Reserva.id).label("reservas_count"),
-            func.coalesce(func.sum(Reserva.precio_total), 0).label("ingreso_total"),
+            Rollup.fecha,
+            func.sum(Rollup.reservas).label("reservas_count"),
+            func.coalesce(func.sum(Rollup.ingresos), 0).label("ingreso_total"),
         ).filter(
-            Reserva.fecha >= fecha_desde,
-            Reserva.fecha <= fecha_hasta,
-            Reserva.estado_pago != EstadoPago.LIBRE,
+            Rollup.fecha >= fecha_desde,
+            Rollup.fecha <= fecha_hasta,
+            Rollup.estado_pago != EstadoPago.LIBRE,
         )
         if cancha_id is not None:
-            query = query.filter(Reserva.cancha_id == cancha_id)
+            query = query.filter(Rollup.cancha_id == cancha_id)
 
-        rows = query.group_by(Reserva.fecha).order_by(Reserva.fecha).all()
+        rows = query.group_by(Rollup.fecha).order_by(Rollup.fecha).all()
         data = {
             row.fecha.isoformat(): {
                 "reservas_count": int(row.reservas_count),
@@ -317,3 +515,79 @@ class ReporteService:
             "periodo": {"fecha_desde": fecha_desde.isoformat(), "fecha_hasta": fecha_hasta.isoformat()},
             "daily": daily,
         }
+
+    def iterar_reservas(self, fecha_desde: date, fecha_hasta: date, cancha_id: int | None = None) -> Iterator[list]:
+        """Yield the active reservations of the period as flat rows, archived ones included.
+
+        Rows come from a server-side cursor in batches of DETALLE_LOTE, so the
+        caller can write any number of them with flat memory.
+        """
+        self._parse_periodo(fecha_desde, fecha_hasta)
+        Reservas = fuente_reservas(self.db, fecha_desde, fecha_hasta)
+
+        stmt = select(
+            Reservas.id,
+            Reservas.fecha,
+            Reservas.hora_inicio,
+            Reservas.hora_fin,
+            Cancha.nombre.label("cancha_nombre"),
+            User.nombre.label("usuario_nombre"),
+            Reservas.jugadores,
+            Reservas.estado_pago,
+            Reservas.precio_total,
+        ).join(Cancha, Cancha.id == Reservas.cancha_id).join(User, User.id == Reservas.usuario_id).where(
+            Reservas.fecha >= fecha_desde,
+            Reservas.fecha <= fecha_hasta,
+            Reservas.estado_pago != EstadoPago.LIBRE,
+        )
+        if cancha_id is not None:
+            stmt = stmt.where(Reservas.cancha_id == cancha_id)
+        stmt = stmt.order_by(Reservas.fecha, Reservas.id).execution_options(
+            yield_per=DETALLE_LOTE,
+            stream_results=True,
+        )
+
+        for partition in self.db.execute(stmt).partitions():
+            for row in partition:
+                yield [
+                    row.id,
+                    row.fecha,
+                    row.hora_inicio.strftime("%H:%M"),
+                    row.hora_fin.strftime("%H:%M"),
+                    row.cancha_nombre,
+                    row.usuario_nombre or "Sin nombre",
+                    row.jugadores,
+                    row.estado_pago.value,
+                    float(row.precio_total),
+                ]
+
+
+class ReporteServiceAsync:
+    """The dashboard read for DB_ASYNC, with its two round trips awaited on the async driver."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_stats(self) -> dict:
+        return {"status": 200, "stats": await dashboard_cache.get_or_set_async("stats", self._calcular_stats)}
+
+    async def _calcular_stats(self) -> dict:
+        limite = await self.db.scalar(LIMITE_ARCHIVO)
+        return _formatear_stats((await self.db.execute(_consulta_stats(limite))).one())
+
+
+def _inicio_periodo(fecha: date, agrupar: str) -> date:
+    """First day of the day/week/month bucket; weeks start on Monday, as in the dashboard."""
+    if agrupar == "semana":
+        return fecha - timedelta(days=fecha.weekday())
+    if agrupar == "mes":
+        return fecha.replace(day=1)
+    return fecha
+
+
+def _siguiente_periodo(inicio: date, agrupar: str) -> date:
+    if agrupar == "semana":
+        return inicio + timedelta(days=7)
+    if agrupar == "mes":
+        return (inicio.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return inicio + timedelta(days=1)
@@ -0,0 +1,124 @@
+import argparse
+import logging
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select, union_all
+from sqlalchemy.orm import Session, aliased
+
+from app.config import settings
+from app.domains.inventario.models import AlquilerEquipo
+from app.domains.reservas.models import Reserva, ReservaHistorico
+from app.domains.reservas.slots import liberar_slots_de
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS = [c.name for c in Reserva.__table__.columns]
+
+
+def archivar_reservas(db: Session, horizonte_dias: int | None = None, lote: int | None = None) -> int:
+    """Move reservations dated before today - horizonte_dias into reservas_historico.
+
+    Works in batches of `lote` ids, one transaction per batch, so an
+    interrupted run leaves every reservation in exactly one of the two tables
+    and can simply be started again. Reservations referenced by an equipment
+    rental stay in `reservas` to keep that foreign key valid, and so does
+    the one with the highest id, so no archived id is ever handed out again.
+    The event history in reserva_eventos is not touched.
+    """
+    horizonte_dias = settings.ARCHIVO_HORIZONTE_DIAS if horizonte_dias is None else horizonte_dias
+    lote = lote or settings.ARCHIVO_LOTE
+    corte = date.today() - timedelta(days=horizonte_dias)
+    con_alquiler = select(AlquilerEquipo.id).where(AlquilerEquipo.reserva_id == Reserva.id).exists()
+    # Una tabla reservas creada antes de sqlite_autoincrement reasigna el id mas alto si se borra:
+    # esa reserva se queda hasta que haya otra mas nueva.
+    ultima = select(func.max(Reserva.id)).scalar_subquery()
+
+    archivadas = 0
+    while True:
+        # FOR UPDATE: un cambio de pago concurrente no puede perderse entre la copia y el borrado.
+        ids = db.scalars(
+            select(Reserva.id)
+            .where(Reserva.fecha < corte, ~con_alquiler, Reserva.id < ultima)
+            .order_by(Reserva.id)
+            .limit(lote)
+            .with_for_update()
+        ).all()
+        if not ids:
+            break
+
+        db.execute(
+            insert(ReservaHistorico).from_select(
+                COLUMNAS,
+                select(*Reserva.__table__.columns).where(Reserva.id.in_(ids))
+            )
+        )
+        liberar_slots_de(db, ids)
+        db.query(Reserva).filter(Reserva.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+
+        archivadas += len(ids)
+        logger.info(f"Archivadas {archivadas} reservas anteriores a {corte.isoformat()}")
+        if len(ids) < lote:
+            break
+
+    if archivadas:
+        # Import diferido: el servicio de reservas no debe cargarse solo para archivar.
+        from app.domains.reservas.service import totales_cache
+        totales_cache.clear()
+    return archivadas
+
+
+# Ultima fecha archivada; NULL mientras no se archivo nada.
+LIMITE_ARCHIVO = select(func.max(ReservaHistorico.fecha))
+
+
+def fecha_limite_archivo(db: Session) -> date | None:
+    """Latest archived fecha, or None when nothing has been archived yet."""
+    return db.scalar(LIMITE_ARCHIVO)
+
+
+def fuente_reservas(db: Session, fecha_desde: date | None = None, fecha_hasta: date | None = None):
+    """Return the entity to query reservations in [fecha_desde, fecha_hasta].
+
+    That is `Reserva` itself while the range starts after the archived
+    dates, and otherwise an alias of `Reserva` over reservas UNION ALL
+    reservas_historico, so callers write the same query either way. The
+    range is applied inside each branch to keep both on their fecha indexes.
+    """
+    return fuente_hasta(fecha_limite_archivo(db), fecha_desde, fecha_hasta)
+
+
+def fuente_hasta(limite: date | None, fecha_desde: date | None = None, fecha_hasta: date | None = None):
+    """`fuente_reservas` for an archive limit already read, e.g. with an async session."""
+    if limite is None or (fecha_desde is not None and fecha_desde > limite):
+        return Reserva
+
+    def rama(modelo):
+        tabla = modelo.__table__
+        consulta = select(*[tabla.c[nombre] for nombre in COLUMNAS])
+        if fecha_desde is not None:
+            consulta = consulta.where(tabla.c.fecha >= fecha_desde)
+        if fecha_hasta is not None:
+            consulta = consulta.where(tabla.c.fecha <= fecha_hasta)
+        return consulta
+
+    return aliased(Reserva, union_all(rama(Reserva), rama(ReservaHistorico)).subquery("reservas_todas"))
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal, engine
+    from app.db.models import Base
+
+    parser = argparse.ArgumentParser(description="Archiva reservas antiguas en reservas_historico")
+    parser.add_argument("--horizonte-dias", type=int, default=None)
+    parser.add_argument("--lote", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        total = archivar_reservas(session, args.horizonte_dias, args.lote)
+        logger.info(f"Reservas archivadas: {total}")
+    finally:
+        session.close()
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.domains.reservas.models import ReservaEvento, TipoEventoReserva, EstadoPago
+
+
+def registrar_evento(
+    db: Session,
+    reserva_id: int,
+    tipo: TipoEventoReserva,
+    actor_usuario_id: int | None = None,
+    actor_es_admin: bool = False,
+    estado_anterior: EstadoPago | None = None,
+    estado_nuevo: EstadoPago | None = None
+) -> None:
+    """Stage an event in the caller's transaction; it commits with the change it describes."""
+    registrar_eventos(db, [fila_evento(
+        reserva_id, tipo, actor_usuario_id, actor_es_admin, estado_anterior, estado_nuevo
+    )])
+
+
+def registrar_eventos(db: Session, filas: list[dict]) -> None:
+    if filas:
+        db.execute(insert(ReservaEvento), filas)
+
+
+def fila_evento(
+    reserva_id: int,
+    tipo: TipoEventoReserva,
+    actor_usuario_id: int | None = None,
+    actor_es_admin: bool = False,
+    estado_anterior: EstadoPago | None = None,
+    estado_nuevo: EstadoPago | None = None
+) -> dict:
+    return {
+        "reserva_id": reserva_id,
+        "tipo": tipo,
+        "actor_usuario_id": actor_usuario_id,
+        "actor_es_admin": actor_es_admin,
+        "estado_anterior": estado_anterior,
+        "estado_nuevo": estado_nuevo,
+        "created_at": datetime.utcnow()
+    }
+
+
+def listar_eventos(db: Session, reserva_id: int) -> list[ReservaEvento]:
+    return db.query(ReservaEvento).filter(
+        ReservaEvento.reserva_id == reserva_id
+    ).order_by(ReservaEvento.created_at, ReservaEvento.id).all()
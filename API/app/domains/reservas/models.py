@@ -1,5 +1,5 @@
 from datetime import datetime, date, time
-from sqlalchemy import Column, Integer, String, DateTime, Date, Time, ForeignKey, DECIMAL, Text, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Time, ForeignKey, DECIMAL, Text, Enum as SQLEnum, PrimaryKeyConstraint, Index, text
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 import enum
@@ -12,8 +12,46 @@ class EstadoPago(str, enum.Enum):
     PAGADO = "Pagado"
 
 
+class TipoEventoReserva(str, enum.Enum):
+    CREADA = "Creada"
+    CANCELADA = "Cancelada"
+    PAGO_ACTUALIZADO = "Pago actualizado"
+
+
 class Reserva(Base):
     __tablename__ = "reservas"
+    __table_args__ = (
+        # Verificacion de conflictos y filtros por cancha.
+        Index("ix_reservas_cancha_fecha_estado", "cancha_id", "fecha", "estado_pago"),
+        # Historial del usuario ordenado por fecha.
+        Index("ix_reservas_usuario_fecha", "usuario_id", "fecha"),
+        # Dashboard y reportes por rango de fechas.
+        Index("ix_reservas_fecha_estado", "fecha", "estado_pago"),
+        # Solo reservas activas, donde el motor soporta indices parciales.
+        Index(
+            "ix_reservas_activas_cancha_fecha",
+            "cancha_id", "fecha", "hora_inicio", "hora_fin",
+            sqlite_where=text("estado_pago != 'LIBRE'"),
+            postgresql_where=text("estado_pago != 'LIBRE'"),
+        ),
+        # Dashboard: una sola pasada sobre las reservas activas sin tocar la tabla.
+        Index(
+            "ix_reservas_activas_fecha_estado_precio",
+            "fecha", "estado_pago", "precio_total",
+            sqlite_where=text("estado_pago != 'LIBRE'"),
+            postgresql_where=text("estado_pago != 'LIBRE'"),
+        ),
+        # Ingresos: solo reservas pagadas.
+        Index(
+            "ix_reservas_pagadas_fecha",
+            "fecha", "precio_total",
+            sqlite_where=text("estado_pago = 'PAGADO'"),
+            postgresql_where=text("estado_pago = 'PAGADO'"),
+        ),
+        # Sin AUTOINCREMENT SQLite reusa el id mas alto si se borra, y un id archivado no puede volver
+        # a asignarse: reservas_historico y reserva_eventos lo siguen usando.
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     usuario_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -30,3 +68,93 @@ class Reserva(Base):
 
     usuario = relationship("User", backref="reservas")
     cancha = relationship("Cancha", backref="reservas")
+
+
+class ReservaSlot(Base):
+    """Claim of one SLOT_MINUTOS block of a court by an active reservation.
+
+    The primary key (cancha_id, fecha, slot) makes the database reject a
+    double booking atomically, without locking unrelated courts or dates.
+    """
+    __tablename__ = "reserva_slots"
+    __table_args__ = (
+        PrimaryKeyConstraint("cancha_id", "fecha", "slot", name="pk_reserva_slots"),
+    )
+
+    cancha_id = Column(Integer, ForeignKey("canchas.id"), nullable=False)
+    fecha = Column(Date, nullable=False)
+    slot = Column(Integer, nullable=False)
+    reserva_id = Column(Integer, ForeignKey("reservas.id"), nullable=False, index=True)
+
+
+class ReservaEvento(Base):
+    """Append-only history of a reservation: creation, cancellation and payment changes.
+
+    reserva_id has no foreign key on purpose, so the history outlives the
+    reservation row (e.g. once it is archived).
+    """
+    __tablename__ = "reserva_eventos"
+    __table_args__ = (
+        Index("ix_reserva_eventos_reserva_fecha", "reserva_id", "created_at"),
+        Index("ix_reserva_eventos_fecha", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    reserva_id = Column(Integer, nullable=False)
+    tipo = Column(SQLEnum(TipoEventoReserva), nullable=False)
+    # NULL cuando no hay un usuario autenticado detras del cambio.
+    actor_usuario_id = Column(Integer, nullable=True)
+    actor_es_admin = Column(Boolean, nullable=False, default=False)
+    estado_anterior = Column(SQLEnum(EstadoPago), nullable=True)
+    estado_nuevo = Column(SQLEnum(EstadoPago), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ReservaHistorico(Base):
+    """Archived reservations, moved out of `reservas` once they fall behind the archive horizon.
+
+    Same columns and ids as `reservas`, so reports can UNION ALL both tables.
+    usuario_id and cancha_id carry no foreign keys: the archive only grows
+    and must not block changes to users or courts.
+    """
+    __tablename__ = "reservas_historico"
+    __table_args__ = (
+        Index("ix_reservas_historico_fecha_estado", "fecha", "estado_pago"),
+        Index("ix_reservas_historico_cancha_fecha", "cancha_id", "fecha"),
+        Index("ix_reservas_historico_usuario_fecha", "usuario_id", "fecha"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    usuario_id = Column(Integer, nullable=False)
+    cancha_id = Column(Integer, nullable=False)
+    fecha = Column(Date, nullable=False)
+    hora_inicio = Column(Time, nullable=False)
+    hora_fin = Column(Time, nullable=False)
+    jugadores = Column(Integer, nullable=False)
+    estado_pago = Column(SQLEnum(EstadoPago), nullable=True)
+    precio_total = Column(DECIMAL(10, 2), nullable=False)
+    observaciones = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+    archivada_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ReservaRollupDiario(Base):
+    """Reservation counts and amounts per (fecha, cancha_id, estado_pago, hora).
+
+    Kept up to date by the ReservaService write paths in the same transaction
+    as the change, so reports aggregate about days x courts rows instead of
+    every reservation. `hora` is the hour of hora_inicio. Archived
+    reservations stay counted: archiving moves rows, it doesn't change them.
+    """
+    __tablename__ = "reservas_rollup_diario"
+    __table_args__ = (
+        PrimaryKeyConstraint("fecha", "cancha_id", "estado_pago", "hora", name="pk_reservas_rollup_diario"),
+    )
+
+    fecha = Column(Date, nullable=False)
+    cancha_id = Column(Integer, nullable=False)
+    estado_pago = Column(SQLEnum(EstadoPago), nullable=False)
+    hora = Column(Integer, nullable=False)
+    reservas = Column(Integer, nullable=False, default=0)
+    ingresos = Column(DECIMAL(12, 2), nullable=False, default=0)
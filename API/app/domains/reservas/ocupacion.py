@@ -0,0 +1,174 @@
+import threading
+import time as reloj
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import date, time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.domains.reservas.models import Reserva, EstadoPago
+
+OCUPACION_MAXSIZE = 4096
+# Tope de staleness para cambios hechos por otro proceso.
+OCUPACION_TTL = 60
+
+
+def _segundos(hora: time) -> int:
+    return hora.hour * 3600 + hora.minute * 60 + hora.second
+
+
+def hueco_libre(ocupados: list[tuple], hora_inicio: time, hora_fin: time) -> bool:
+    """Whether [hora_inicio, hora_fin) fits in a sorted list of occupied second intervals."""
+    inicio, fin = _segundos(hora_inicio), _segundos(hora_fin)
+    # Los intervalos activos nunca se solapan entre si, por lo que el unico
+    # candidato a conflicto es el ultimo que empieza antes de `fin`.
+    idx = bisect_left(ocupados, (fin,))
+    return idx == 0 or ocupados[idx - 1][1] <= inicio
+
+
+class IndiceOcupacion:
+    """In-memory index of occupied intervals per (cancha_id, fecha).
+
+    Each day is loaded lazily with a single query and then kept in sync by
+    the ReservaService write paths, so conflict checks and availability
+    answers are a bisect over a sorted list instead of a database round trip.
+    The index is per process and bounded like TTLCache: the least recently
+    used days are evicted past `maxsize`, and a day is reloaded from the
+    database once `ttl` expires so writes from other processes show up.
+    """
+
+    def __init__(self, maxsize: int = OCUPACION_MAXSIZE, ttl: float = OCUPACION_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (cancha_id, fecha) -> (expira, [(inicio_seg, fin_seg, reserva_id)] ordenados por inicio).
+        self._dias: OrderedDict[tuple[int, date], tuple[float, list[tuple[int, int, int]]]] = OrderedDict()
+        # Cargas en curso; una escritura sobre el dia descarta la suya para que no se guarde vieja.
+        self._cargas: dict[tuple[int, date], object] = {}
+
+    def esta_libre(self, db: Session, cancha_id: int, fecha: date, hora_inicio: time, hora_fin: time) -> bool:
+        ocupados = self._intervalos(db, cancha_id, fecha)
+        with self._lock:
+            return hueco_libre(ocupados, hora_inicio, hora_fin)
+
+    def intervalos_ocupados(
+        self,
+        db: Session,
+        cancha_id: int,
+        fecha: date,
+        recargar: bool = False
+    ) -> list[tuple[int, int]]:
+        """Return the occupied (start, end) second offsets for the day, sorted.
+
+        With `recargar` the day is read from the database even if it is cached.
+        """
+        ocupados = self._intervalos(db, cancha_id, fecha, recargar)
+        with self._lock:
+            return [(inicio, fin) for inicio, fin, _ in ocupados]
+
+    def registrar(self, reserva: Reserva) -> None:
+        key = (reserva.cancha_id, reserva.fecha)
+        intervalo = (_segundos(reserva.hora_inicio), _segundos(reserva.hora_fin), reserva.id)
+        with self._lock:
+            self._cargas.pop(key, None)
+            entrada = self._dias.get(key)
+            if entrada is not None and intervalo not in entrada[1]:
+                insort(entrada[1], intervalo)
+
+    def liberar(self, reserva: Reserva) -> None:
+        key = (reserva.cancha_id, reserva.fecha)
+        with self._lock:
+            self._cargas.pop(key, None)
+            entrada = self._dias.get(key)
+            if entrada is not None:
+                self._dias[key] = (entrada[0], [i for i in entrada[1] if i[2] != reserva.id])
+
+    def invalidar(self, cancha_id: int, fecha: date) -> None:
+        key = (cancha_id, fecha)
+        with self._lock:
+            self._cargas.pop(key, None)
+            self._dias.pop(key, None)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._dias.clear()
+            self._cargas.clear()
+
+    def _intervalos(
+        self,
+        db: Session,
+        cancha_id: int,
+        fecha: date,
+        recargar: bool = False
+    ) -> list[tuple[int, int, int]]:
+        key = (cancha_id, fecha)
+        ocupados, carga = self._en_cache(key, recargar)
+        if ocupados is not None:
+            return ocupados
+        try:
+            rows = db.execute(_consulta_dia(cancha_id, fecha)).all()
+        except Exception:
+            self._abandonar(key, carga)
+            raise
+        return self._guardar(key, carga, rows)
+
+    async def intervalos_ocupados_async(
+        self,
+        db: AsyncSession,
+        cancha_id: int,
+        fecha: date,
+        recargar: bool = False
+    ) -> list[tuple[int, int]]:
+        """`intervalos_ocupados` with the load awaited on an AsyncSession."""
+        key = (cancha_id, fecha)
+        ocupados, carga = self._en_cache(key, recargar)
+        if ocupados is None:
+            try:
+                rows = (await db.execute(_consulta_dia(cancha_id, fecha))).all()
+            except Exception:
+                self._abandonar(key, carga)
+                raise
+            ocupados = self._guardar(key, carga, rows)
+        with self._lock:
+            return [(inicio, fin) for inicio, fin, _ in ocupados]
+
+    def _en_cache(self, key: tuple[int, date], recargar: bool):
+        """Return (cached intervals, None) or (None, token of a new load)."""
+        with self._lock:
+            entrada = self._dias.get(key)
+            if entrada is not None and not recargar and entrada[0] >= reloj.monotonic():
+                self._dias.move_to_end(key)
+                return entrada[1], None
+            carga = self._cargas[key] = object()
+            return None, carga
+
+    def _abandonar(self, key: tuple[int, date], carga: object) -> None:
+        with self._lock:
+            if self._cargas.get(key) is carga:
+                del self._cargas[key]
+
+    def _guardar(self, key: tuple[int, date], carga: object, rows) -> list[tuple[int, int, int]]:
+        ocupados = sorted((_segundos(r.hora_inicio), _segundos(r.hora_fin), r.id) for r in rows)
+        with self._lock:
+            # Si hubo una escritura mientras se consultaba, la carga puede estar
+            # incompleta: se usa para esta consulta pero no se guarda.
+            if self._cargas.get(key) is carga:
+                del self._cargas[key]
+                self._dias[key] = (reloj.monotonic() + self.ttl, ocupados)
+                self._dias.move_to_end(key)
+                while len(self._dias) > self.maxsize:
+                    self._dias.popitem(last=False)
+        return ocupados
+
+
+def _consulta_dia(cancha_id: int, fecha: date):
+    return select(Reserva.id, Reserva.hora_inicio, Reserva.hora_fin).where(
+        Reserva.cancha_id == cancha_id,
+        Reserva.fecha == fecha,
+        Reserva.estado_pago != EstadoPago.LIBRE
+    )
+
+
+indice_ocupacion = IndiceOcupacion()
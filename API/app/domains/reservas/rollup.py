@@ -0,0 +1,154 @@
+import argparse
+import logging
+from datetime import date, time
+from decimal import Decimal
+
+from sqlalchemy import extract, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.db.upsert import insert_upsert
+from app.domains.reportes.service import invalidar_reportes
+from app.domains.reservas.archivo import fuente_reservas
+from app.domains.reservas.models import EstadoPago, Reserva, ReservaHistorico, ReservaRollupDiario
+
+logger = logging.getLogger(__name__)
+
+CLAVE = ("fecha", "cancha_id", "estado_pago", "hora")
+
+
+def delta(
+    fecha: date,
+    cancha_id: int,
+    estado_pago: EstadoPago,
+    hora_inicio: time,
+    precio_total,
+    signo: int = 1
+) -> dict:
+    """One reservation entering (signo=1) or leaving (signo=-1) a rollup bucket."""
+    return {
+        "fecha": fecha,
+        "cancha_id": cancha_id,
+        "estado_pago": estado_pago,
+        "hora": hora_inicio.hour,
+        "reservas": signo,
+        "ingresos": signo * Decimal(str(precio_total))
+    }
+
+
+def cambio_estado(fecha, cancha_id, hora_inicio, precio_total, anterior: EstadoPago, nuevo: EstadoPago) -> list[dict]:
+    return [
+        delta(fecha, cancha_id, anterior, hora_inicio, precio_total, -1),
+        delta(fecha, cancha_id, nuevo, hora_inicio, precio_total)
+    ]
+
+
+def acumular(db: Session, deltas: list[dict]) -> None:
+    """Add the deltas to the rollup in the caller's transaction.
+
+    Deltas on the same bucket are merged first and buckets that net to zero
+    are skipped. Rows go in key order so concurrent writers lock buckets in
+    the same order.
+    """
+    netos: dict[tuple, list] = {}
+    for d in deltas:
+        neto = netos.setdefault(tuple(d[k] for k in CLAVE), [0, Decimal(0)])
+        neto[0] += d["reservas"]
+        neto[1] += d["ingresos"]
+    filas = [
+        {**dict(zip(CLAVE, clave)), "reservas": reservas, "ingresos": ingresos}
+        for clave, (reservas, ingresos) in sorted(netos.items(), key=lambda item: _orden(item[0]))
+        if reservas or ingresos
+    ]
+    if not filas:
+        return
+
+    stmt = insert_upsert(db, ReservaRollupDiario)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=list(CLAVE),
+            set_={
+                "reservas": ReservaRollupDiario.reservas + stmt.excluded.reservas,
+                "ingresos": ReservaRollupDiario.ingresos + stmt.excluded.ingresos
+            }
+        ),
+        filas
+    )
+
+
+def _orden(clave: tuple) -> tuple:
+    fecha, cancha_id, estado_pago, hora = clave
+    return fecha, cancha_id, estado_pago.name, hora
+
+
+def reconstruir_rollup(db: Session, fecha_desde: date | None = None, fecha_hasta: date | None = None) -> int:
+    """Recompute the rollup for the range from reservas and reservas_historico.
+
+    Used for the initial backfill and to repair drift. Returns the number of
+    buckets written.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # Las escrituras de reservas esperan al rebuild en su upsert y aplican su delta despues.
+        db.execute(text("LOCK TABLE reservas_rollup_diario IN EXCLUSIVE MODE"))
+
+    borrar = db.query(ReservaRollupDiario)
+    if fecha_desde is not None:
+        borrar = borrar.filter(ReservaRollupDiario.fecha >= fecha_desde)
+    if fecha_hasta is not None:
+        borrar = borrar.filter(ReservaRollupDiario.fecha <= fecha_hasta)
+    borrar.delete(synchronize_session=False)
+
+    Reservas = fuente_reservas(db, fecha_desde, fecha_hasta)
+    hora = extract("hour", Reservas.hora_inicio)
+    consulta = select(
+        Reservas.fecha,
+        Reservas.cancha_id,
+        Reservas.estado_pago,
+        hora,
+        func.count(Reservas.id),
+        func.coalesce(func.sum(Reservas.precio_total), 0)
+    ).where(Reservas.estado_pago.is_not(None))
+    if fecha_desde is not None:
+        consulta = consulta.where(Reservas.fecha >= fecha_desde)
+    if fecha_hasta is not None:
+        consulta = consulta.where(Reservas.fecha <= fecha_hasta)
+    consulta = consulta.group_by(Reservas.fecha, Reservas.cancha_id, Reservas.estado_pago, hora)
+
+    resultado = db.execute(
+        insert(ReservaRollupDiario).from_select([*CLAVE, "reservas", "ingresos"], consulta)
+    )
+    db.commit()
+    invalidar_reportes()
+    return resultado.rowcount
+
+
+def asegurar_rollup(db: Session) -> int:
+    """Backfill the rollup when it is empty but there are reservations to count.
+
+    A database that had reservations before the rollup table existed would
+    otherwise serve zeros from every rollup-backed report. Returns the
+    number of buckets written, 0 when nothing was needed.
+    """
+    if db.query(ReservaRollupDiario.fecha).first() is not None:
+        return 0
+    if db.query(Reserva.id).first() is None and db.query(ReservaHistorico.id).first() is None:
+        return 0
+    logger.warning("reservas_rollup_diario esta vacio y hay reservas: reconstruyendo el rollup")
+    return reconstruir_rollup(db)
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal, engine
+    from app.db.models import Base
+
+    parser = argparse.ArgumentParser(description="Reconstruye reservas_rollup_diario")
+    parser.add_argument("--desde", type=date.fromisoformat, default=None)
+    parser.add_argument("--hasta", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        logger.info(f"Rollup reconstruido: {reconstruir_rollup(session, args.desde, args.hasta)} filas")
+    finally:
+        session.close()
@@ -1,16 +1,18 @@
 from datetime import date
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, Query, Response
 
-from app.database import get_db
+from app.database import SessionRunner, get_runner
+from app.core.idempotency import ejecutar_idempotente, scope_anonimo
 from app.domains.auth.utils import get_current_user, get_current_admin
 from app.domains.users.models import User
-from app.domains.reservas.service import ReservaService
+from app.domains.reservas.service import ReservaService, ReservaServiceAsync
 from app.domains.reservas.models import EstadoPago
 from app.domains.reservas.schemas import (
     ReservaCreate, ReservaCreatePublic, ReservaPublicCreateResponse,
     ReservaCreateResponse, ReservaResponse, ReservaListResponse,
-    ReservaDetailGetResponse, PagoUpdate, PagoResponse, ReservaCancelResponse
+    ReservaDetailGetResponse, PagoUpdate, PagoResponse, ReservaCancelResponse,
+    ReservaBulkCreate, ReservaBulkResponse, ReservaEventosResponse,
+    PagoBulkUpdate, PagoBulkResponse
 )
 
 router = APIRouter(prefix="/reservas", tags=["Reservas"])
@@ -18,97 +20,161 @@ router = APIRouter(prefix="/reservas", tags=["Reservas"])
 
 # -- Reserva publica SIN auth: para consumidores que no tienen cuenta.
 @router.post("/public", response_model=ReservaPublicCreateResponse, status_code=201)
-def crear_reserva_publica(
+async def crear_reserva_publica(
     data: ReservaCreatePublic,
-    db: Session = Depends(get_db)
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = ReservaService(db)
-    return service.crear_publico(
-        cancha_id=data.cancha_id,
-        fecha=data.fecha,
-        hora_inicio=data.hora_inicio,
-        hora_fin=data.hora_fin,
-        jugadores=data.jugadores,
-        nombre=data.nombre,
-        email=data.email,
-        telefono=data.telefono,
-        observaciones=data.observaciones
-    )
+    return await db.run(lambda s: ejecutar_idempotente(
+        s, idempotency_key, scope_anonimo("POST /reservas/public", data.email), data.model_dump(),
+        lambda: ReservaService(s).crear_publico(
+            cancha_id=data.cancha_id,
+            fecha=data.fecha,
+            hora_inicio=data.hora_inicio,
+            hora_fin=data.hora_fin,
+            jugadores=data.jugadores,
+            nombre=data.nombre,
+            email=data.email,
+            telefono=data.telefono,
+            observaciones=data.observaciones
+        ),
+        status_code=201,
+        response_model=ReservaPublicCreateResponse
+    ))
 
 
 @router.post("", response_model=ReservaCreateResponse, status_code=201)
-def crear_reserva(
+async def crear_reserva(
     data: ReservaCreate,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = ReservaService(db)
-    return service.crear(
-        usuario_id=current_user.id,
-        cancha_id=data.cancha_id,
-        fecha=data.fecha,
-        hora_inicio=data.hora_inicio,
-        hora_fin=data.hora_fin,
-        jugadores=data.jugadores,
-        observaciones=data.observaciones
-    )
+    usuario_id = current_user.id
+    return await db.run(lambda s: ejecutar_idempotente(
+        s, idempotency_key, f"POST /reservas:{usuario_id}", data.model_dump(),
+        lambda: ReservaService(s).crear(
+            usuario_id=usuario_id,
+            cancha_id=data.cancha_id,
+            fecha=data.fecha,
+            hora_inicio=data.hora_inicio,
+            hora_fin=data.hora_fin,
+            jugadores=data.jugadores,
+            observaciones=data.observaciones
+        ),
+        status_code=201,
+        response_model=ReservaCreateResponse
+    ))
+
+
+@router.post("/bulk", response_model=ReservaBulkResponse, status_code=201)
+async def crear_reservas_bulk(
+    data: ReservaBulkCreate,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: SessionRunner = Depends(get_runner)
+):
+    usuario_id = current_user.id
+    result = await db.run(lambda s: ReservaService(s).crear_bulk(usuario_id=usuario_id, data=data))
+    response.status_code = result["status"]
+    return result
 
 
 @router.get("", response_model=ReservaListResponse)
-def listar_reservas(
+async def listar_reservas(
     fecha_desde: date | None = Query(None),
     fecha_hasta: date | None = Query(None),
     estado_pago: str | None = Query(None),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None),
+    incluir_total: bool = Query(True),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = ReservaService(db)
-    return service.listar_usuario(
+    filtros = dict(
         usuario_id=current_user.id,
         fecha_desde=fecha_desde,
         fecha_hasta=fecha_hasta,
         estado_pago=estado_pago,
         page=page,
-        limit=limit
+        limit=limit,
+        cursor=cursor,
+        incluir_total=incluir_total
+    )
+    return await db.run(
+        lambda s: ReservaService(s).listar_usuario(**filtros),
+        nativo=lambda s: ReservaServiceAsync(s).listar_usuario(**filtros)
     )
 
 
 @router.get("/{reserva_id}", response_model=ReservaDetailGetResponse)
-def get_reserva(
+async def get_reserva(
     reserva_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = ReservaService(db)
-    return service.get_detalle(
+    usuario_id, is_admin = current_user.id, current_user.is_admin
+    return await db.run(lambda s: ReservaService(s).get_detalle(
         reserva_id=reserva_id,
-        usuario_id=current_user.id,
-        is_admin=current_user.is_admin
-    )
+        usuario_id=usuario_id,
+        is_admin=is_admin
+    ))
+
+
+@router.get("/{reserva_id}/eventos", response_model=ReservaEventosResponse)
+async def get_reserva_eventos(
+    reserva_id: int,
+    current_user: User = Depends(get_current_user),
+    db: SessionRunner = Depends(get_runner)
+):
+    usuario_id, is_admin = current_user.id, current_user.is_admin
+    return await db.run(lambda s: ReservaService(s).get_eventos(
+        reserva_id=reserva_id,
+        usuario_id=usuario_id,
+        is_admin=is_admin
+    ))
 
 
 @router.delete("/{reserva_id}", response_model=ReservaCancelResponse)
-def cancelar_reserva(
+async def cancelar_reserva(
     reserva_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = ReservaService(db)
-    return service.cancelar(
+    usuario_id, is_admin = current_user.id, current_user.is_admin
+    return await db.run(lambda s: ReservaService(s).cancelar(
         reserva_id=reserva_id,
-        usuario_id=current_user.id,
-        is_admin=current_user.is_admin
-    )
+        usuario_id=usuario_id,
+        is_admin=is_admin
+    ))
 
 
 @router.patch("/{reserva_id}/pago", response_model=PagoResponse)
-def actualizar_pago(
+async def actualizar_pago(
     reserva_id: int,
     data: PagoUpdate,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_admin),
+    db: SessionRunner = Depends(get_runner)
+):
+    return await db.run(lambda s: ejecutar_idempotente(
+        s, idempotency_key, f"PATCH /reservas/{reserva_id}/pago:{current_user.id}", data.model_dump(),
+        lambda: ReservaService(s).actualizar_pago(reserva_id, data.estado_pago, actor_usuario_id=current_user.id),
+        response_model=PagoResponse
+    ))
+
+
+@router.patch("/pagos", response_model=PagoBulkResponse)
+async def actualizar_pagos(
+    data: PagoBulkUpdate,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
     current_user: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = ReservaService(db)
-    return service.actualizar_pago(reserva_id, data.estado_pago)
+    actor_usuario_id = current_user.id
+    return await db.run(lambda s: ejecutar_idempotente(
+        s, idempotency_key, f"PATCH /reservas/pagos:{actor_usuario_id}", data.model_dump(),
+        lambda: ReservaService(s).actualizar_pagos(data.pagos, actor_usuario_id=actor_usuario_id),
+        response_model=PagoBulkResponse
+    ))
@@ -1,5 +1,5 @@
-from datetime import date, time
-from pydantic import BaseModel, field_validator
+from datetime import date, datetime, time
+from pydantic import BaseModel, Field, field_validator, model_validator
 from app.domains.reservas.models import EstadoPago
 
 
@@ -72,9 +72,10 @@ class ReservaDetailGetResponse(BaseModel):
 class ReservaListResponse(BaseModel):
     status: int = 200
     reservas: list[ReservaResponse]
-    total: int
+    total: int | None = None
     page: int = 1
     limit: int = 20
+    next_cursor: str | None = None
 
 
 class PagoUpdate(BaseModel):
@@ -87,6 +88,40 @@ class PagoResponse(BaseModel):
     reserva: dict
 
 
+MAX_PAGOS_BULK = 500
+
+
+class PagoBulkItem(BaseModel):
+    reserva_id: int
+    estado_pago: EstadoPago
+
+
+class PagoBulkUpdate(BaseModel):
+    pagos: list[PagoBulkItem] = Field(..., min_length=1, max_length=MAX_PAGOS_BULK)
+
+    @model_validator(mode="after")
+    def validate_ids_unicos(self) -> "PagoBulkUpdate":
+        ids = [p.reserva_id for p in self.pagos]
+        if len(ids) != len(set(ids)):
+            raise ValueError("Cada reserva puede aparecer una sola vez")
+        return self
+
+
+class PagoBulkResultado(BaseModel):
+    reserva_id: int
+    estado_pago: str
+    actualizada: bool
+    motivo: str | None = None
+
+
+class PagoBulkResponse(BaseModel):
+    status: int = 200
+    message: str
+    actualizadas: int
+    rechazadas: int
+    resultados: list[PagoBulkResultado]
+
+
 class ReservaCancelResponse(BaseModel):
     status: int
     message: str
@@ -97,3 +132,72 @@ class ReservaPublicCreateResponse(BaseModel):
     message: str
     reserva: dict
     email_enviado: bool = False
+
+
+class SlotReserva(BaseModel):
+    fecha: date
+    hora_inicio: time
+    hora_fin: time
+
+
+class SerieReserva(BaseModel):
+    # Mismo criterio que Horario.dia_semana: 0=Domingo, 1=Lunes ... 6=Sábado.
+    dia_semana: int = Field(ge=0, le=6)
+    hora_inicio: time
+    hora_fin: time
+    fecha_desde: date
+    fecha_hasta: date
+
+    @model_validator(mode="after")
+    def validate_rango(self) -> "SerieReserva":
+        if self.fecha_hasta < self.fecha_desde:
+            raise ValueError("fecha_hasta debe ser posterior o igual a fecha_desde")
+        return self
+
+
+class ReservaBulkCreate(BaseModel):
+    cancha_id: int
+    jugadores: int
+    serie: SerieReserva | None = None
+    slots: list[SlotReserva] | None = None
+    todo_o_nada: bool = False
+    observaciones: str | None = None
+
+    @model_validator(mode="after")
+    def validate_origen(self) -> "ReservaBulkCreate":
+        if (self.serie is None) == (self.slots is None):
+            raise ValueError("Debe enviar una serie o una lista de slots, no ambas")
+        return self
+
+
+class ReservaBulkSlotResult(BaseModel):
+    fecha: date
+    hora_inicio: str
+    hora_fin: str
+    aceptada: bool
+    reserva_id: int | None = None
+    motivo: str | None = None
+
+
+class ReservaBulkResponse(BaseModel):
+    status: int
+    message: str
+    aceptadas: int
+    rechazadas: int
+    resultados: list[ReservaBulkSlotResult]
+
+
+class ReservaEventoResponse(BaseModel):
+    id: int
+    tipo: str
+    actor_usuario_id: int | None = None
+    actor_es_admin: bool = False
+    estado_anterior: str | None = None
+    estado_nuevo: str | None = None
+    created_at: datetime
+
+
+class ReservaEventosResponse(BaseModel):
+    status: int = 200
+    reserva_id: int
+    eventos: list[ReservaEventoResponse]
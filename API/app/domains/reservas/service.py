@@ -1,11 +1,47 @@
-from datetime import datetime, date, time, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, extract
-from app.domains.reservas.models import Reserva, EstadoPago
+import base64
+import csv
+import io
+import json
+from datetime import date, time, timedelta
+from typing import Iterator
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, insert, select, tuple_, update, case, literal
+from sqlalchemy.exc import IntegrityError
+from app.domains.reservas.models import Reserva, EstadoPago, TipoEventoReserva
+from app.domains.reservas.eventos import registrar_evento, registrar_eventos, fila_evento, listar_eventos
+from app.domains.reservas.ocupacion import indice_ocupacion
+from app.domains.reservas.rollup import acumular, delta, cambio_estado
+from app.domains.reservas.schemas import ReservaBulkCreate, SerieReserva, PagoBulkItem
+from app.domains.reservas.slots import (
+    HORARIO_NO_ALINEADO, alineada, filas_slots, reclamar_slots, liberar_slots, liberar_slots_de
+)
 from app.domains.canchas.models import Cancha
+from app.domains.canchas.agenda import agenda
+from app.domains.canchas.pricing import tarifario, quote_many
+from app.domains.canchas.service import invalidar_disponibilidad
+from app.domains.reportes.service import dashboard_cache, invalidar_reportes
 from app.domains.users.models import User
+from app.domains.auth.models import Auth
+from app.db.upsert import insert_upsert
+from app.core.cache import TTLCache
+from app.core.security import UNUSABLE_PASSWORD
 from app.core.exceptions import NotFoundException, ConflictException, ValidationException, ForbiddenException
 
+MAX_SLOTS_BULK = 200
+
+EXPORT_BATCH = 1000
+EXPORT_COLUMNAS = [
+    "id", "fecha", "hora_inicio", "hora_fin", "cancha_id", "cancha_nombre",
+    "usuario_id", "usuario_nombre", "jugadores", "estado_pago", "precio_total", "created_at"
+]
+
+# Totales exactos de los listados por combinacion de filtros; se vacia en cada escritura.
+totales_cache = TTLCache(maxsize=1024, ttl=60)
+
+_CONTAR = select(func.count(Reserva.id))
+_CON_USUARIO_Y_CANCHA = select(Reserva).options(joinedload(Reserva.usuario), joinedload(Reserva.cancha))
+
 
 class ReservaService:
     def __init__(self, db: Session):
@@ -25,23 +61,21 @@ class ReservaService:
     ) -> dict:
         if hora_fin <= hora_inicio:
             raise ValidationException("La hora de fin debe ser posterior a la hora de inicio")
-
-        from app.domains.auth.models import Auth
-        from app.core.security import hash_password
+        if not (alineada(hora_inicio) and alineada(hora_fin)):
+            raise ValidationException(HORARIO_NO_ALINEADO)
 
         email_normalizado = email.lower().strip()
 
-        # Buscar auth existente por email.
-        auth = self.db.query(Auth).filter(Auth.email == email_normalizado).first()
-        if not auth:
-            # Crear Auth y User juntos.
-            auth = Auth(
-                email=email_normalizado,
-                password_hash=hash_password("RESERVA-SIN-ACCESO-2026")
-            )
-            self.db.add(auth)
-            self.db.flush()  # para obtener auth.id antes de crear User.
+        # Upsert del email sin hash: la cuenta de invitado nunca puede iniciar sesion.
+        self.db.execute(
+            insert_upsert(self.db, Auth)
+            .values(email=email_normalizado, password_hash=UNUSABLE_PASSWORD)
+            .on_conflict_do_nothing(index_elements=["email"])
+        )
+        auth = self.db.query(Auth).filter(Auth.email == email_normalizado).one()
 
+        usuario = self.db.query(User).filter(User.auth_id == auth.id).first()
+        if not usuario:
             usuario = User(
                 auth_id=auth.id,
                 nombre=nombre.strip(),
@@ -49,18 +83,14 @@ class ReservaService:
                 is_admin=False
             )
             self.db.add(usuario)
-            self.db.commit()
-            self.db.refresh(usuario)
+            self.db.flush()
         else:
-            usuario = self.db.query(User).filter(User.auth_id == auth.id).first()
-            if not usuario:
-                raise NotFoundException("Usuario no encontrado para este correo")
             # Actualizar datos por si cambiaron.
             usuario.nombre = nombre.strip()
             if telefono:
                 usuario.telefono = telefono.strip()
-            self.db.commit()
 
+        # El usuario y la reserva se confirman juntos en el commit de crear().
         return self.crear(
             usuario_id=usuario.id,
             cancha_id=cancha_id,
@@ -83,33 +113,18 @@ class ReservaService:
     ) -> dict:
         if hora_fin <= hora_inicio:
             raise ValidationException("La hora de fin debe ser posterior a la hora de inicio")
+        if not (alineada(hora_inicio) and alineada(hora_fin)):
+            raise ValidationException(HORARIO_NO_ALINEADO)
 
-        cancha = self.db.query(Cancha).filter(Cancha.id == cancha_id).first()
-        if not cancha:
-            raise NotFoundException("Cancha no encontrada")
+        cancha = self._get_cancha_reservable(cancha_id, jugadores)
 
-        if not cancha.is_active:
-            raise ValidationException("La cancha no está disponible")
-
-        if jugadores > cancha.capacidad:
-            raise ValidationException(f"La cantidad de jugadores excede la capacidad de la cancha ({cancha.capacidad})")
-
-        reservas_conflictivas = self.db.query(Reserva).filter(
-            Reserva.cancha_id == cancha_id,
-            Reserva.fecha == fecha,
-            Reserva.estado_pago != EstadoPago.LIBRE,
-            or_(
-                and_(Reserva.hora_inicio < hora_fin, Reserva.hora_fin > hora_inicio)
-            )
-        ).first()
+        if not agenda.permite(self.db, cancha_id, fecha, hora_inicio, hora_fin):
+            raise ValidationException("El horario seleccionado está fuera del horario de atención")
 
-        if reservas_conflictivas:
+        if not indice_ocupacion.esta_libre(self.db, cancha_id, fecha, hora_inicio, hora_fin):
             raise ConflictException("El horario seleccionado ya está reservado")
 
-        inicio_dt = datetime.combine(fecha, hora_inicio)
-        fin_dt = datetime.combine(fecha, hora_fin)
-        duracion_horas = (fin_dt - inicio_dt).seconds / 3600
-        precio_total = float(cancha.precio_hora) * duracion_horas
+        precio_total = self._calcular_precio(cancha, fecha, hora_inicio, hora_fin)
 
         reserva = Reserva(
             usuario_id=usuario_id,
@@ -123,8 +138,24 @@ class ReservaService:
             observaciones=observaciones
         )
         self.db.add(reserva)
-        self.db.commit()
+        self.db.flush()
+        registrar_evento(
+            self.db, reserva.id, TipoEventoReserva.CREADA,
+            actor_usuario_id=usuario_id, estado_nuevo=EstadoPago.SIN_PAGAR
+        )
+        acumular(self.db, [delta(fecha, cancha_id, EstadoPago.SIN_PAGAR, hora_inicio, precio_total)])
+        try:
+            reclamar_slots(self.db, filas_slots(reserva.id, cancha_id, fecha, hora_inicio, hora_fin))
+            self.db.commit()
+        except IntegrityError:
+            # Otra solicitud reclamo el mismo horario entre la verificacion y el insert.
+            self.db.rollback()
+            indice_ocupacion.invalidar(cancha_id, fecha)
+            invalidar_disponibilidad(cancha_id, [fecha])
+            raise ConflictException("El horario seleccionado ya está reservado")
         self.db.refresh(reserva)
+        indice_ocupacion.registrar(reserva)
+        self._invalidar_caches(cancha_id, [fecha])
 
         return {
             "status": 201,
@@ -142,6 +173,134 @@ class ReservaService:
             }
         }
 
+    def crear_bulk(self, usuario_id: int, data: ReservaBulkCreate) -> dict:
+        if data.serie is not None:
+            slots = self._expandir_serie(data.serie)
+        else:
+            slots = [(s.fecha, s.hora_inicio, s.hora_fin) for s in data.slots]
+
+        if not slots:
+            raise ValidationException("La solicitud no contiene slots para reservar")
+        if len(slots) > MAX_SLOTS_BULK:
+            raise ValidationException(f"No se pueden reservar más de {MAX_SLOTS_BULK} slots por solicitud")
+
+        # Los slots se reclaman en bloques de SLOT_MINUTOS: un horario desalineado tomaria el bloque
+        # vecino y, con todo_o_nada, haria fallar toda la solicitud con un conflicto que no es tal.
+        if not all(alineada(hora_inicio) and alineada(hora_fin) for _, hora_inicio, hora_fin in slots):
+            raise ValidationException(HORARIO_NO_ALINEADO)
+
+        self._get_cancha_reservable(data.cancha_id, data.jugadores)
+
+        # Una sola consulta para todos los días de la solicitud.
+        ocupadas = self.db.query(Reserva.fecha, Reserva.hora_inicio, Reserva.hora_fin).filter(
+            Reserva.cancha_id == data.cancha_id,
+            Reserva.fecha.in_({fecha for fecha, _, _ in slots}),
+            Reserva.estado_pago != EstadoPago.LIBRE
+        ).all()
+        ocupado_por_fecha: dict[date, list[tuple[time, time]]] = {}
+        for r in ocupadas:
+            ocupado_por_fecha.setdefault(r.fecha, []).append((r.hora_inicio, r.hora_fin))
+
+        hoy = date.today()
+        resultados = []
+        filas = []
+        for fecha, hora_inicio, hora_fin in slots:
+            motivo = None
+            if fecha < hoy:
+                motivo = "La fecha no puede ser anterior a hoy"
+            elif hora_fin <= hora_inicio:
+                motivo = "La hora de fin debe ser posterior a la hora de inicio"
+            elif not agenda.permite(self.db, data.cancha_id, fecha, hora_inicio, hora_fin):
+                motivo = "El horario seleccionado está fuera del horario de atención"
+            elif any(i < hora_fin and f > hora_inicio for i, f in ocupado_por_fecha.get(fecha, [])):
+                motivo = "El horario seleccionado ya está reservado"
+
+            resultados.append({
+                "fecha": fecha,
+                "hora_inicio": hora_inicio.strftime("%H:%M"),
+                "hora_fin": hora_fin.strftime("%H:%M"),
+                "aceptada": motivo is None,
+                "reserva_id": None,
+                "motivo": motivo
+            })
+            if motivo is None:
+                # Los slots aceptados tambien ocupan el horario para el resto de la solicitud.
+                ocupado_por_fecha.setdefault(fecha, []).append((hora_inicio, hora_fin))
+                filas.append({
+                    "usuario_id": usuario_id,
+                    "cancha_id": data.cancha_id,
+                    "fecha": fecha,
+                    "hora_inicio": hora_inicio,
+                    "hora_fin": hora_fin,
+                    "jugadores": data.jugadores,
+                    "estado_pago": EstadoPago.SIN_PAGAR,
+                    "observaciones": data.observaciones
+                })
+
+        precios = quote_many(self.db, [
+            (fila["cancha_id"], fila["fecha"], fila["hora_inicio"], fila["hora_fin"]) for fila in filas
+        ])
+        for fila, precio in zip(filas, precios):
+            fila["precio_total"] = precio
+
+        rechazadas = len(resultados) - len(filas)
+        if not filas or (data.todo_o_nada and rechazadas):
+            for resultado in resultados:
+                if resultado["aceptada"]:
+                    resultado["aceptada"] = False
+                    resultado["motivo"] = "No reservado: la solicitud es todo o nada"
+            return {
+                "status": 409,
+                "message": "No se creó ninguna reserva",
+                "aceptadas": 0,
+                "rechazadas": len(resultados),
+                "resultados": resultados
+            }
+
+        fechas = {fila["fecha"] for fila in filas}
+        ids = self.db.scalars(
+            insert(Reserva).returning(Reserva.id, sort_by_parameter_order=True),
+            filas
+        ).all()
+        registrar_eventos(self.db, [
+            fila_evento(reserva_id, TipoEventoReserva.CREADA, actor_usuario_id=usuario_id, estado_nuevo=EstadoPago.SIN_PAGAR)
+            for reserva_id in ids
+        ])
+        acumular(self.db, [
+            delta(fila["fecha"], fila["cancha_id"], fila["estado_pago"], fila["hora_inicio"], fila["precio_total"])
+            for fila in filas
+        ])
+        try:
+            reclamar_slots(self.db, [
+                slot
+                for reserva_id, fila in zip(ids, filas)
+                for slot in filas_slots(reserva_id, fila["cancha_id"], fila["fecha"], fila["hora_inicio"], fila["hora_fin"])
+            ])
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            for fecha in fechas:
+                indice_ocupacion.invalidar(data.cancha_id, fecha)
+            invalidar_disponibilidad(data.cancha_id, fechas)
+            raise ConflictException("Otro usuario reservó alguno de los horarios durante la solicitud, intente de nuevo")
+
+        for fecha in fechas:
+            indice_ocupacion.invalidar(data.cancha_id, fecha)
+        self._invalidar_caches(data.cancha_id, fechas)
+
+        aceptados = iter(ids)
+        for resultado in resultados:
+            if resultado["aceptada"]:
+                resultado["reserva_id"] = next(aceptados)
+
+        return {
+            "status": 201,
+            "message": f"{len(filas)} reservas creadas exitosamente",
+            "aceptadas": len(filas),
+            "rechazadas": rechazadas,
+            "resultados": resultados
+        }
+
     def listar_usuario(
         self,
         usuario_id: int,
@@ -149,40 +308,34 @@ class ReservaService:
         fecha_hasta: date | None = None,
         estado_pago: str | None = None,
         page: int = 1,
-        limit: int = 20
+        limit: int = 20,
+        cursor: str | None = None,
+        incluir_total: bool = True
     ) -> dict:
-        query = self.db.query(Reserva).filter(Reserva.usuario_id == usuario_id)
-
-        if fecha_desde:
-            query = query.filter(Reserva.fecha >= fecha_desde)
-        if fecha_hasta:
-            query = query.filter(Reserva.fecha <= fecha_hasta)
-        if estado_pago:
-            query = query.filter(Reserva.estado_pago == EstadoPago(estado_pago))
-        else:
-            query = query.filter(Reserva.estado_pago != EstadoPago.LIBRE)
-
-        total = query.count()
-        reservas = query.order_by(Reserva.fecha.desc()).offset((page - 1) * limit).limit(limit).all()
+        def filtrar(stmt):
+            return _filtrar_usuario(stmt, usuario_id, fecha_desde, fecha_hasta, estado_pago)
 
-        return {
-            "status": 200,
-            "reservas": [self._format_reserva(r) for r in reservas],
-            "total": total,
-            "page": page,
-            "limit": limit
-        }
+        total = None
+        if incluir_total:
+            clave = ("usuario", usuario_id, fecha_desde, fecha_hasta, estado_pago)
+            total = totales_cache.get_or_set(clave, lambda: self.db.scalar(filtrar(_CONTAR)))
+        stmt = _paginar(filtrar(select(Reserva).options(joinedload(Reserva.cancha))), page, limit, cursor)
+        reservas, next_cursor = _cortar(self.db.scalars(stmt).all(), limit)
+        return _listado([_format_reserva(r) for r in reservas], total, page, limit, next_cursor)
 
     def get_detalle(self, reserva_id: int, usuario_id: int, is_admin: bool = False) -> dict:
-        reserva = self.db.query(Reserva).filter(Reserva.id == reserva_id).first()
+        reserva = self.db.query(Reserva).options(
+            joinedload(Reserva.usuario).joinedload(User.auth),
+            joinedload(Reserva.cancha)
+        ).filter(Reserva.id == reserva_id).first()
         if not reserva:
             raise NotFoundException("Reserva no encontrada")
 
         if not is_admin and reserva.usuario_id != usuario_id:
             raise ForbiddenException("No tienes acceso a esta reserva")
 
-        usuario = self.db.query(User).filter(User.id == reserva.usuario_id).first()
-        cancha = self.db.query(Cancha).filter(Cancha.id == reserva.cancha_id).first()
+        usuario = reserva.usuario
+        cancha = reserva.cancha
 
         return {
             "status": 200,
@@ -191,7 +344,7 @@ class ReservaService:
                 "usuario": {
                     "id": usuario.id,
                     "nombre": usuario.nombre,
-                    "email": getattr(usuario, 'email', 'N/A'),
+                    "email": usuario.auth.email if usuario.auth else "N/A",
                     "telefono": usuario.telefono
                 },
                 "cancha": {
@@ -210,6 +363,35 @@ class ReservaService:
             }
         }
 
+    def get_eventos(self, reserva_id: int, usuario_id: int, is_admin: bool = False) -> dict:
+        reserva = self.db.query(Reserva.usuario_id).filter(Reserva.id == reserva_id).first()
+        # El historial sobrevive a la reserva; sin ella solo un admin puede verlo.
+        if reserva is None and not is_admin:
+            raise NotFoundException("Reserva no encontrada")
+        if reserva is not None and not is_admin and reserva.usuario_id != usuario_id:
+            raise ForbiddenException("No tienes acceso a esta reserva")
+
+        eventos = listar_eventos(self.db, reserva_id)
+        if reserva is None and not eventos:
+            raise NotFoundException("Reserva no encontrada")
+
+        return {
+            "status": 200,
+            "reserva_id": reserva_id,
+            "eventos": [
+                {
+                    "id": e.id,
+                    "tipo": e.tipo.value,
+                    "actor_usuario_id": e.actor_usuario_id,
+                    "actor_es_admin": e.actor_es_admin,
+                    "estado_anterior": e.estado_anterior.value if e.estado_anterior else None,
+                    "estado_nuevo": e.estado_nuevo.value if e.estado_nuevo else None,
+                    "created_at": e.created_at
+                }
+                for e in eventos
+            ]
+        }
+
     def cancelar(self, reserva_id: int, usuario_id: int, is_admin: bool = False) -> dict:
         reserva = self.db.query(Reserva).filter(Reserva.id == reserva_id).first()
         if not reserva:
@@ -224,17 +406,24 @@ class ReservaService:
         if reserva.estado_pago == EstadoPago.PAGADO:
             raise ValidationException("No se puede cancelar una reserva pagada")
 
-        reserva.estado_pago = EstadoPago.LIBRE
-        reserva.observaciones = self._append_cancel_note(
-            reserva.observaciones,
-            actor_usuario_id=usuario_id,
-            is_admin=is_admin
+        registrar_evento(
+            self.db, reserva.id, TipoEventoReserva.CANCELADA,
+            actor_usuario_id=usuario_id, actor_es_admin=is_admin,
+            estado_anterior=reserva.estado_pago, estado_nuevo=EstadoPago.LIBRE
         )
+        acumular(self.db, cambio_estado(
+            reserva.fecha, reserva.cancha_id, reserva.hora_inicio, reserva.precio_total,
+            reserva.estado_pago, EstadoPago.LIBRE
+        ))
+        reserva.estado_pago = EstadoPago.LIBRE
+        liberar_slots(self.db, reserva.id)
         self.db.commit()
+        indice_ocupacion.liberar(reserva)
+        self._invalidar_caches(reserva.cancha_id, [reserva.fecha])
 
         return {"status": 200, "message": "Reserva cancelada exitosamente"}
 
-    def actualizar_pago(self, reserva_id: int, estado_pago: EstadoPago) -> dict:
+    def actualizar_pago(self, reserva_id: int, estado_pago: EstadoPago, actor_usuario_id: int | None = None) -> dict:
         reserva = self.db.query(Reserva).filter(Reserva.id == reserva_id).first()
         if not reserva:
             raise NotFoundException("Reserva no encontrada")
@@ -242,9 +431,24 @@ class ReservaService:
         if reserva.estado_pago == EstadoPago.LIBRE:
             raise ValidationException("No se puede actualizar el pago de una reserva cancelada")
 
+        # Solo los administradores actualizan pagos.
+        registrar_evento(
+            self.db, reserva.id, TipoEventoReserva.PAGO_ACTUALIZADO,
+            actor_usuario_id=actor_usuario_id, actor_es_admin=True,
+            estado_anterior=reserva.estado_pago, estado_nuevo=estado_pago
+        )
+        acumular(self.db, cambio_estado(
+            reserva.fecha, reserva.cancha_id, reserva.hora_inicio, reserva.precio_total,
+            reserva.estado_pago, estado_pago
+        ))
         reserva.estado_pago = estado_pago
+        if estado_pago == EstadoPago.LIBRE:
+            liberar_slots(self.db, reserva.id)
         self.db.commit()
         self.db.refresh(reserva)
+        if estado_pago == EstadoPago.LIBRE:
+            indice_ocupacion.liberar(reserva)
+        self._invalidar_caches(reserva.cancha_id, [reserva.fecha])
 
         return {
             "status": 200,
@@ -252,6 +456,87 @@ class ReservaService:
             "reserva": {"id": reserva.id, "estado_pago": estado_pago.value}
         }
 
+    def actualizar_pagos(self, pagos: list[PagoBulkItem], actor_usuario_id: int | None = None) -> dict:
+        """Apply many payment changes with one UPDATE in one transaction.
+
+        The "no updates to cancelled reservations" rule is part of the
+        UPDATE's WHERE clause, so a reservation cancelled concurrently is
+        reported as rejected rather than overwritten.
+        """
+        nuevos = {p.reserva_id: p.estado_pago for p in pagos}
+
+        # Estado previo para el historial; en PostgreSQL bloquea las filas hasta el commit.
+        previas = {
+            r.id: r for r in self.db.query(
+                Reserva.id, Reserva.cancha_id, Reserva.fecha, Reserva.estado_pago,
+                Reserva.hora_inicio, Reserva.precio_total
+            ).filter(Reserva.id.in_(nuevos)).with_for_update().all()
+        }
+
+        actualizadas = set()
+        if previas:
+            actualizadas = set(self.db.scalars(
+                update(Reserva)
+                .where(Reserva.id.in_(previas), Reserva.estado_pago != EstadoPago.LIBRE)
+                .values(estado_pago=case(
+                    {rid: literal(estado, Reserva.estado_pago.type) for rid, estado in nuevos.items()},
+                    value=Reserva.id
+                ))
+                .returning(Reserva.id)
+                .execution_options(synchronize_session=False)
+            ).all())
+
+        liberadas = [previas[rid] for rid in actualizadas if nuevos[rid] == EstadoPago.LIBRE]
+        liberar_slots_de(self.db, [r.id for r in liberadas])
+        # Solo los administradores actualizan pagos.
+        registrar_eventos(self.db, [
+            fila_evento(
+                rid, TipoEventoReserva.PAGO_ACTUALIZADO,
+                actor_usuario_id=actor_usuario_id, actor_es_admin=True,
+                estado_anterior=previas[rid].estado_pago, estado_nuevo=nuevos[rid]
+            )
+            for rid in sorted(actualizadas)
+        ])
+        acumular(self.db, [
+            d
+            for rid in actualizadas
+            for d in cambio_estado(
+                previas[rid].fecha, previas[rid].cancha_id, previas[rid].hora_inicio,
+                previas[rid].precio_total, previas[rid].estado_pago, nuevos[rid]
+            )
+        ])
+        self.db.commit()
+
+        for reserva in liberadas:
+            indice_ocupacion.liberar(reserva)
+        fechas_por_cancha: dict[int, set[date]] = {}
+        for rid in actualizadas:
+            fechas_por_cancha.setdefault(previas[rid].cancha_id, set()).add(previas[rid].fecha)
+        for cancha_id, fechas in fechas_por_cancha.items():
+            self._invalidar_caches(cancha_id, fechas)
+
+        resultados = []
+        for p in pagos:
+            motivo = None
+            if p.reserva_id not in previas:
+                motivo = "Reserva no encontrada"
+            elif p.reserva_id not in actualizadas:
+                motivo = "No se puede actualizar el pago de una reserva cancelada"
+            resultados.append({
+                "reserva_id": p.reserva_id,
+                "estado_pago": p.estado_pago.value,
+                "actualizada": motivo is None,
+                "motivo": motivo
+            })
+
+        return {
+            "status": 200,
+            "message": "Estados de pago actualizados",
+            "actualizadas": len(actualizadas),
+            "rechazadas": len(pagos) - len(actualizadas),
+            "resultados": resultados
+        }
+
     def listar_todas(
         self,
         fecha: date | None = None,
@@ -259,66 +544,286 @@ class ReservaService:
         estado_pago: str | None = None,
         usuario_id: int | None = None,
         page: int = 1,
-        limit: int = 50
+        limit: int = 50,
+        cursor: str | None = None,
+        incluir_total: bool = True
     ) -> dict:
-        query = self.db.query(Reserva)
-
-        if fecha:
-            query = query.filter(Reserva.fecha == fecha)
-        if cancha_id:
-            query = query.filter(Reserva.cancha_id == cancha_id)
-        if estado_pago:
-            query = query.filter(Reserva.estado_pago == EstadoPago(estado_pago))
-        else:
-            query = query.filter(Reserva.estado_pago != EstadoPago.LIBRE)
-        if usuario_id:
-            query = query.filter(Reserva.usuario_id == usuario_id)
+        def filtrar(stmt):
+            return _filtrar_admin(stmt, fecha, cancha_id, estado_pago, usuario_id)
+
+        total = None
+        if incluir_total:
+            clave = ("admin", fecha, cancha_id, estado_pago, usuario_id)
+            total = totales_cache.get_or_set(clave, lambda: self.db.scalar(filtrar(_CONTAR)))
+        stmt = _paginar(filtrar(_CON_USUARIO_Y_CANCHA), page, limit, cursor)
+        reservas, next_cursor = _cortar(self.db.scalars(stmt).all(), limit)
+        return _listado([_format_reserva_admin(r) for r in reservas], total, page, limit, next_cursor)
+
+    def exportar(
+        self,
+        formato: str = "csv",
+        fecha: date | None = None,
+        cancha_id: int | None = None,
+        estado_pago: str | None = None,
+        usuario_id: int | None = None
+    ) -> Iterator[str]:
+        """Yield the filtered reservations as CSV or NDJSON text chunks.
+
+        Rows come from a server-side cursor in batches of EXPORT_BATCH, so memory
+        stays flat regardless of how many rows are exported.
+        """
+        stmt = select(
+            Reserva.id,
+            Reserva.fecha,
+            Reserva.hora_inicio,
+            Reserva.hora_fin,
+            Reserva.cancha_id,
+            Cancha.nombre.label("cancha_nombre"),
+            Reserva.usuario_id,
+            User.nombre.label("usuario_nombre"),
+            Reserva.jugadores,
+            Reserva.estado_pago,
+            Reserva.precio_total,
+            Reserva.created_at
+        ).join(Cancha, Cancha.id == Reserva.cancha_id).join(User, User.id == Reserva.usuario_id)
+        stmt = _filtrar_admin(stmt, fecha, cancha_id, estado_pago, usuario_id)
+        stmt = stmt.order_by(Reserva.fecha, Reserva.id).execution_options(
+            yield_per=EXPORT_BATCH,
+            stream_results=True
+        )
 
-        total = query.count()
-        reservas = query.order_by(Reserva.fecha.desc()).offset((page - 1) * limit).limit(limit).all()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if formato == "csv":
+            writer.writerow(EXPORT_COLUMNAS)
+
+        for partition in self.db.execute(stmt).partitions():
+            for row in partition:
+                fila = [
+                    row.id,
+                    row.fecha.isoformat(),
+                    row.hora_inicio.strftime("%H:%M"),
+                    row.hora_fin.strftime("%H:%M"),
+                    row.cancha_id,
+                    row.cancha_nombre,
+                    row.usuario_id,
+                    row.usuario_nombre,
+                    row.jugadores,
+                    row.estado_pago.value,
+                    float(row.precio_total),
+                    row.created_at.isoformat() if row.created_at else None
+                ]
+                if formato == "csv":
+                    writer.writerow(fila)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNAS, fila)), ensure_ascii=False))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def _invalidar_caches(self, cancha_id: int, fechas) -> None:
+        """Drop cached data derived from reservations after a committed write."""
+        totales_cache.clear()
+        dashboard_cache.clear()
+        invalidar_reportes(fechas)
+        invalidar_disponibilidad(cancha_id, fechas)
+
+    def _get_cancha_reservable(self, cancha_id: int, jugadores: int) -> Cancha:
+        cancha = self.db.query(Cancha).filter(Cancha.id == cancha_id).first()
+        if not cancha:
+            raise NotFoundException("Cancha no encontrada")
 
-        return {
-            "status": 200,
-            "reservas": [self._format_reserva_admin(r) for r in reservas],
-            "total": total,
-            "page": page,
-            "limit": limit
-        }
+        if not cancha.is_active:
+            raise ValidationException("La cancha no está disponible")
 
-    def _format_reserva(self, reserva: Reserva) -> dict:
-        cancha = self.db.query(Cancha).filter(Cancha.id == reserva.cancha_id).first()
-        return {
-            "id": reserva.id,
-            "cancha": {"id": cancha.id, "nombre": cancha.nombre, "tipo": cancha.tipo},
-            "fecha": reserva.fecha,
-            "hora_inicio": reserva.hora_inicio.strftime("%H:%M"),
-            "hora_fin": reserva.hora_fin.strftime("%H:%M"),
-            "jugadores": reserva.jugadores,
-            "estado_pago": reserva.estado_pago.value,
-            "precio_total": float(reserva.precio_total)
-        }
+        if jugadores > cancha.capacidad:
+            raise ValidationException(f"La cantidad de jugadores excede la capacidad de la cancha ({cancha.capacidad})")
 
-    def _format_reserva_admin(self, reserva: Reserva) -> dict:
-        usuario = self.db.query(User).filter(User.id == reserva.usuario_id).first()
-        cancha = self.db.query(Cancha).filter(Cancha.id == reserva.cancha_id).first()
-        return {
-            "id": reserva.id,
-            "usuario": {"id": usuario.id, "nombre": usuario.nombre},
-            "cancha": {"id": cancha.id, "nombre": cancha.nombre},
-            "fecha": reserva.fecha,
-            "hora_inicio": reserva.hora_inicio.strftime("%H:%M"),
-            "hora_fin": reserva.hora_fin.strftime("%H:%M"),
-            "estado_pago": reserva.estado_pago.value,
-            "precio_total": float(reserva.precio_total),
-            "created_at": reserva.created_at.isoformat() if reserva.created_at else None
-        }
+        return cancha
+
+    def _calcular_precio(self, cancha: Cancha, fecha: date, hora_inicio: time, hora_fin: time) -> float:
+        return tarifario.cotizar(self.db, cancha.id, fecha, hora_inicio, hora_fin)
 
-    def _append_cancel_note(self, observaciones: str | None, actor_usuario_id: int, is_admin: bool) -> str:
-        actor = "admin" if is_admin else "usuario"
-        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
-        note = f"[CANCELADA por {actor} {actor_usuario_id} - {timestamp}]"
+    def _expandir_serie(self, serie: SerieReserva) -> list[tuple[date, time, time]]:
+        slots = []
+        fecha = serie.fecha_desde
+        while fecha <= serie.fecha_hasta:
+            # date.weekday() usa 0=Lunes; Horario.dia_semana usa 0=Domingo.
+            if (fecha.weekday() + 1) % 7 == serie.dia_semana:
+                slots.append((fecha, serie.hora_inicio, serie.hora_fin))
+            fecha += timedelta(days=1)
+        return slots
 
-        if observaciones:
-            return f"{observaciones}\n{note}"
 
-        return note
+class ReservaServiceAsync:
+    """The reservation listings for DB_ASYNC, with their queries awaited on the async driver.
+
+    Statements, caching and formatting are the ones ReservaService uses;
+    only the round trips differ.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def listar_usuario(
+        self,
+        usuario_id: int,
+        fecha_desde: date | None = None,
+        fecha_hasta: date | None = None,
+        estado_pago: str | None = None,
+        page: int = 1,
+        limit: int = 20,
+        cursor: str | None = None,
+        incluir_total: bool = True
+    ) -> dict:
+        def filtrar(stmt):
+            return _filtrar_usuario(stmt, usuario_id, fecha_desde, fecha_hasta, estado_pago)
+
+        total = None
+        if incluir_total:
+            clave = ("usuario", usuario_id, fecha_desde, fecha_hasta, estado_pago)
+            total = await totales_cache.get_or_set_async(clave, lambda: self.db.scalar(filtrar(_CONTAR)))
+        stmt = _paginar(filtrar(select(Reserva).options(joinedload(Reserva.cancha))), page, limit, cursor)
+        reservas, next_cursor = _cortar((await self.db.scalars(stmt)).all(), limit)
+        return _listado([_format_reserva(r) for r in reservas], total, page, limit, next_cursor)
+
+    async def listar_todas(
+        self,
+        fecha: date | None = None,
+        cancha_id: int | None = None,
+        estado_pago: str | None = None,
+        usuario_id: int | None = None,
+        page: int = 1,
+        limit: int = 50,
+        cursor: str | None = None,
+        incluir_total: bool = True
+    ) -> dict:
+        def filtrar(stmt):
+            return _filtrar_admin(stmt, fecha, cancha_id, estado_pago, usuario_id)
+
+        total = None
+        if incluir_total:
+            clave = ("admin", fecha, cancha_id, estado_pago, usuario_id)
+            total = await totales_cache.get_or_set_async(clave, lambda: self.db.scalar(filtrar(_CONTAR)))
+        stmt = _paginar(filtrar(_CON_USUARIO_Y_CANCHA), page, limit, cursor)
+        reservas, next_cursor = _cortar((await self.db.scalars(stmt)).all(), limit)
+        return _listado([_format_reserva_admin(r) for r in reservas], total, page, limit, next_cursor)
+
+
+def _filtrar_admin(
+    query,
+    fecha: date | None,
+    cancha_id: int | None,
+    estado_pago: str | None,
+    usuario_id: int | None
+):
+    if fecha:
+        query = query.filter(Reserva.fecha == fecha)
+    if cancha_id:
+        query = query.filter(Reserva.cancha_id == cancha_id)
+    if estado_pago:
+        query = query.filter(Reserva.estado_pago == EstadoPago(estado_pago))
+    else:
+        query = query.filter(Reserva.estado_pago != EstadoPago.LIBRE)
+    if usuario_id:
+        query = query.filter(Reserva.usuario_id == usuario_id)
+    return query
+
+
+def _filtrar_usuario(
+    query,
+    usuario_id: int,
+    fecha_desde: date | None,
+    fecha_hasta: date | None,
+    estado_pago: str | None
+):
+    query = query.filter(Reserva.usuario_id == usuario_id)
+    if fecha_desde:
+        query = query.filter(Reserva.fecha >= fecha_desde)
+    if fecha_hasta:
+        query = query.filter(Reserva.fecha <= fecha_hasta)
+    if estado_pago:
+        query = query.filter(Reserva.estado_pago == EstadoPago(estado_pago))
+    else:
+        query = query.filter(Reserva.estado_pago != EstadoPago.LIBRE)
+    return query
+
+
+def _paginar(stmt, page: int, limit: int, cursor: str | None):
+    """Page on (fecha desc, id desc); with a cursor the cost does not depend on depth.
+
+    Fetches one extra row so `_cortar` can tell whether there is a next page.
+    """
+    stmt = stmt.order_by(Reserva.fecha.desc(), Reserva.id.desc())
+    if cursor:
+        fecha, reserva_id = _decode_cursor(cursor)
+        stmt = stmt.filter(tuple_(Reserva.fecha, Reserva.id) < tuple_(fecha, reserva_id))
+    else:
+        stmt = stmt.offset((page - 1) * limit)
+    return stmt.limit(limit + 1)
+
+
+def _cortar(reservas, limit: int) -> tuple[list[Reserva], str | None]:
+    if len(reservas) <= limit:
+        return list(reservas), None
+    reservas = reservas[:limit]
+    return reservas, _encode_cursor(reservas[-1])
+
+
+def _listado(reservas: list[dict], total: int | None, page: int, limit: int, next_cursor: str | None) -> dict:
+    return {
+        "status": 200,
+        "reservas": reservas,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "next_cursor": next_cursor
+    }
+
+
+def _encode_cursor(reserva: Reserva) -> str:
+    raw = f"{reserva.fecha.isoformat()}|{reserva.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        fecha, reserva_id = raw.split("|")
+        return date.fromisoformat(fecha), int(reserva_id)
+    except ValueError:
+        raise ValidationException("Cursor de paginación inválido")
+
+
+def _format_reserva(reserva: Reserva) -> dict:
+    cancha = reserva.cancha
+    return {
+        "id": reserva.id,
+        "cancha": {"id": cancha.id, "nombre": cancha.nombre, "tipo": cancha.tipo},
+        "fecha": reserva.fecha,
+        "hora_inicio": reserva.hora_inicio.strftime("%H:%M"),
+        "hora_fin": reserva.hora_fin.strftime("%H:%M"),
+        "jugadores": reserva.jugadores,
+        "estado_pago": reserva.estado_pago.value,
+        "precio_total": float(reserva.precio_total)
+    }
+
+
+def _format_reserva_admin(reserva: Reserva) -> dict:
+    usuario = reserva.usuario
+    cancha = reserva.cancha
+    return {
+        "id": reserva.id,
+        "usuario": {"id": usuario.id, "nombre": usuario.nombre},
+        "cancha": {"id": cancha.id, "nombre": cancha.nombre},
+        "fecha": reserva.fecha,
+        "hora_inicio": reserva.hora_inicio.strftime("%H:%M"),
+        "hora_fin": reserva.hora_fin.strftime("%H:%M"),
+        "estado_pago": reserva.estado_pago.value,
+        "precio_total": float(reserva.precio_total),
+        "created_at": reserva.created_at.isoformat() if reserva.created_at else None
+    }
@@ -0,0 +1,89 @@
+import logging
+from datetime import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.domains.reservas.models import Reserva, ReservaSlot, EstadoPago
+
+logger = logging.getLogger(__name__)
+
+SLOT_MINUTOS = 15
+HORARIO_NO_ALINEADO = f"Los horarios deben ser múltiplos de {SLOT_MINUTOS} minutos"
+
+
+def alineada(hora: time) -> bool:
+    """Whether `hora` falls on a slot boundary."""
+    return hora.minute % SLOT_MINUTOS == 0 and hora.second == 0 and hora.microsecond == 0
+
+
+def slots_de(hora_inicio: time, hora_fin: time) -> range:
+    """Return the slot numbers covered by [hora_inicio, hora_fin).
+
+    Times that are not aligned to SLOT_MINUTOS claim the whole partial slot.
+    Bookings are rejected unless both ends are aligned (see `alineada`), so
+    only rows created before that check can hit this rounding.
+    """
+    tamano = SLOT_MINUTOS * 60
+    inicio = hora_inicio.hour * 3600 + hora_inicio.minute * 60 + hora_inicio.second
+    fin = hora_fin.hour * 3600 + hora_fin.minute * 60 + hora_fin.second
+    return range(inicio // tamano, -(-fin // tamano))
+
+
+def filas_slots(reserva_id: int, cancha_id: int, fecha, hora_inicio: time, hora_fin: time) -> list[dict]:
+    return [
+        {"cancha_id": cancha_id, "fecha": fecha, "slot": slot, "reserva_id": reserva_id}
+        for slot in slots_de(hora_inicio, hora_fin)
+    ]
+
+
+def reclamar_slots(db: Session, filas: list[dict]) -> None:
+    """Insert slot claims; raises IntegrityError if any slot is already taken."""
+    if filas:
+        db.execute(insert(ReservaSlot), filas)
+
+
+def liberar_slots(db: Session, reserva_id: int) -> None:
+    liberar_slots_de(db, [reserva_id])
+
+
+def liberar_slots_de(db: Session, reserva_ids: list[int]) -> None:
+    if reserva_ids:
+        db.query(ReservaSlot).filter(ReservaSlot.reserva_id.in_(reserva_ids)).delete(synchronize_session=False)
+
+
+def reclamar_slots_existentes(db: Session) -> int:
+    """Backfill claims for active reservations created before reserva_slots existed."""
+    pendientes = db.execute(
+        select(Reserva.id, Reserva.cancha_id, Reserva.fecha, Reserva.hora_inicio, Reserva.hora_fin)
+        .where(
+            Reserva.estado_pago != EstadoPago.LIBRE,
+            ~select(ReservaSlot.reserva_id).where(ReservaSlot.reserva_id == Reserva.id).exists()
+        )
+        .order_by(Reserva.id)
+    ).all()
+
+    reclamadas = 0
+    for r in pendientes:
+        try:
+            with db.begin_nested():
+                reclamar_slots(db, filas_slots(r.id, r.cancha_id, r.fecha, r.hora_inicio, r.hora_fin))
+            reclamadas += 1
+        except IntegrityError:
+            logger.warning(f"Reserva {r.id} se solapa con otra reserva activa; no se reclamaron sus slots")
+    db.commit()
+    return reclamadas
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal, engine
+    from app.db.models import Base
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        logger.info(f"Slots reclamados para {reclamar_slots_existentes(session)} reservas")
+    finally:
+        session.close()
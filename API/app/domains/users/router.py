@@ -1,7 +1,6 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import SessionRunner, get_runner
 from app.domains.auth.utils import get_current_user
 from app.domains.users.models import User
 from app.domains.users.service import UserService
@@ -11,23 +10,23 @@ router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.get("/me", response_model=UserDetailResponse)
-def get_current_user_info(
+async def get_current_user_info(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = UserService(db)
-    return service.get_detail(current_user.id)
+    user_id = current_user.id
+    return await db.run(lambda s: UserService(s).get_detail(user_id))
 
 
 @router.patch("/me", response_model=UserDetailResponse)
-def update_current_user(
+async def update_current_user(
     data: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_runner)
 ):
-    service = UserService(db)
-    return service.update(
-        user_id=current_user.id,
+    user_id = current_user.id
+    return await db.run(lambda s: UserService(s).update(
+        user_id=user_id,
         nombre=data.nombre,
         telefono=data.telefono
-    )
+    ))
@@ -5,7 +5,7 @@ import logging
 
 from app.config import settings
 from app.db.base import Base
-from app.database import engine
+from app.database import SessionLocal, engine
 from app.core.exceptions import AppException
 
 from app.domains.auth.router import router as auth_router
@@ -14,11 +14,22 @@ from app.domains.canchas.router import router as canchas_router
 from app.domains.reservas.router import router as reservas_router
 from app.domains.reportes.router import router as reportes_router
 from app.domains.inventario.router import router as inventario_router
+from app.db.indices import asegurar_indices
+from app.domains.reservas.rollup import asegurar_rollup
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 Base.metadata.create_all(bind=engine)
+# create_all no toca tablas existentes: los indices agregados despues se crean aqui.
+asegurar_indices(engine)
+
+# Los reportes leen el rollup diario: una base con reservas previas a esa tabla se completa aqui.
+_session = SessionLocal()
+try:
+    asegurar_rollup(_session)
+finally:
+    _session.close()
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -0,0 +1,154 @@
+"""Compare requests/sec and p99 latency of the sync and async database paths.
+
+Seeds a throwaway SQLite database, then drives the same mix of read
+endpoints through the ASGI app with DB_ASYNC off and on:
+
+    python -m benchmarks.bench_async_db --requests 2000 --concurrency 32
+
+The mix is the paths with native async queries: the reservation listing,
+court availability and the user lookup behind every token. In sync mode
+each request takes one threadpool hop, for its handler. On local SQLite
+the async mode is still slower, since aiosqlite runs every query in its
+own thread, so DB_ASYNC is meant for drivers such as asyncpg rather than
+as a throughput switch.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_async.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_PATH}")
+
+import httpx  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.db.models import Auth, User, Cancha, Reserva  # noqa: E402
+from app.domains.reservas.models import EstadoPago  # noqa: E402
+from app.main import app  # noqa: E402
+
+P = "/api/v1"
+
+
+def sembrar(usuarios: int, canchas: int, reservas: int) -> tuple[list[str], list[int]]:
+    db = SessionLocal()
+    try:
+        auths = [Auth(email=f"bench{i}@upgi.test", password_hash="!") for i in range(usuarios)]
+        db.add_all(auths)
+        db.flush()
+        users = [User(auth_id=a.id, nombre=f"Bench {i}") for i, a in enumerate(auths)]
+        courts = [
+            Cancha(nombre=f"Cancha {i}", tipo="Padel", precio_hora=Decimal("100.00"), capacidad=4)
+            for i in range(canchas)
+        ]
+        db.add_all([*users, *courts])
+        db.flush()
+
+        hoy = date.today()
+        filas = []
+        for i in range(reservas):
+            hora = 8 + i % 14
+            filas.append({
+                "usuario_id": users[i % usuarios].id,
+                "cancha_id": courts[(i // 14) % canchas].id,
+                "fecha": hoy + timedelta(days=i // (14 * canchas)),
+                "hora_inicio": dtime(hora, 0),
+                "hora_fin": dtime(hora + 1, 0),
+                "jugadores": 2,
+                "estado_pago": EstadoPago.SIN_PAGAR,
+                "precio_total": Decimal("100.00"),
+            })
+        db.bulk_insert_mappings(Reserva, filas)
+        db.commit()
+        tokens = [create_access_token({"sub": str(u.id)}) for u in users]
+        return tokens, [c.id for c in courts]
+    finally:
+        db.close()
+
+
+def peticiones(n: int, tokens: list[str], cancha_ids: list[int]) -> list[tuple[str, dict, dict]]:
+    rnd = random.Random(42)
+    hoy = date.today()
+    mezcla = []
+    for _ in range(n):
+        headers = {"Authorization": f"Bearer {rnd.choice(tokens)}"}
+        tipo = rnd.random()
+        if tipo < 0.4:
+            mezcla.append((f"{P}/reservas", {"limit": 20, "incluir_total": "false"}, headers))
+        elif tipo < 0.8:
+            hora = rnd.randint(8, 20)
+            mezcla.append((
+                f"{P}/canchas/{rnd.choice(cancha_ids)}/disponibilidad",
+                {
+                    "fecha": (hoy + timedelta(days=rnd.randint(0, 6))).isoformat(),
+                    "hora_inicio": f"{hora:02d}:00",
+                    "hora_fin": f"{hora + 1:02d}:00",
+                },
+                {},
+            ))
+        else:
+            mezcla.append((f"{P}/users/me", {}, headers))
+    return mezcla
+
+
+async def correr(mezcla: list[tuple[str, dict, dict]], concurrencia: int) -> dict:
+    latencias: list[float] = []
+    cola: asyncio.Queue = asyncio.Queue()
+    for item in mezcla:
+        cola.put_nowait(item)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not cola.empty():
+                url, params, headers = cola.get_nowait()
+                inicio = time.perf_counter()
+                r = await client.get(url, params=params, headers=headers)
+                latencias.append(time.perf_counter() - inicio)
+                r.raise_for_status()
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrencia)))
+        total = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "req_s": len(latencias) / total,
+        "p50_ms": statistics.median(latencias) * 1000,
+        "p99_ms": latencias[int(len(latencias) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--canchas", type=int, default=10)
+    parser.add_argument("--reservas", type=int, default=20000)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    tokens, cancha_ids = sembrar(args.usuarios, args.canchas, args.reservas)
+    mezcla = peticiones(args.requests, tokens, cancha_ids)
+
+    print(f"{'modo':<6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for modo in (False, True):
+        settings.DB_ASYNC = modo
+        # Una ronda corta de calentamiento: conexiones, indice de ocupacion.
+        asyncio.run(correr(mezcla[:100], args.concurrency))
+        r = asyncio.run(correr(mezcla, args.concurrency))
+        nombre = "async" if modo else "sync"
+        print(f"{nombre:<6} {r['req_s']:>9.1f} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
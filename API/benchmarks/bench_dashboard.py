@@ -0,0 +1,167 @@
+"""Compare query count and latency of the dashboard stats before and after single-pass aggregation.
+
+Seeds a throwaway SQLite database with --reservas rows and times three ways
+of building the /admin/dashboard numbers:
+
+    python -m benchmarks.bench_dashboard --reservas 1000000 --repeticiones 20
+
+- separado: the previous implementation, ten independent queries.
+- agregado: ReporteService._calcular_stats, two queries: the MAX(fecha) lookup
+  on reservas_historico done by fuente_reservas, then one statement with a
+  conditional-aggregation pass over the current week/month and a COUNT/SUM
+  for the all-time totals.
+- cacheado: ReporteService.get_stats with a warm dashboard_cache.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import create_engine, event, func, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base, Auth, User, Cancha, Reserva
+from app.domains.reservas.models import EstadoPago
+from app.domains.reportes.service import ReporteService, dashboard_cache
+
+LOTE_SIEMBRA = 50000
+
+
+def sembrar(Session, reservas: int, usuarios: int, canchas: int) -> None:
+    rnd = random.Random(42)
+    db = Session()
+    try:
+        auths = [Auth(email=f"bench{i}@upgi.test", password_hash="!") for i in range(usuarios)]
+        db.add_all(auths)
+        db.flush()
+        users = [User(auth_id=a.id, nombre=f"Bench {i}") for i, a in enumerate(auths)]
+        courts = [
+            Cancha(nombre=f"Cancha {i}", tipo="Padel", precio_hora=Decimal("100.00"), capacidad=4)
+            for i in range(canchas)
+        ]
+        db.add_all([*users, *courts])
+        db.commit()
+        user_ids = [u.id for u in users]
+        court_ids = [c.id for c in courts]
+    finally:
+        db.close()
+
+    # Dos anios hacia atras y un mes hacia adelante, como una base con historia.
+    hoy = date.today()
+    estados = list(EstadoPago)
+    with Session() as db:
+        for desde in range(0, reservas, LOTE_SIEMBRA):
+            filas = []
+            for _ in range(min(LOTE_SIEMBRA, reservas - desde)):
+                hora = rnd.randint(8, 21)
+                filas.append({
+                    "usuario_id": rnd.choice(user_ids),
+                    "cancha_id": rnd.choice(court_ids),
+                    "fecha": hoy + timedelta(days=rnd.randint(-730, 30)),
+                    "hora_inicio": dtime(hora, 0),
+                    "hora_fin": dtime(hora + 1, 0),
+                    "jugadores": 4,
+                    "estado_pago": rnd.choice(estados),
+                    "precio_total": Decimal(rnd.choice(["80.00", "100.00", "120.00"])),
+                })
+            db.execute(insert(Reserva), filas)
+            db.commit()
+        # Estadisticas del planificador, como tendria una base en produccion.
+        db.execute(text("ANALYZE"))
+        db.commit()
+
+
+def stats_separado(db) -> dict:
+    """The dashboard as it was computed before: one query per metric."""
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    activa = Reserva.estado_pago != EstadoPago.LIBRE
+    pagada = Reserva.estado_pago == EstadoPago.PAGADO
+    suma = func.coalesce(func.sum(Reserva.precio_total), 0)
+    return {
+        "reservas_hoy": db.query(Reserva).filter(Reserva.fecha == today, activa).count(),
+        "reservas_semana": db.query(Reserva).filter(Reserva.fecha >= week_start, activa).count(),
+        "reservas_mes": db.query(Reserva).filter(Reserva.fecha >= month_start, activa).count(),
+        "reservas_totales": db.query(Reserva).filter(activa).count(),
+        "ingresos_hoy": float(db.query(suma).filter(Reserva.fecha == today, pagada).scalar()),
+        "ingresos_semana": float(db.query(suma).filter(Reserva.fecha >= week_start, pagada).scalar()),
+        "ingresos_mes": float(db.query(suma).filter(Reserva.fecha >= month_start, pagada).scalar()),
+        "ingresos_totales": float(db.query(suma).filter(pagada).scalar()),
+        "canchas_activas": db.query(Cancha).filter(Cancha.is_active == True).count(),
+        "usuarios_totales": db.query(User).count(),
+    }
+
+
+def medir(Session, contador: list[int], fn, repeticiones: int) -> dict:
+    latencias = []
+    consultas = 0
+    for _ in range(repeticiones):
+        db = Session()
+        try:
+            contador[0] = 0
+            inicio = time.perf_counter()
+            fn(db)
+            latencias.append(time.perf_counter() - inicio)
+            consultas = contador[0]
+        finally:
+            db.close()
+    return {
+        "consultas": consultas,
+        "p50_ms": statistics.median(latencias) * 1000,
+        "max_ms": max(latencias) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reservas", type=int, default=1_000_000)
+    parser.add_argument("--usuarios", type=int, default=500)
+    parser.add_argument("--canchas", type=int, default=20)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_dashboard.db')}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    inicio = time.perf_counter()
+    sembrar(Session, args.reservas, args.usuarios, args.canchas)
+    print(f"{args.reservas} reservas sembradas en {time.perf_counter() - inicio:.1f}s")
+
+    contador = [0]
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        contador[0] += 1
+
+    event.listen(engine, "before_cursor_execute", contar)
+
+    with Session() as db:
+        assert stats_separado(db) == ReporteService(db)._calcular_stats(), "los resultados no coinciden"
+
+    def cacheado(db):
+        ReporteService(db).get_stats()
+
+    casos = {
+        "separado": stats_separado,
+        "agregado": lambda db: ReporteService(db)._calcular_stats(),
+        "cacheado": cacheado,
+    }
+
+    print(f"{'modo':<10} {'consultas':>9} {'p50 ms':>9} {'max ms':>9}")
+    for nombre, fn in casos.items():
+        if nombre == "cacheado":
+            # El TTL es de segundos: se calienta justo antes de medir.
+            dashboard_cache.clear()
+            with Session() as db:
+                cacheado(db)
+        r = medir(Session, contador, fn, args.repeticiones)
+        print(f"{nombre:<10} {r['consultas']:>9} {r['p50_ms']:>9.1f} {r['max_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
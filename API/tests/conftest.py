@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base, Auth, User, Cancha
+from app.domains.canchas.agenda import agenda
+from app.domains.canchas.pricing import tarifario
+from app.domains.canchas.service import disponibilidad_cache
+from app.domains.reportes.service import dashboard_cache, reportes_cache
+from app.domains.reservas.ocupacion import indice_ocupacion
+from app.domains.reservas.service import totales_cache
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'upgi_test.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def datos(session_factory):
+    """Seed one user and three active courts; return their ids."""
+    db = session_factory()
+    try:
+        auth = Auth(email="cliente@upgi.test", password_hash="!")
+        db.add(auth)
+        db.flush()
+        usuario = User(auth_id=auth.id, nombre="Cliente")
+        canchas = [
+            Cancha(nombre=f"Cancha {i}", tipo="Padel", precio_hora=Decimal("100.00"), capacidad=4)
+            for i in range(1, 4)
+        ]
+        db.add_all([usuario, *canchas])
+        db.commit()
+        return {"usuario_id": usuario.id, "cancha_ids": [c.id for c in canchas]}
+    finally:
+        db.close()
+
+
+def _limpiar_estado_en_memoria():
+    indice_ocupacion.limpiar()
+    disponibilidad_cache.clear()
+    totales_cache.clear()
+    dashboard_cache.clear()
+    reportes_cache.clear()
+    tarifario.invalidar()
+    agenda.invalidar()
+
+
+@pytest.fixture(autouse=True)
+def limpiar_estado_en_memoria():
+    """Each test gets a fresh database, so per-process indexes and caches must not leak."""
+    _limpiar_estado_en_memoria()
+    yield
+    _limpiar_estado_en_memoria()
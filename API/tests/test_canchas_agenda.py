@@ -0,0 +1,129 @@
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.core.exceptions import ValidationException
+from app.domains.canchas.agenda import agenda
+from app.domains.canchas.service import CanchaService
+from app.domains.canchas.models import Horario, HorarioExcepcion
+from app.domains.reservas.schemas import ReservaBulkCreate, SlotReserva
+from app.domains.reservas.service import ReservaService
+
+FECHA = date.today() + timedelta(days=7)
+# Mismo criterio que Horario.dia_semana: 0=Domingo..6=Sábado.
+DIA_SEMANA = (FECHA.weekday() + 1) % 7
+CERRADO = FECHA + timedelta(days=7)
+ESPECIAL = FECHA + timedelta(days=14)
+FERIADO = FECHA + timedelta(days=21)
+
+
+@pytest.fixture
+def horarios(session_factory, datos):
+    """Split shift on FECHA's weekday for the first court, plus one exception of each kind."""
+    cancha_id = datos["cancha_ids"][0]
+    db = session_factory()
+    try:
+        db.add_all([
+            Horario(cancha_id=cancha_id, dia_semana=DIA_SEMANA, hora_inicio=time(8), hora_fin=time(12)),
+            Horario(cancha_id=cancha_id, dia_semana=DIA_SEMANA, hora_inicio=time(16), hora_fin=time(0)),
+            HorarioExcepcion(cancha_id=None, fecha=CERRADO, cerrado=True, motivo="Cierre general"),
+            HorarioExcepcion(cancha_id=cancha_id, fecha=ESPECIAL, cerrado=False,
+                             hora_inicio=time(10), hora_fin=time(14), motivo="Horario especial"),
+            HorarioExcepcion(cancha_id=None, fecha=FERIADO, cerrado=True, motivo="Feriado"),
+            HorarioExcepcion(cancha_id=cancha_id, fecha=FERIADO, cerrado=False,
+                             hora_inicio=time(9), hora_fin=time(12), motivo="Abre igual"),
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return datos
+
+
+@pytest.mark.parametrize("hora_inicio, hora_fin, permitido", [
+    (time(8), time(9), True),
+    (time(11), time(12), True),
+    (time(12), time(13), False),
+    (time(11), time(17), False),
+    (time(16), time(17), True),
+    (time(22), time(0), True),
+    (time(7), time(8), False),
+])
+def test_turno_partido(session_factory, horarios, hora_inicio, hora_fin, permitido):
+    db = session_factory()
+    try:
+        assert agenda.permite(db, horarios["cancha_ids"][0], FECHA, hora_inicio, hora_fin) is permitido
+        # Sin horarios cargados la cancha no tiene restriccion, como siempre.
+        assert agenda.permite(db, horarios["cancha_ids"][1], FECHA, hora_inicio, hora_fin)
+    finally:
+        db.close()
+
+
+def test_un_dia_cerrado_rechaza_todas_las_canchas(session_factory, horarios):
+    db = session_factory()
+    try:
+        for cancha_id in horarios["cancha_ids"]:
+            assert agenda.ventanas(db, cancha_id, CERRADO) == ()
+            assert not agenda.permite(db, cancha_id, CERRADO, time(16), time(17))
+    finally:
+        db.close()
+
+
+def test_una_excepcion_abierta_reemplaza_el_horario_semanal(session_factory, horarios):
+    cancha_id = horarios["cancha_ids"][0]
+    db = session_factory()
+    try:
+        assert agenda.ventanas(db, cancha_id, ESPECIAL) == ((10 * 3600, 14 * 3600),)
+        assert agenda.permite(db, cancha_id, ESPECIAL, time(12), time(13))
+        assert not agenda.permite(db, cancha_id, ESPECIAL, time(16), time(17))
+    finally:
+        db.close()
+
+
+def test_la_excepcion_de_la_cancha_gana_a_la_general(session_factory, horarios):
+    cancha_id, otra_cancha = horarios["cancha_ids"][:2]
+    db = session_factory()
+    try:
+        assert agenda.permite(db, cancha_id, FERIADO, time(10), time(11))
+        assert not agenda.permite(db, otra_cancha, FERIADO, time(10), time(11))
+    finally:
+        db.close()
+
+
+def test_crear_y_crear_bulk_respetan_la_agenda(session_factory, horarios):
+    cancha_id = horarios["cancha_ids"][0]
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        with pytest.raises(ValidationException):
+            service.crear(horarios["usuario_id"], cancha_id, FECHA, time(13), time(14), jugadores=2)
+
+        resultado = service.crear_bulk(horarios["usuario_id"], ReservaBulkCreate(
+            cancha_id=cancha_id,
+            jugadores=2,
+            slots=[
+                SlotReserva(fecha=FECHA, hora_inicio=time(9), hora_fin=time(10)),
+                SlotReserva(fecha=CERRADO, hora_inicio=time(9), hora_fin=time(10)),
+                SlotReserva(fecha=ESPECIAL, hora_inicio=time(9), hora_fin=time(10)),
+            ],
+        ))
+    finally:
+        db.close()
+
+    fuera = "El horario seleccionado está fuera del horario de atención"
+    assert [r["motivo"] for r in resultado["resultados"]] == [None, fuera, fuera]
+
+
+@pytest.mark.parametrize("granularidad, celdas", [(15, 96), (45, 32), (60, 24), (5, None), (20, None), (50, None)])
+def test_la_grilla_solo_acepta_multiplos_del_slot(session_factory, horarios, granularidad, celdas):
+    db = session_factory()
+    try:
+        service = CanchaService(db)
+        if celdas is None:
+            with pytest.raises(ValidationException):
+                service.grilla_disponibilidad(FECHA, FECHA, granularidad=granularidad)
+            return
+        grilla = service.grilla_disponibilidad(FECHA, FECHA, granularidad=granularidad)
+    finally:
+        db.close()
+
+    assert {len(dia["estados"]) for cancha in grilla["canchas"] for dia in cancha["dias"]} == {celdas}
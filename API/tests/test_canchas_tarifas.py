@@ -0,0 +1,81 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.domains.canchas.models import TarifaFranja
+from app.domains.canchas.pricing import tarifario
+from app.domains.reservas.service import ReservaService
+
+FECHA = date.today() + timedelta(days=7)
+# Mismo criterio que TarifaFranja.dia_semana: 0=Domingo..6=Sábado.
+DIA_SEMANA = (FECHA.weekday() + 1) % 7
+
+
+@pytest.fixture
+def franjas(session_factory, datos):
+    cancha_id = datos["cancha_ids"][0]
+    db = session_factory()
+    try:
+        db.add_all([
+            TarifaFranja(cancha_id=None, dia_semana=None, hora_inicio=time(18), hora_fin=time(20),
+                         precio_hora=Decimal("200.00")),
+            TarifaFranja(cancha_id=cancha_id, dia_semana=None, hora_inicio=time(18), hora_fin=time(20),
+                         precio_hora=Decimal("300.00")),
+            TarifaFranja(cancha_id=cancha_id, dia_semana=DIA_SEMANA, hora_inicio=time(18), hora_fin=time(20),
+                         precio_hora=Decimal("400.00")),
+            TarifaFranja(cancha_id=None, dia_semana=None, hora_inicio=time(22), hora_fin=time(0),
+                         precio_hora=Decimal("160.00")),
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return datos
+
+
+def test_la_franja_mas_especifica_gana(session_factory, franjas):
+    cancha_id, otra_cancha = franjas["cancha_ids"][:2]
+    db = session_factory()
+    try:
+        precios = tarifario.quote_many(db, [
+            (cancha_id, FECHA, time(18), time(19)),
+            (cancha_id, FECHA + timedelta(days=1), time(18), time(19)),
+            (otra_cancha, FECHA, time(18), time(19)),
+            (otra_cancha, FECHA, time(10), time(11)),
+            (999, FECHA, time(18), time(19)),
+        ])
+    finally:
+        db.close()
+
+    # cancha+dia, cancha, global, precio base de la cancha y cancha inexistente.
+    assert precios == [400.0, 300.0, 200.0, 100.0, None]
+
+
+def test_una_cotizacion_que_cruza_franjas_suma_cada_tramo(session_factory, franjas):
+    otra_cancha = franjas["cancha_ids"][1]
+    db = session_factory()
+    try:
+        precios = tarifario.quote_many(db, [
+            (otra_cancha, FECHA, time(17, 30), time(18, 30)),
+            (otra_cancha, FECHA, time(19, 45), time(22, 15)),
+            (otra_cancha, FECHA, time(23), time(0)),
+        ])
+    finally:
+        db.close()
+
+    # 30 min a 100 + 30 min a 200; 15 min a 200 + 2 h a 100 + 15 min a 160; hasta medianoche a 160.
+    assert precios == [150.0, 290.0, 160.0]
+
+
+def test_crear_cobra_el_precio_del_tarifario(session_factory, franjas):
+    cancha_id = franjas["cancha_ids"][0]
+    db = session_factory()
+    try:
+        resultado = ReservaService(db).crear(
+            franjas["usuario_id"], cancha_id, FECHA, time(17, 30), time(18, 30), jugadores=2
+        )
+    finally:
+        db.close()
+
+    # 30 min al precio base (100) + 30 min a la franja cancha+dia (400).
+    assert resultado["reserva"]["precio_total"] == 250.0
@@ -0,0 +1,153 @@
+import asyncio
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.exceptions import NotFoundException, ValidationException
+from app.core.security import create_access_token
+from app.database import SessionRunner
+from app.domains.auth.utils import get_current_user
+from app.domains.canchas.agenda import agenda
+from app.domains.canchas.models import Horario
+from app.domains.canchas.pricing import tarifario
+from app.domains.canchas.service import CanchaService, CanchaServiceAsync, disponibilidad_cache
+from app.domains.reportes.service import ReporteService, ReporteServiceAsync, dashboard_cache
+from app.domains.reservas.archivo import archivar_reservas
+from app.domains.reservas.service import ReservaService, ReservaServiceAsync, totales_cache
+
+FECHA = date.today() + timedelta(days=7)
+# Mismo criterio que Horario.dia_semana: 0=Domingo..6=Sábado.
+DIA_SEMANA = (FECHA.weekday() + 1) % 7
+
+
+@pytest.fixture
+def con_runner_async(engine, monkeypatch):
+    """Run a coroutine taking an async SessionRunner over the test database.
+
+    run_sync is disabled, so anything that passes is served by the native
+    async variants and not by the sync services on the event loop.
+    """
+    async def sin_run_sync(*args, **kwargs):
+        raise AssertionError("el camino async no debe pasar por run_sync")
+
+    monkeypatch.setattr(AsyncSession, "run_sync", sin_run_sync)
+
+    def correr(fn):
+        async def principal():
+            # NullPool: cada prueba tiene su propio event loop y no debe heredar conexiones.
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{engine.url.database}", poolclass=NullPool)
+            try:
+                async with async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)() as session:
+                    return await fn(SessionRunner(session))
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(principal())
+    return correr
+
+
+def _sin_sync(s):
+    raise AssertionError("el camino async no debe llamar al servicio sync")
+
+
+def _limpiar_caches():
+    totales_cache.clear()
+    disponibilidad_cache.clear()
+    dashboard_cache.clear()
+    agenda.invalidar()
+    tarifario.invalidar()
+
+
+def test_los_listados_async_coinciden_con_los_sync(session_factory, datos, con_runner_async):
+    usuario_id, cancha_id = datos["usuario_id"], datos["cancha_ids"][0]
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        for dias, hora in ((0, 9), (0, 11), (1, 9), (2, 9)):
+            fecha = FECHA + timedelta(days=dias)
+            service.crear(usuario_id, cancha_id, fecha, time(hora), time(hora + 1), jugadores=2)
+        primera = service.listar_usuario(usuario_id, limit=3)
+        segunda = service.listar_usuario(usuario_id, limit=3, cursor=primera["next_cursor"])
+        admin = service.listar_todas(cancha_id=cancha_id, limit=2)
+    finally:
+        db.close()
+
+    async def listar(runner):
+        service = ReservaServiceAsync(runner.session)
+        return (
+            await runner.run(_sin_sync, nativo=lambda s: ReservaServiceAsync(s).listar_usuario(usuario_id, limit=3)),
+            await service.listar_usuario(usuario_id, limit=3, cursor=primera["next_cursor"]),
+            await service.listar_todas(cancha_id=cancha_id, limit=2),
+        )
+
+    _limpiar_caches()
+    assert con_runner_async(listar) == (primera, segunda, admin)
+    assert (primera["total"], len(primera["reservas"]), len(segunda["reservas"])) == (4, 3, 1)
+
+
+def test_la_disponibilidad_async_coincide_con_la_sync(session_factory, datos, con_runner_async):
+    usuario_id, cancha_id = datos["usuario_id"], datos["cancha_ids"][0]
+    db = session_factory()
+    try:
+        db.add(Horario(cancha_id=cancha_id, dia_semana=DIA_SEMANA, hora_inicio=time(8), hora_fin=time(22)))
+        db.commit()
+        ReservaService(db).crear(usuario_id, cancha_id, FECHA, time(10), time(11), jugadores=2)
+        consultas = [(time(9), time(10, 30)), (time(12), time(14)), (time(21), time(23)), (time(11), time(10))]
+        _limpiar_caches()
+        esperado = [CanchaService(db).verificar_disponibilidad(cancha_id, FECHA, *c) for c in consultas]
+    finally:
+        db.close()
+
+    async def verificar(runner):
+        service = CanchaServiceAsync(runner.session)
+        resultados = [await service.verificar_disponibilidad(cancha_id, FECHA, *c) for c in consultas]
+        with pytest.raises(ValidationException):
+            await service.verificar_disponibilidad(cancha_id, FECHA, time(9, 10), time(10))
+        with pytest.raises(NotFoundException):
+            await service.verificar_disponibilidad(999, FECHA, time(9), time(10))
+        return resultados
+
+    _limpiar_caches()
+    assert con_runner_async(verificar) == esperado
+    assert [r["disponible"] for r in esperado] == [False, True, False, False]
+    assert esperado[1]["precio_total"] == 200.0
+
+
+def test_el_dashboard_async_coincide_con_el_sync(session_factory, datos, con_runner_async):
+    usuario_id, cancha_id = datos["usuario_id"], datos["cancha_ids"][0]
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        for hora in (9, 10):
+            service.crear(usuario_id, cancha_id, FECHA, time(hora), time(hora + 1), jugadores=2)
+        service.crear(usuario_id, cancha_id, FECHA + timedelta(days=60), time(9), time(10), jugadores=2)
+        # Con algo archivado los totales salen de reservas UNION ALL reservas_historico.
+        assert archivar_reservas(db, horizonte_dias=-30) == 2
+        dashboard_cache.clear()
+        esperado = ReporteService(db).get_stats()
+    finally:
+        db.close()
+
+    dashboard_cache.clear()
+    resultado = con_runner_async(
+        lambda runner: runner.run(_sin_sync, nativo=lambda s: ReporteServiceAsync(s).get_stats())
+    )
+    assert resultado == esperado
+    assert resultado["stats"]["reservas_totales"] == 3
+
+
+def test_get_current_user_en_ambos_modos(session_factory, datos, con_runner_async):
+    token = create_access_token({"sub": str(datos["usuario_id"])})
+
+    usuario = con_runner_async(lambda runner: get_current_user(token=token, credentials=None, db=runner))
+    assert usuario.id == datos["usuario_id"]
+
+    db = session_factory()
+    try:
+        usuario = asyncio.run(get_current_user(token=token, credentials=None, db=SessionRunner(db)))
+        assert usuario.id == datos["usuario_id"]
+        # Se lee por la conexion del event loop pero queda en la sesion del request.
+        assert usuario in db
+    finally:
+        db.close()
@@ -0,0 +1,98 @@
+import json
+from datetime import date, time, timedelta
+
+import pytest
+from fastapi.responses import JSONResponse
+
+from app.core.exceptions import ConflictException, ValidationException
+from app.core.idempotency import IdempotencyKey, ejecutar_idempotente, scope_anonimo
+from app.domains.reservas.models import Reserva
+from app.domains.reservas.schemas import ReservaCreateResponse, ReservaPublicCreateResponse
+from app.domains.reservas.service import ReservaService
+
+FECHA = date.today() + timedelta(days=7)
+SCOPE = "POST /reservas:1"
+
+
+def _crear(db, datos, payload):
+    return ejecutar_idempotente(
+        db, "clave-1", SCOPE, payload,
+        lambda: ReservaService(db).crear(
+            datos["usuario_id"], payload["cancha_id"], FECHA, payload["hora_inicio"], payload["hora_fin"], jugadores=2
+        ),
+        status_code=201,
+        response_model=ReservaCreateResponse
+    )
+
+
+def test_un_reintento_repite_la_respuesta_sin_crear_otra_reserva(session_factory, datos):
+    payload = {"cancha_id": datos["cancha_ids"][0], "hora_inicio": time(10), "hora_fin": time(11)}
+    db = session_factory()
+    try:
+        original = _crear(db, datos, payload)
+        repetida = _crear(db, datos, payload)
+
+        assert isinstance(repetida, JSONResponse)
+        assert repetida.status_code == 201
+        assert repetida.headers["Idempotent-Replayed"] == "true"
+        assert json.loads(repetida.body)["reserva"]["id"] == original["reserva"]["id"]
+        assert db.query(Reserva).count() == 1
+    finally:
+        db.close()
+
+
+def test_la_misma_clave_con_otro_cuerpo_devuelve_400(session_factory, datos):
+    payload = {"cancha_id": datos["cancha_ids"][0], "hora_inicio": time(10), "hora_fin": time(11)}
+    db = session_factory()
+    try:
+        _crear(db, datos, payload)
+        with pytest.raises(ValidationException) as error:
+            _crear(db, datos, {**payload, "hora_inicio": time(11), "hora_fin": time(12)})
+
+        assert error.value.status_code == 400
+        assert db.query(Reserva).count() == 1
+    finally:
+        db.close()
+
+
+def test_una_solicitud_fallida_libera_la_clave(session_factory, datos):
+    payload = {"cancha_id": datos["cancha_ids"][0], "hora_inicio": time(10), "hora_fin": time(11)}
+    db = session_factory()
+    try:
+        def fallar():
+            raise ConflictException("El horario seleccionado ya está reservado")
+
+        with pytest.raises(ConflictException):
+            ejecutar_idempotente(db, "clave-1", SCOPE, payload, fallar)
+        assert db.query(IdempotencyKey).count() == 0
+
+        resultado = _crear(db, datos, payload)
+        assert not isinstance(resultado, JSONResponse)
+        assert db.query(Reserva).count() == 1
+    finally:
+        db.close()
+
+
+def test_la_reserva_publica_separa_las_claves_por_invitado(session_factory, datos):
+    db = session_factory()
+    try:
+        respuestas = []
+        for email, hora in (("ana@upgi.test", 10), ("beto@upgi.test", 12)):
+            payload = {
+                "cancha_id": datos["cancha_ids"][0], "fecha": FECHA, "hora_inicio": time(hora),
+                "hora_fin": time(hora + 1), "jugadores": 2, "nombre": email, "email": email
+            }
+            respuestas.append(ejecutar_idempotente(
+                db, "clave-compartida", scope_anonimo("POST /reservas/public", email), payload,
+                lambda: ReservaService(db).crear_publico(**payload),
+                status_code=201,
+                response_model=ReservaPublicCreateResponse
+            ))
+
+        assert not any(isinstance(r, JSONResponse) for r in respuestas)
+        assert db.query(Reserva).count() == 2
+        assert scope_anonimo("POST /reservas/public", "Ana@upgi.test ") == scope_anonimo(
+            "POST /reservas/public", "ana@upgi.test"
+        )
+    finally:
+        db.close()
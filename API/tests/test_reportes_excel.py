@@ -0,0 +1,59 @@
+import io
+from datetime import date
+
+import openpyxl
+
+from app.domains.reportes import excel
+from app.domains.reportes.excel import RESERVAS_COLUMNAS, generar_excel, leer_por_bloques
+
+FECHA = date(2026, 10, 20)
+DATOS = {
+    "ocupacion_data": {"ocupacion": [
+        {"cancha_nombre": "Cancha 1", "horas_reservadas": 3, "horas_disponibles": 11, "ocupacion_pct": 21.4},
+    ]},
+    "horarios_data": {"horarios": [{"hora": "09:00", "cantidad": 2}, {"hora": "10:00", "cantidad": 1}]},
+    "clientes_data": {"clientes": [{"cliente_nombre": "Cliente", "total_reservas": 3, "total_gastado": 300.0}]},
+    "daily_data": {"daily": [{"fecha": FECHA.isoformat(), "reservas_count": 3, "ingreso_total": 300.0}]},
+}
+
+
+def _fila(i: int) -> list:
+    return [i, FECHA.isoformat(), "09:00", "10:00", "Cancha 1", "Cliente", 2, "Pagado", 100.0]
+
+
+def _abrir(archivo) -> openpyxl.Workbook:
+    # Leer por bloques tambien cierra el archivo temporal.
+    return openpyxl.load_workbook(io.BytesIO(b"".join(leer_por_bloques(archivo))), read_only=True)
+
+
+def _filas(hoja) -> list[list]:
+    return [list(fila) for fila in hoja.iter_rows(values_only=True)]
+
+
+def test_el_libro_tiene_una_hoja_por_reporte():
+    libro = _abrir(generar_excel(**DATOS))
+
+    assert libro.sheetnames == ["Daily", "Ocupacion", "HorariosPico", "ClientesFrecuentes"]
+    assert _filas(libro["Daily"]) == [["Fecha", "Reservas", "Ingreso Total"], [FECHA.isoformat(), 3, 300]]
+    assert _filas(libro["Ocupacion"])[1] == ["Cancha 1", 3, 11, 21.4]
+    assert _filas(libro["HorariosPico"]) == [["Hora", "Cantidad de Reservas"], ["09:00", 2], ["10:00", 1]]
+    assert _filas(libro["ClientesFrecuentes"])[1] == ["Cliente", 3, 300]
+
+
+def test_el_detalle_de_reservas_sigue_en_otra_hoja_al_llenarse(monkeypatch):
+    # Encabezado y dos filas por hoja: cinco reservas ocupan tres hojas.
+    monkeypatch.setattr(excel, "MAX_FILAS_HOJA", 3)
+    libro = _abrir(generar_excel(**DATOS, reservas=iter(_fila(i) for i in range(1, 6))))
+
+    hojas = ["Reservas", "Reservas (2)", "Reservas (3)"]
+    assert libro.sheetnames[4:] == hojas
+    assert [_filas(libro[h])[0] for h in hojas] == [RESERVAS_COLUMNAS] * 3
+    assert [[f[0] for f in _filas(libro[h])[1:]] for h in hojas] == [[1, 2], [3, 4], [5]]
+    assert _filas(libro["Reservas"])[1] == _fila(1)
+
+
+def test_sin_reservas_la_hoja_de_detalle_queda_con_el_encabezado():
+    libro = _abrir(generar_excel(**DATOS, reservas=iter([])))
+
+    assert libro.sheetnames[-1] == "Reservas"
+    assert _filas(libro["Reservas"]) == [RESERVAS_COLUMNAS]
@@ -0,0 +1,40 @@
+from datetime import date, time, timedelta
+
+from app.domains.reportes.service import ReporteService
+from app.domains.reservas.models import EstadoPago
+from app.domains.reservas.service import ReservaService
+
+FECHA = date.today() + timedelta(days=7)
+# 15 dias: el dia de la semana de FECHA aparece 3 veces, los demas 2.
+HASTA = FECHA + timedelta(days=14)
+DIA = FECHA.weekday()
+SIGUIENTE = (DIA + 1) % 7
+
+
+def test_heatmap_reparte_los_minutos_por_hora_y_divide_por_las_ocurrencias_del_dia(session_factory, datos):
+    usuario_id, (cancha_id, otra_cancha, _) = datos["usuario_id"], datos["cancha_ids"]
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        for fecha in (FECHA, FECHA + timedelta(days=7)):
+            service.crear(usuario_id, cancha_id, fecha, time(10, 30), time(11, 15), jugadores=2)
+        service.crear(usuario_id, cancha_id, FECHA + timedelta(days=1), time(22), time(23), jugadores=2)
+        liberada = service.crear(usuario_id, otra_cancha, FECHA, time(10), time(11), jugadores=2)
+        service.actualizar_pago(liberada["reserva"]["id"], EstadoPago.LIBRE)
+
+        heatmap = ReporteService(db).get_heatmap(FECHA, HASTA)
+    finally:
+        db.close()
+
+    cancha, otra, _ = heatmap["canchas"]
+    # 10:30-11:15 dos veces: 2 x 30 min en la hora 10 y 2 x 15 min en la hora 11.
+    assert cancha["minutos"][DIA][10] == 60
+    assert cancha["minutos"][DIA][11] == 30
+    assert cancha["ocupacion_pct"][DIA][10] == round(60 * 100 / (3 * 60), 2)
+    assert cancha["ocupacion_pct"][DIA][11] == round(30 * 100 / (3 * 60), 2)
+    # Una hora completa en un dia que aparece 2 veces en el periodo.
+    assert cancha["minutos"][SIGUIENTE][22] == 60
+    assert cancha["ocupacion_pct"][SIGUIENTE][22] == 50.0
+    assert sum(map(sum, cancha["minutos"])) == 150
+    # Una reserva liberada no cuenta.
+    assert sum(map(sum, otra["minutos"])) == 0
@@ -0,0 +1,127 @@
+import time as reloj
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.config import settings
+from app.core.exceptions import NotFoundException
+from app.domains.reportes import jobs
+from app.domains.reportes.jobs import COMPLETADO, ERROR, PENDIENTE, EN_PROCESO, ColaReportes
+from app.domains.reservas.service import ReservaService
+
+FECHA = date.today() + timedelta(days=7)
+PARAMETROS = {
+    "fecha_desde": FECHA.isoformat(),
+    "fecha_hasta": (FECHA + timedelta(days=6)).isoformat(),
+    "cancha_id": None,
+    "incluir_reservas": False,
+}
+
+
+@pytest.fixture
+def cola(tmp_path, monkeypatch):
+    """A fresh queue under tmp_path, wired to report invalidation; the generator never touches the database."""
+    monkeypatch.setattr(settings, "REPORTES_JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setitem(jobs.GENERADORES, "ocupacion", lambda service, p, destino, avanzar: destino.write_text("{}"))
+    cola = ColaReportes()
+    monkeypatch.setattr(jobs, "cola_reportes", cola)
+    return cola
+
+
+def _esperar(cola, jid) -> dict:
+    limite = reloj.monotonic() + 10
+    while (job := cola.estado(jid))["estado"] in (PENDIENTE, EN_PROCESO):
+        assert reloj.monotonic() < limite, "el job no termino"
+        reloj.sleep(0.01)
+    return job
+
+
+def test_un_job_terminado_se_reutiliza_hasta_que_se_escribe_en_su_rango(session_factory, datos, cola):
+    primero = _esperar(cola, cola.encolar("ocupacion", PARAMETROS)["id"])
+    assert primero["estado"] == COMPLETADO
+    assert cola.encolar("ocupacion", PARAMETROS)["creado_at"] == primero["creado_at"]
+
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        usuario_id, cancha_id = datos["usuario_id"], datos["cancha_ids"][0]
+        # Fuera del rango no invalida; dentro, si.
+        service.crear(usuario_id, cancha_id, FECHA - timedelta(days=1), time(10), time(11), jugadores=2)
+        assert cola.encolar("ocupacion", PARAMETROS)["creado_at"] == primero["creado_at"]
+        service.crear(usuario_id, cancha_id, FECHA + timedelta(days=3), time(10), time(11), jugadores=2)
+    finally:
+        db.close()
+
+    segundo = cola.encolar("ocupacion", PARAMETROS)
+    assert segundo["creado_at"] > primero["creado_at"]
+    assert _esperar(cola, segundo["id"])["estado"] == COMPLETADO
+
+
+def test_un_job_que_termina_despues_de_una_escritura_no_se_reutiliza(cola, monkeypatch):
+    generar = jobs.GENERADORES["ocupacion"]
+
+    def generar_con_escritura(service, p, destino, avanzar):
+        # La escritura llega mientras el reporte se esta generando.
+        cola.invalidar([FECHA])
+        generar(service, p, destino, avanzar)
+
+    monkeypatch.setitem(jobs.GENERADORES, "ocupacion", generar_con_escritura)
+    primero = _esperar(cola, cola.encolar("ocupacion", PARAMETROS)["id"])
+    assert primero["estado"] == COMPLETADO
+    assert cola.artefacto(primero["id"])[0].exists()
+
+    monkeypatch.setitem(jobs.GENERADORES, "ocupacion", generar)
+    assert cola.encolar("ocupacion", PARAMETROS)["creado_at"] > primero["creado_at"]
+
+
+def test_una_escritura_no_interrumpe_un_job_que_se_regenera(cola, monkeypatch):
+    generar = jobs.GENERADORES["ocupacion"]
+    primero = _esperar(cola, cola.encolar("ocupacion", PARAMETROS)["id"])
+
+    def generar_con_escritura(service, p, destino, avanzar):
+        destino.write_text("{")
+        # La escritura llega con el .tmp a medio escribir y el resultado anterior todavia en disco.
+        cola.invalidar([FECHA])
+        with open(destino, "a") as salida:
+            salida.write("}")
+
+    monkeypatch.setitem(jobs.GENERADORES, "ocupacion", generar_con_escritura)
+    segundo = _esperar(cola, cola.encolar("ocupacion", PARAMETROS, regenerar=True)["id"])
+    assert segundo["estado"] == COMPLETADO
+    assert segundo["creado_at"] > primero["creado_at"]
+    assert cola.artefacto(segundo["id"])[0].read_text() == "{}"
+    # El resultado no queda registrado en disco para otros pedidos.
+    assert not (cola.directorio / f"{segundo['id']}.meta").exists()
+
+    monkeypatch.setitem(jobs.GENERADORES, "ocupacion", generar)
+    assert cola.encolar("ocupacion", PARAMETROS)["creado_at"] > segundo["creado_at"]
+
+
+def test_los_resultados_de_otro_proceso_se_invalidan_despues_de_purgar(cola):
+    otro_proceso = ColaReportes()
+    job = _esperar(otro_proceso, otro_proceso.encolar("ocupacion", PARAMETROS)["id"])
+    artefacto = cola.directorio / f"{job['id']}.json"
+
+    # La invalidacion no lista el directorio: un resultado ajeno se conoce recien al purgar.
+    cola.invalidar([FECHA])
+    assert artefacto.exists()
+    cola.purgar()
+    cola.invalidar([FECHA])
+    assert not artefacto.exists()
+
+
+def test_los_jobs_fallidos_tambien_se_desalojan(cola, monkeypatch):
+    def fallar(service, p, destino, avanzar):
+        raise RuntimeError("sin datos")
+
+    monkeypatch.setitem(jobs.GENERADORES, "ocupacion", fallar)
+    job = _esperar(cola, cola.encolar("ocupacion", PARAMETROS)["id"])
+    assert (job["estado"], job["error"]) == (ERROR, "sin datos")
+
+    # Dentro del TTL el error sigue visible; vencido, el job desaparece.
+    cola.purgar()
+    assert cola.estado(job["id"])["estado"] == ERROR
+    monkeypatch.setattr(settings, "REPORTES_JOBS_TTL_HORAS", -1)
+    cola.purgar()
+    with pytest.raises(NotFoundException):
+        cola.estado(job["id"])
@@ -0,0 +1,88 @@
+from datetime import date, time, timedelta
+
+from sqlalchemy import text
+
+from app.domains.reportes.service import ReporteService, reportes_cache
+from app.domains.reservas.archivo import archivar_reservas, fuente_reservas
+from app.domains.reservas.models import Reserva, ReservaHistorico, ReservaSlot
+from app.domains.reservas.service import ReservaService
+
+FECHA = date.today() + timedelta(days=7)
+# Con un horizonte negativo el corte queda en el futuro y FECHA ya cuenta como archivable.
+HORIZONTE = -30
+
+
+def _crear(db, datos, fecha, horas):
+    service = ReservaService(db)
+    usuario_id, cancha_id = datos["usuario_id"], datos["cancha_ids"][0]
+    return [
+        service.crear(usuario_id, cancha_id, fecha, time(h), time(h + 1), jugadores=2)["reserva"]["id"]
+        for h in horas
+    ]
+
+
+def test_archivar_mueve_por_lotes_y_libera_los_slots(session_factory, datos):
+    db = session_factory()
+    try:
+        viejas = _crear(db, datos, FECHA, range(8, 13))
+        nueva, = _crear(db, datos, FECHA + timedelta(days=60), [10])
+
+        assert archivar_reservas(db, HORIZONTE, lote=2) == 5
+
+        assert [r.id for r in db.query(Reserva.id)] == [nueva]
+        assert sorted(r.id for r in db.query(ReservaHistorico.id)) == viejas
+        assert {s.reserva_id for s in db.query(ReservaSlot.reserva_id)} == {nueva}
+        # Volver a correrlo no encuentra nada que mover.
+        assert archivar_reservas(db, HORIZONTE, lote=2) == 0
+    finally:
+        db.close()
+
+
+def test_la_ultima_reserva_se_queda_y_sus_ids_no_se_reusan(session_factory, datos):
+    db = session_factory()
+    try:
+        archivadas = _crear(db, datos, FECHA, [9, 10])
+        # La reserva con el id mas alto tambien es archivable, pero se queda en reservas.
+        assert archivar_reservas(db, HORIZONTE) == 1
+        assert [r.id for r in db.query(Reserva.id)] == [archivadas[1]]
+
+        siguiente, = _crear(db, datos, FECHA + timedelta(days=60), [10])
+        assert siguiente > max(archivadas)
+        assert archivar_reservas(db, HORIZONTE) == 1
+        assert sorted(r.id for r in db.query(ReservaHistorico.id)) == archivadas
+    finally:
+        db.close()
+
+
+def test_sqlite_no_reasigna_un_id_borrado(session_factory, datos):
+    db = session_factory()
+    try:
+        primera, = _crear(db, datos, FECHA, [9])
+        db.execute(text("DELETE FROM reserva_slots"))
+        db.execute(text("DELETE FROM reservas"))
+        db.commit()
+
+        segunda, = _crear(db, datos, FECHA, [10])
+        assert segunda > primera
+    finally:
+        db.close()
+
+
+def test_los_reportes_leen_las_reservas_archivadas(session_factory, datos):
+    db = session_factory()
+    try:
+        _crear(db, datos, FECHA, [9, 10, 11])
+        _crear(db, datos, FECHA + timedelta(days=60), [10])
+        reportes = ReporteService(db)
+        antes = reportes.get_ocupacion(FECHA, FECHA), reportes.get_heatmap(FECHA, FECHA)
+
+        assert archivar_reservas(db, HORIZONTE) == 3
+        assert fuente_reservas(db, FECHA, FECHA) is not Reserva
+        assert fuente_reservas(db, FECHA + timedelta(days=1)) is Reserva
+        reportes_cache.clear()
+        despues = reportes.get_ocupacion(FECHA, FECHA), reportes.get_heatmap(FECHA, FECHA)
+    finally:
+        db.close()
+
+    assert despues == antes
+    assert sum(map(sum, antes[1]["canchas"][0]["minutos"])) == 180
@@ -0,0 +1,129 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.core.exceptions import ConflictException, ValidationException
+from app.domains.canchas.service import CanchaService
+from app.domains.reservas.models import Reserva, EstadoPago
+from app.domains.reservas.ocupacion import indice_ocupacion
+from app.domains.reservas.schemas import ReservaBulkCreate, SlotReserva
+from app.domains.reservas.service import ReservaService
+
+FECHA = date.today() + timedelta(days=7)
+
+
+def _reservar_en_paralelo(session_factory, usuario_id, intentos):
+    barrera = threading.Barrier(len(intentos))
+
+    def reservar(intento):
+        cancha_id, fecha, hora_inicio, hora_fin = intento
+        db = session_factory()
+        try:
+            barrera.wait()
+            ReservaService(db).crear(usuario_id, cancha_id, fecha, hora_inicio, hora_fin, jugadores=2)
+            return True
+        except ConflictException:
+            return False
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=len(intentos)) as pool:
+        return list(pool.map(reservar, intentos))
+
+
+def _assert_sin_solapes(session_factory):
+    db = session_factory()
+    try:
+        activas = db.query(Reserva).filter(
+            Reserva.estado_pago != EstadoPago.LIBRE
+        ).order_by(Reserva.cancha_id, Reserva.fecha, Reserva.hora_inicio).all()
+        for anterior, siguiente in zip(activas, activas[1:]):
+            if (anterior.cancha_id, anterior.fecha) == (siguiente.cancha_id, siguiente.fecha):
+                assert anterior.hora_fin <= siguiente.hora_inicio, (anterior.id, siguiente.id)
+        return len(activas)
+    finally:
+        db.close()
+
+
+def test_la_base_de_datos_rechaza_reservas_dobles(session_factory, datos, monkeypatch):
+    # Sin la verificacion en memoria, la unica defensa es la restriccion de reserva_slots.
+    monkeypatch.setattr(indice_ocupacion, "esta_libre", lambda *args: True)
+    cancha_id = datos["cancha_ids"][0]
+    intentos = [
+        (cancha_id, FECHA, time(10, minuto), time(11, minuto))
+        for minuto in (0, 15, 30, 45)
+        for _ in range(6)
+    ]
+
+    resultados = _reservar_en_paralelo(session_factory, datos["usuario_id"], intentos)
+
+    assert sum(resultados) >= 1
+    assert _assert_sin_solapes(session_factory) == sum(resultados)
+
+
+def test_reservas_concurrentes_con_indice_sin_solapes(session_factory, datos):
+    intentos = [
+        (cancha_id, FECHA, time(hora, 0), time(hora + 1, 30))
+        for cancha_id in datos["cancha_ids"]
+        for hora in range(8, 16)
+    ]
+
+    resultados = _reservar_en_paralelo(session_factory, datos["usuario_id"], intentos)
+
+    assert _assert_sin_solapes(session_factory) == sum(resultados)
+
+
+def test_canchas_y_fechas_distintas_no_se_bloquean(session_factory, datos):
+    intentos = [
+        (cancha_id, FECHA + timedelta(days=dia), time(18, 0), time(19, 0))
+        for cancha_id in datos["cancha_ids"]
+        for dia in range(8)
+    ]
+
+    resultados = _reservar_en_paralelo(session_factory, datos["usuario_id"], intentos)
+
+    assert all(resultados)
+    assert _assert_sin_solapes(session_factory) == len(intentos)
+
+
+def test_reservas_contiguas_en_limites_de_slot(session_factory, datos):
+    cancha_id = datos["cancha_ids"][0]
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        service.crear(datos["usuario_id"], cancha_id, FECHA, time(10, 0), time(10, 15), jugadores=2)
+        assert CanchaService(db).verificar_disponibilidad(cancha_id, FECHA, time(10, 15), time(11, 0))["disponible"]
+        service.crear(datos["usuario_id"], cancha_id, FECHA, time(10, 15), time(11, 0), jugadores=2)
+    finally:
+        db.close()
+
+    assert _assert_sin_solapes(session_factory) == 2
+
+
+def test_horarios_fuera_de_limite_de_slot_se_rechazan(session_factory, datos):
+    # 10:00-10:20 reclamaria el slot 10:15-10:30 entero y 10:20-11:00 chocaria con un
+    # conflicto que la verificacion de disponibilidad no ve: ambos se rechazan antes.
+    cancha_id = datos["cancha_ids"][0]
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        with pytest.raises(ValidationException):
+            service.crear(datos["usuario_id"], cancha_id, FECHA, time(10, 0), time(10, 20), jugadores=2)
+        with pytest.raises(ValidationException):
+            CanchaService(db).verificar_disponibilidad(cancha_id, FECHA, time(10, 20), time(11, 0))
+        with pytest.raises(ValidationException):
+            service.crear_bulk(datos["usuario_id"], ReservaBulkCreate(
+                cancha_id=cancha_id,
+                jugadores=2,
+                todo_o_nada=True,
+                slots=[
+                    SlotReserva(fecha=FECHA, hora_inicio=time(10, 0), hora_fin=time(10, 20)),
+                    SlotReserva(fecha=FECHA, hora_inicio=time(10, 20), hora_fin=time(11, 0)),
+                ],
+            ))
+    finally:
+        db.close()
+
+    assert _assert_sin_solapes(session_factory) == 0
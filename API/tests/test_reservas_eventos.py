@@ -0,0 +1,86 @@
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.core.exceptions import ConflictException, ForbiddenException, NotFoundException
+from app.domains.reservas.models import EstadoPago, ReservaEvento
+from app.domains.reservas.ocupacion import indice_ocupacion
+from app.domains.reservas.service import ReservaService
+
+FECHA = date.today() + timedelta(days=7)
+ADMIN_ID = 99
+
+
+def test_el_historial_registra_actor_estados_y_orden(session_factory, datos):
+    usuario_id, cancha_id = datos["usuario_id"], datos["cancha_ids"][0]
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        pagada = service.crear(usuario_id, cancha_id, FECHA, time(9), time(10), jugadores=2)["reserva"]["id"]
+        service.actualizar_pago(pagada, EstadoPago.ABONADO, actor_usuario_id=ADMIN_ID)
+        service.actualizar_pago(pagada, EstadoPago.PAGADO, actor_usuario_id=ADMIN_ID)
+        cancelada = service.crear(usuario_id, cancha_id, FECHA, time(10), time(11), jugadores=2)["reserva"]["id"]
+        service.cancelar(cancelada, usuario_id)
+
+        historial = service.get_eventos(pagada, usuario_id)["eventos"]
+        cancelacion = service.get_eventos(cancelada, ADMIN_ID, is_admin=True)["eventos"]
+    finally:
+        db.close()
+
+    resumen = [(e["tipo"], e["actor_usuario_id"], e["actor_es_admin"], e["estado_anterior"], e["estado_nuevo"])
+               for e in historial]
+    assert resumen == [
+        ("Creada", usuario_id, False, None, "Sin pagar"),
+        ("Pago actualizado", ADMIN_ID, True, "Sin pagar", "Abonado"),
+        ("Pago actualizado", ADMIN_ID, True, "Abonado", "Pagado"),
+    ]
+    assert [e["id"] for e in historial] == sorted(e["id"] for e in historial)
+    assert [(e["tipo"], e["actor_usuario_id"], e["actor_es_admin"], e["estado_anterior"], e["estado_nuevo"])
+            for e in cancelacion] == [
+        ("Creada", usuario_id, False, None, "Sin pagar"),
+        ("Cancelada", usuario_id, False, "Sin pagar", "Libre"),
+    ]
+
+
+def test_un_crear_que_pierde_la_carrera_no_deja_evento(session_factory, datos, monkeypatch):
+    usuario_id, cancha_id = datos["usuario_id"], datos["cancha_ids"][0]
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        service.crear(usuario_id, cancha_id, FECHA, time(9), time(10), jugadores=2)
+        # Otra solicitud gano el horario entre la verificacion y el insert: solo lo detectan los slots.
+        monkeypatch.setattr(indice_ocupacion, "esta_libre", lambda *args: True)
+        with pytest.raises(ConflictException):
+            service.crear(usuario_id, cancha_id, FECHA, time(9), time(10), jugadores=2)
+
+        tipos = [e.tipo.value for e in db.query(ReservaEvento).order_by(ReservaEvento.id)]
+    finally:
+        db.close()
+
+    # El evento de la reserva fallida se revirtio con ella.
+    assert tipos == ["Creada"]
+
+
+def test_solo_un_admin_ve_el_historial_de_una_reserva_que_ya_no_esta(session_factory, datos):
+    usuario_id, cancha_id = datos["usuario_id"], datos["cancha_ids"][0]
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        reserva_id = service.crear(usuario_id, cancha_id, FECHA, time(9), time(10), jugadores=2)["reserva"]["id"]
+        with pytest.raises(ForbiddenException):
+            service.get_eventos(reserva_id, usuario_id + 1)
+
+        db.execute(text("DELETE FROM reserva_slots"))
+        db.execute(text("DELETE FROM reservas"))
+        db.commit()
+
+        # El historial sobrevive a la fila, pero sin ella el duenio ya no se puede comprobar.
+        with pytest.raises(NotFoundException):
+            service.get_eventos(reserva_id, usuario_id)
+        eventos = service.get_eventos(reserva_id, ADMIN_ID, is_admin=True)["eventos"]
+        assert [e["tipo"] for e in eventos] == ["Creada"]
+        with pytest.raises(NotFoundException):
+            service.get_eventos(reserva_id + 1, ADMIN_ID, is_admin=True)
+    finally:
+        db.close()
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+from datetime import date, time, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.domains.auth.utils import get_current_admin
+from app.domains.reportes.router import router
+from app.domains.reservas import service as reservas_service
+from app.domains.reservas.models import EstadoPago
+from app.domains.reservas.service import EXPORT_COLUMNAS, ReservaService
+
+FECHA = date.today() + timedelta(days=7)
+
+
+def _crear(session_factory, datos):
+    """Five reservations on the first court, one on the second; the 12:00 one is released."""
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        usuario_id, (cancha_id, otra_cancha, _) = datos["usuario_id"], datos["cancha_ids"]
+        ids = [
+            service.crear(usuario_id, cancha_id, FECHA, time(h), time(h + 1), jugadores=2)["reserva"]["id"]
+            for h in (9, 10, 11, 12, 13)
+        ]
+        ids.append(service.crear(usuario_id, otra_cancha, FECHA, time(9), time(10), jugadores=2)["reserva"]["id"])
+        service.actualizar_pago(ids[3], EstadoPago.LIBRE)
+        service.actualizar_pago(ids[0], EstadoPago.PAGADO)
+        return ids
+    finally:
+        db.close()
+
+
+def test_exportar_csv_en_lotes(session_factory, datos, monkeypatch):
+    ids = _crear(session_factory, datos)
+    monkeypatch.setattr(reservas_service, "EXPORT_BATCH", 2)
+    db = session_factory()
+    try:
+        bloques = list(ReservaService(db).exportar(formato="csv"))
+    finally:
+        db.close()
+
+    # Encabezado con el primer lote y un bloque por lote de 2 filas: 5 activas, 3 bloques.
+    assert len(bloques) == 3
+    filas = list(csv.reader(io.StringIO("".join(bloques))))
+    assert filas[0] == EXPORT_COLUMNAS
+    # Sin filtro de estado las reservas liberadas no salen; el orden es (fecha, id).
+    assert [int(f[0]) for f in filas[1:]] == [i for i in ids if i != ids[3]]
+    pagada = dict(zip(EXPORT_COLUMNAS, filas[1]))
+    assert (pagada["hora_inicio"], pagada["hora_fin"], pagada["estado_pago"], pagada["precio_total"]) == (
+        "09:00", "10:00", "Pagado", "100.0"
+    )
+
+
+def test_exportar_ndjson_con_filtros(session_factory, datos):
+    ids = _crear(session_factory, datos)
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        liberadas = "".join(service.exportar(formato="ndjson", estado_pago=EstadoPago.LIBRE))
+        de_la_otra = "".join(service.exportar(formato="ndjson", cancha_id=datos["cancha_ids"][1]))
+        otro_dia = "".join(service.exportar(formato="ndjson", fecha=FECHA + timedelta(days=1)))
+    finally:
+        db.close()
+
+    filas = [json.loads(linea) for linea in liberadas.splitlines()]
+    assert [(f["id"], f["estado_pago"]) for f in filas] == [(ids[3], "Libre")]
+    assert list(filas[0]) == EXPORT_COLUMNAS
+    assert [json.loads(linea)["id"] for linea in de_la_otra.splitlines()] == [ids[5]]
+    assert otro_dia == ""
+
+
+def test_un_estado_de_pago_invalido_se_rechaza_antes_de_empezar_la_respuesta():
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_admin] = lambda: None
+
+    respuesta = TestClient(app).get("/admin/reservas/export", params={"estado_pago": "bogus"})
+
+    assert respuesta.status_code == 422
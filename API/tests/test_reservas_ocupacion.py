@@ -0,0 +1,73 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from app.domains.canchas.service import CanchaService, disponibilidad_cache
+from app.domains.reservas.models import Reserva, EstadoPago
+from app.domains.reservas.ocupacion import IndiceOcupacion
+
+FECHA = date.today() + timedelta(days=7)
+
+
+def _insertar_reserva(session_factory, usuario_id, cancha_id, hora_inicio, hora_fin):
+    """Write a reservation behind the index's back, as another process would."""
+    db = session_factory()
+    try:
+        db.add(Reserva(
+            usuario_id=usuario_id, cancha_id=cancha_id, fecha=FECHA, hora_inicio=hora_inicio,
+            hora_fin=hora_fin, jugadores=2, estado_pago=EstadoPago.SIN_PAGAR, precio_total=Decimal("100.00")
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_el_indice_recarga_el_dia_cuando_vence_el_ttl(session_factory, datos):
+    cancha_id = datos["cancha_ids"][0]
+    indice = IndiceOcupacion(ttl=0)
+    db = session_factory()
+    try:
+        assert indice.esta_libre(db, cancha_id, FECHA, time(10), time(11))
+        _insertar_reserva(session_factory, datos["usuario_id"], cancha_id, time(10), time(11))
+        assert not indice.esta_libre(db, cancha_id, FECHA, time(10), time(11))
+    finally:
+        db.close()
+
+
+def test_el_indice_descarta_los_dias_menos_usados(session_factory, datos):
+    indice = IndiceOcupacion(maxsize=2)
+    db = session_factory()
+    try:
+        for dia in range(5):
+            indice.intervalos_ocupados(db, datos["cancha_ids"][0], FECHA + timedelta(days=dia))
+        assert list(indice._dias) == [
+            (datos["cancha_ids"][0], FECHA + timedelta(days=3)),
+            (datos["cancha_ids"][0], FECHA + timedelta(days=4)),
+        ]
+    finally:
+        db.close()
+
+
+def test_intervalos_ocupados_con_recargar_lee_la_base(session_factory, datos):
+    cancha_id = datos["cancha_ids"][0]
+    indice = IndiceOcupacion()
+    db = session_factory()
+    try:
+        assert indice.intervalos_ocupados(db, cancha_id, FECHA) == []
+        _insertar_reserva(session_factory, datos["usuario_id"], cancha_id, time(9), time(10))
+        assert indice.intervalos_ocupados(db, cancha_id, FECHA) == []
+        assert indice.intervalos_ocupados(db, cancha_id, FECHA, recargar=True) == [(9 * 3600, 10 * 3600)]
+    finally:
+        db.close()
+
+
+def test_un_fallo_de_disponibilidad_cache_no_usa_el_indice_viejo(session_factory, datos):
+    cancha_id = datos["cancha_ids"][0]
+    db = session_factory()
+    try:
+        assert CanchaService(db).verificar_disponibilidad(cancha_id, FECHA, time(9), time(10))["disponible"]
+        _insertar_reserva(session_factory, datos["usuario_id"], cancha_id, time(9), time(10))
+        # Vence la entrada de disponibilidad_cache; el indice del proceso sigue con el dia cargado.
+        disponibilidad_cache.clear()
+        assert not CanchaService(db).verificar_disponibilidad(cancha_id, FECHA, time(9), time(10))["disponible"]
+    finally:
+        db.close()
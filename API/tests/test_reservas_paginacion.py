@@ -0,0 +1,80 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import insert
+
+from app.core.exceptions import ValidationException
+from app.domains.reservas.models import Reserva, EstadoPago
+from app.domains.reservas.service import ReservaService
+
+FECHA = date.today() + timedelta(days=7)
+
+
+@pytest.fixture
+def reservas(session_factory, datos):
+    """Seven reservations on each of three dates, so most page breaks fall inside a fecha."""
+    filas = [
+        {
+            "usuario_id": datos["usuario_id"],
+            "cancha_id": datos["cancha_ids"][hora % 3],
+            "fecha": FECHA + timedelta(days=dia),
+            "hora_inicio": time(8 + hora),
+            "hora_fin": time(9 + hora),
+            "jugadores": 2,
+            "estado_pago": EstadoPago.SIN_PAGAR,
+            "precio_total": Decimal("100.00"),
+        }
+        for dia in range(3)
+        for hora in range(7)
+    ]
+    db = session_factory()
+    try:
+        db.execute(insert(Reserva), filas)
+        db.commit()
+        return [r.id for r in db.query(Reserva.id).order_by(Reserva.fecha.desc(), Reserva.id.desc())]
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("limit", [1, 3, 5, 7, 21, 50])
+def test_el_cursor_recorre_todo_sin_duplicados_ni_huecos(session_factory, reservas, limit):
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        vistos = []
+        cursor = None
+        while True:
+            pagina = service.listar_todas(limit=limit, cursor=cursor, incluir_total=False)
+            assert len(pagina["reservas"]) <= limit
+            vistos.extend(r["id"] for r in pagina["reservas"])
+            cursor = pagina["next_cursor"]
+            if cursor is None:
+                break
+    finally:
+        db.close()
+
+    assert vistos == reservas
+
+
+def test_el_cursor_del_usuario_coincide_con_el_orden_por_fecha_e_id(session_factory, datos, reservas):
+    db = session_factory()
+    try:
+        primera = ReservaService(db).listar_usuario(datos["usuario_id"], limit=4)
+        segunda = ReservaService(db).listar_usuario(datos["usuario_id"], limit=4, cursor=primera["next_cursor"])
+    finally:
+        db.close()
+
+    assert [r["id"] for r in primera["reservas"] + segunda["reservas"]] == reservas[:8]
+
+
+@pytest.mark.parametrize("cursor", ["no-es-base64!", "MjAyNi0xMC0yMA", "eHx5", "MjAyNi0xMy0wMXwx"])
+def test_un_cursor_malformado_devuelve_400(session_factory, datos, cursor):
+    db = session_factory()
+    try:
+        with pytest.raises(ValidationException) as error:
+            ReservaService(db).listar_todas(cursor=cursor)
+    finally:
+        db.close()
+
+    assert error.value.status_code == 400
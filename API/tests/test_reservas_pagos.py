@@ -0,0 +1,82 @@
+from datetime import date, time, timedelta
+
+from sqlalchemy import event, text
+
+from app.domains.reservas.models import Reserva, ReservaSlot, EstadoPago
+from app.domains.reservas.schemas import PagoBulkItem
+from app.domains.reservas.service import ReservaService
+
+FECHA = date.today() + timedelta(days=7)
+
+
+def _crear_reservas(session_factory, datos, horas):
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        return [
+            service.crear(
+                datos["usuario_id"], datos["cancha_ids"][0], FECHA, time(h), time(h + 1), jugadores=2
+            )["reserva"]["id"]
+            for h in horas
+        ]
+    finally:
+        db.close()
+
+
+def test_actualizar_pagos_omite_la_reserva_cancelada_durante_la_solicitud(session_factory, datos):
+    pagada, liberada, cancelada = _crear_reservas(session_factory, datos, [10, 12, 14])
+    db = session_factory()
+    pendiente = [True]
+
+    # La cancelacion llega entre la lectura del estado previo y el UPDATE masivo.
+    @event.listens_for(db, "do_orm_execute")
+    def cancelar_antes_del_update(orm_execute_state):
+        if orm_execute_state.is_update and pendiente:
+            pendiente.clear()
+            db.execute(text("UPDATE reservas SET estado_pago = 'LIBRE' WHERE id = :id"), {"id": cancelada})
+
+    try:
+        resultado = ReservaService(db).actualizar_pagos([
+            PagoBulkItem(reserva_id=pagada, estado_pago=EstadoPago.PAGADO),
+            PagoBulkItem(reserva_id=liberada, estado_pago=EstadoPago.LIBRE),
+            PagoBulkItem(reserva_id=cancelada, estado_pago=EstadoPago.ABONADO),
+            PagoBulkItem(reserva_id=999, estado_pago=EstadoPago.PAGADO),
+        ])
+    finally:
+        db.close()
+
+    assert resultado["actualizadas"] == 2
+    assert resultado["rechazadas"] == 2
+    assert [(r["reserva_id"], r["actualizada"], r["motivo"]) for r in resultado["resultados"]] == [
+        (pagada, True, None),
+        (liberada, True, None),
+        (cancelada, False, "No se puede actualizar el pago de una reserva cancelada"),
+        (999, False, "Reserva no encontrada"),
+    ]
+
+    db = session_factory()
+    try:
+        estados = dict(db.query(Reserva.id, Reserva.estado_pago).all())
+        assert estados == {pagada: EstadoPago.PAGADO, liberada: EstadoPago.LIBRE, cancelada: EstadoPago.LIBRE}
+    finally:
+        db.close()
+
+
+def test_pasar_a_libre_libera_los_slots(session_factory, datos):
+    pagada, liberada = _crear_reservas(session_factory, datos, [10, 12])
+    db = session_factory()
+    try:
+        ReservaService(db).actualizar_pagos([
+            PagoBulkItem(reserva_id=pagada, estado_pago=EstadoPago.PAGADO),
+            PagoBulkItem(reserva_id=liberada, estado_pago=EstadoPago.LIBRE),
+        ])
+
+        slots = dict(db.query(ReservaSlot.reserva_id, ReservaSlot.slot).all())
+        assert pagada in slots and liberada not in slots
+        # El horario liberado vuelve a poder reservarse, tanto en el indice como en reserva_slots.
+        nueva = ReservaService(db).crear(
+            datos["usuario_id"], datos["cancha_ids"][0], FECHA, time(12), time(13), jugadores=2
+        )
+        assert nueva["reserva"]["id"] not in (pagada, liberada)
+    finally:
+        db.close()
@@ -0,0 +1,77 @@
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import event, inspect, text
+
+from app.db.indices import asegurar_indices
+from app.domains.canchas.service import CanchaService
+from app.domains.reportes.service import ReporteService
+from app.domains.reservas.models import EstadoPago, Reserva
+from app.domains.reservas.ocupacion import indice_ocupacion
+from app.domains.reservas.service import ReservaService
+
+HOY = date.today()
+SEMANA = HOY + timedelta(days=7)
+
+CONSULTAS_CALIENTES = {
+    "conflicto": lambda db: indice_ocupacion.esta_libre(db, 1, HOY, time(10), time(11)),
+    "eliminar_cancha": lambda db: CanchaService(db).eliminar(1),
+    "grilla_disponibilidad": lambda db: CanchaService(db).grilla_disponibilidad(HOY, SEMANA),
+    "listar_usuario": lambda db: ReservaService(db).listar_usuario(1),
+    "listar_usuario_filtros": lambda db: ReservaService(db).listar_usuario(1, HOY, SEMANA, EstadoPago.PAGADO.value),
+    "listar_usuario_cursor": lambda db: ReservaService(db).listar_usuario(1, cursor="MjAyNi0xMC0yMHw4"),
+    "listar_todas": lambda db: ReservaService(db).listar_todas(),
+    "listar_todas_cursor": lambda db: ReservaService(db).listar_todas(cursor="MjAyNi0xMC0yMHw4", incluir_total=False),
+    "listar_todas_fecha": lambda db: ReservaService(db).listar_todas(fecha=HOY),
+    "listar_todas_cancha": lambda db: ReservaService(db).listar_todas(cancha_id=1),
+    "listar_todas_usuario": lambda db: ReservaService(db).listar_todas(usuario_id=1),
+    "dashboard": lambda db: ReporteService(db).get_stats(),
+    "reservas_semana": lambda db: ReporteService(db).get_reservas_semana(HOY, SEMANA),
+    "ingresos": lambda db: ReporteService(db).get_ingresos(HOY, SEMANA),
+    "ocupacion": lambda db: ReporteService(db).get_ocupacion(HOY, SEMANA),
+    "horarios_pico": lambda db: ReporteService(db).get_horarios_pico(HOY, SEMANA, 1),
+    "clientes_frecuentes": lambda db: ReporteService(db).get_clientes_frecuentes(HOY, SEMANA),
+    "daily": lambda db: ReporteService(db).get_daily(HOY, SEMANA, 1),
+}
+
+
+def _es_scan_completo(detalle: str, tabla: str) -> bool:
+    """A plain `SCAN <tabla>` reads the whole table; `SCAN ... USING INDEX` only walks an index."""
+    return detalle.startswith(f"SCAN {tabla}") and "INDEX" not in detalle
+
+
+@pytest.mark.parametrize("nombre", CONSULTAS_CALIENTES)
+def test_consultas_calientes_usan_indices(nombre, engine, session_factory, datos):
+    sentencias = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "reservas" in statement:
+            sentencias.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capturar)
+    db = session_factory()
+    try:
+        CONSULTAS_CALIENTES[nombre](db)
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", capturar)
+
+    assert sentencias, "la consulta no se ejecuto contra reservas"
+    with engine.connect() as conn:
+        for statement, parameters in sentencias:
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            detalles = [fila[3] for fila in plan]
+            assert not any(_es_scan_completo(d, "reservas") for d in detalles), (statement, detalles)
+
+
+def test_los_indices_nuevos_llegan_a_una_tabla_existente(engine):
+    with engine.begin() as conn:
+        for indice in Reserva.__table__.indexes:
+            conn.execute(text(f"DROP INDEX {indice.name}"))
+
+    creados = asegurar_indices(engine)
+
+    assert set(creados) == {i.name for i in Reserva.__table__.indexes}
+    assert {i["name"] for i in inspect(engine).get_indexes("reservas")} >= set(creados)
+    # En cada arranque: la segunda vez no queda nada por crear.
+    assert asegurar_indices(engine) == []
@@ -0,0 +1,104 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from app.domains.reportes.service import ReporteService
+from app.domains.reservas.models import Reserva, ReservaRollupDiario, EstadoPago
+from app.domains.reservas.rollup import asegurar_rollup, reconstruir_rollup
+from app.domains.reservas.schemas import PagoBulkItem, ReservaBulkCreate, SerieReserva
+from app.domains.reservas.service import ReservaService
+
+FECHA = date.today() + timedelta(days=7)
+
+
+def _rollup(db) -> dict:
+    """Non-empty buckets; live deltas may leave buckets at zero that a rebuild would not write."""
+    return {
+        (r.fecha, r.cancha_id, r.estado_pago, r.hora): (r.reservas, Decimal(str(r.ingresos)))
+        for r in db.query(ReservaRollupDiario).all()
+        if r.reservas or r.ingresos
+    }
+
+
+def test_el_rollup_en_vivo_coincide_con_el_reconstruido(session_factory, datos):
+    usuario_id = datos["usuario_id"]
+    cancha_id, otra_cancha = datos["cancha_ids"][:2]
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        ids = [
+            service.crear(usuario_id, cancha_id, FECHA, time(h), time(h + 1), jugadores=2)["reserva"]["id"]
+            for h in (9, 10, 11, 12)
+        ]
+        bulk = service.crear_bulk(usuario_id, ReservaBulkCreate(
+            cancha_id=otra_cancha,
+            jugadores=2,
+            serie=SerieReserva(
+                dia_semana=(FECHA.weekday() + 1) % 7, hora_inicio=time(18), hora_fin=time(19, 30),
+                fecha_desde=FECHA, fecha_hasta=FECHA + timedelta(days=21)
+            ),
+        ))
+        ids_bulk = [r["reserva_id"] for r in bulk["resultados"] if r["aceptada"]]
+
+        service.cancelar(ids[0], usuario_id)
+        service.actualizar_pago(ids[1], EstadoPago.ABONADO)
+        service.actualizar_pago(ids[1], EstadoPago.PAGADO)
+        service.actualizar_pago(ids[2], EstadoPago.LIBRE)
+        service.actualizar_pagos([
+            PagoBulkItem(reserva_id=ids[3], estado_pago=EstadoPago.PAGADO),
+            PagoBulkItem(reserva_id=ids_bulk[0], estado_pago=EstadoPago.LIBRE),
+            PagoBulkItem(reserva_id=ids_bulk[1], estado_pago=EstadoPago.ABONADO),
+            PagoBulkItem(reserva_id=ids[0], estado_pago=EstadoPago.PAGADO),
+        ])
+
+        en_vivo = _rollup(db)
+        reconstruir_rollup(db)
+        reconstruido = _rollup(db)
+    finally:
+        db.close()
+
+    assert len(ids_bulk) == 4
+    assert en_vivo == reconstruido
+
+
+def test_los_reportes_del_rollup_coinciden_con_las_reservas(session_factory, datos):
+    db = session_factory()
+    try:
+        service = ReservaService(db)
+        for h in (9, 10, 11):
+            service.crear(datos["usuario_id"], datos["cancha_ids"][0], FECHA, time(h), time(h + 1), jugadores=2)
+        primera = db.query(Reserva).order_by(Reserva.id).first()
+        service.actualizar_pago(primera.id, EstadoPago.PAGADO)
+
+        reportes = ReporteService(db)
+        ingresos = reportes.get_ingresos(FECHA, FECHA)["ingresos"]
+        daily = reportes.get_daily(FECHA, FECHA)["daily"]
+    finally:
+        db.close()
+
+    assert ingresos == {"total": 300.0, "pagado": 100.0, "abonado": 0.0, "sin_pagar": 200.0}
+    assert [(d["reservas_count"], d["ingreso_total"]) for d in daily] == [(3, 300.0)]
+
+
+def test_asegurar_rollup_completa_una_base_con_reservas_previas(session_factory, datos):
+    db = session_factory()
+    try:
+        db.execute(insert(Reserva), [
+            {
+                "usuario_id": datos["usuario_id"], "cancha_id": datos["cancha_ids"][0], "fecha": FECHA,
+                "hora_inicio": time(h), "hora_fin": time(h + 1), "jugadores": 2,
+                "estado_pago": EstadoPago.SIN_PAGAR, "precio_total": Decimal("100.00"),
+            }
+            for h in (9, 10)
+        ])
+        db.commit()
+        assert ReporteService(db).get_daily(FECHA, FECHA)["daily"][0]["reservas_count"] == 0
+
+        assert asegurar_rollup(db) == 2
+        assert asegurar_rollup(db) == 0
+        daily = ReporteService(db).get_daily(FECHA, FECHA)["daily"]
+    finally:
+        db.close()
+
+    assert [(d["reservas_count"], d["ingreso_total"]) for d in daily] == [(2, 200.0)]